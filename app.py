@@ -1,28 +1,46 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import pandas as pd
 import os
 from functools import wraps
 from datetime import datetime
 import json
+from urllib.parse import quote
+import csv
+import io
+import tempfile
+import shutil
+import threading
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from openpyxl import Workbook
 
 # 데이터베이스 모듈 임포트
 from database import (
-    init_database, execute_write, IS_LOCAL, supabase_update, supabase_select,
-    save_upload_file, save_sales_data, save_monthly_data,
-    get_upload_files, delete_file_data, update_file_period,
-    get_summary_stats, get_sales_by_supplier, get_sales_by_category,
+    init_database, execute_write, IS_LOCAL, supabase_update,
+    save_upload_file, save_sales_data, save_monthly_data, SALES_SOURCE_COLUMNS,
+    save_upload_chunk, chunk_checksum, get_upload_chunks, find_upload_file_id, increment_file_row_count,
+    save_upload_job, update_upload_job, get_upload_job_record, fail_interrupted_upload_jobs, upload_job_owner,
+    get_upload_files, get_upload_file, delete_file_data, update_file_period,
+    get_custom_data_page, iter_custom_data, CUSTOM_DATA_PAGE_SIZE,
+    get_data_version, get_summary_stats, get_sales_by_supplier, get_sales_by_category,
     get_top_products, get_daily_sales, get_weekly_sales, get_monthly_sales, get_store_sales,
-    get_supplier_category_matrix, get_store_category_matrix, parse_classification,
+    get_supplier_category_matrix, get_store_category_matrix, get_dashboard_bundle,
+    get_normalizer_cache_stats,
     verify_admin, change_password, get_admin_info,
     reset_all_data, get_data_counts,
     create_backup, restore_backup, get_backup_list, save_backup_to_file, load_backup_from_file,
     delete_data_by_year, get_available_years,
-    get_product_image, get_product_image_by_code, get_all_product_images,
+    get_product_image, get_product_image_by_code, get_all_product_images, iter_all_product_images,
     get_product_images_count, search_product_images, get_product_options_with_stock,
-    save_inventory, get_inventory_by_supplier_option, get_inventory_summary,
-    get_all_inventory, search_inventory, get_low_stock_items
+    get_inventory_by_supplier_option, get_inventory_summary,
+    get_all_inventory, iter_all_inventory, search_inventory, get_low_stock_items, iter_low_stock_items
 )
+from excel_reader import iter_table_batches
+from ingest import save_monthly_workbook
 
 app = Flask(__name__)
 app.secret_key = 'workup_dashboard_secret_key_2024'
@@ -45,6 +63,11 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # 허용 파일 확장자
 ALLOWED_EXTENSIONS = {'xls', 'xlsx', 'csv'}
 
+# 파일 원본을 그대로 올리는 업로드(/api/upload) 최대 크기 - 넘으면 브라우저에서 파싱해 청크 업로드
+# (Vercel 서버리스는 요청 본문이 4.5MB로 제한됨)
+RAW_UPLOAD_MAX_BYTES = int(os.environ.get('RAW_UPLOAD_MAX_BYTES', str(4 * 1024 * 1024 if IS_VERCEL else 50 * 1024 * 1024)))
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -66,6 +89,49 @@ def admin_required(f):
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+# ============ NDJSON 스트리밍 응답 ============
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+NDJSON_FLUSH_BYTES = 64 * 1024  # 이 크기만큼 모아서 전송 (첫 행은 바로 전송)
+
+def wants_ndjson():
+    """Accept: application/x-ndjson 또는 ?stream=1 요청이면 True (기본은 기존 JSON 응답)"""
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return NDJSON_MIMETYPE in request.accept_mimetypes.values()
+
+def ndjson_response(rows):
+    """행 iterable을 한 줄에 한 행씩 JSON으로 흘려보내는 응답
+
+    rows가 generator면 DB/Supabase 페이지를 받는 대로 전송하므로 전체 목록을 메모리에 만들지 않는다.
+    중간에 오류가 나면 마지막 줄에 {"success": false, "error": ...}를 보낸다.
+    """
+    def generate():
+        buffer = []
+        size = 0
+        first = True
+        try:
+            for row in rows:
+                line = json.dumps(row, ensure_ascii=False, default=str) + '\n'
+                if first:
+                    first = False
+                    yield line
+                    continue
+                buffer.append(line)
+                size += len(line)
+                if size >= NDJSON_FLUSH_BYTES:
+                    yield ''.join(buffer)
+                    buffer = []
+                    size = 0
+        except Exception as e:
+            buffer.append(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False) + '\n')
+        if buffer:
+            yield ''.join(buffer)
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 def update_file_row_count(file_id, row_count, increment=False):
     """파일의 row_count를 업데이트 (로컬/Supabase 환경 모두 지원)"""
     if IS_LOCAL:
@@ -75,90 +141,176 @@ def update_file_row_count(file_id, row_count, increment=False):
             execute_write('UPDATE upload_files SET row_count = ? WHERE id = ?', (row_count, file_id))
     else:
         if increment:
-            current = supabase_select('upload_files', 'row_count', f'id=eq.{file_id}')
-            # None 체크 추가: row_count가 None이면 0으로 처리
-            current_count = (current[0]['row_count'] or 0) if current else 0
-            supabase_update('upload_files', {'row_count': current_count + row_count}, f'id=eq.{file_id}')
+            increment_file_row_count(file_id, row_count)
         else:
             supabase_update('upload_files', {'row_count': row_count}, f'id=eq.{file_id}')
 
 
 
-def process_and_save_file(filepath, file_type, original_name, saved_name):
-    """파일을 처리하고 데이터베이스에 저장"""
-    ext = filepath.rsplit('.', 1)[1].lower()
+def process_and_save_file(filepath, file_type, original_name, saved_name, progress=None):
+    """파일을 처리하고 데이터베이스에 저장
+
+    excel_reader로 UPLOAD_BATCH_ROWS행씩 읽어 배치마다 저장하므로 파일 전체를
+    DataFrame으로 올리지 않는다. 중간에 실패하면 이미 저장한 행은 지운다.
+    progress(**fields)를 주면 배치마다 단계(stage)와 읽은/저장한 행 수를 알려준다 (업로드 작업용).
+    파일 형식은 확장자가 아니라 파일 내용으로 판별하고, 사용한 엔진과 읽기 시간도 progress로 알려준다.
+    """
+    info = {}
     total_rows = 0
+    rows_parsed = 0
+    file_id = None
+    progress = progress or (lambda **fields: None)
 
     try:
-        if file_type == 'original':
-            # 원본 데이터 로드
-            if ext == 'csv':
-                df = pd.read_csv(filepath, encoding='cp949')
-            elif ext == 'xls':
-                try:
-                    df = pd.read_csv(filepath, sep='\t', encoding='cp949')
-                except:
-                    df = pd.read_excel(filepath, engine='xlrd')
-            else:
-                df = pd.read_excel(filepath, engine='openpyxl')
-
-            # DB에 파일 정보 저장
-            file_id = save_upload_file(saved_name, original_name, file_type, len(df))
-
-            # 판매 데이터 저장
-            total_rows = save_sales_data(df, file_id)
-
-        elif file_type == 'monthly':
-            # 월별 데이터 (시트별)
-            xls = pd.ExcelFile(filepath, engine='openpyxl')
-            sheets = xls.sheet_names
-
-            # 먼저 파일 정보 저장 (row_count는 나중에 업데이트)
+        if file_type == 'monthly':
+            # 월별 데이터 (시트별) - 먼저 파일 정보 저장 (row_count는 나중에 업데이트)
             file_id = save_upload_file(saved_name, original_name, file_type, 0)
+            progress(stage='parse', file_id=file_id)
 
-            for sheet in sheets:
-                df = pd.read_excel(xls, sheet_name=sheet)
-                sheet_lower = sheet.lower()
+            # 시트별로 작업 프로세스에서 동시에 읽고 저장 (작은 파일은 순차)
+            total_rows = save_monthly_workbook(filepath, file_id, progress, info)
 
-                # 시트명으로 데이터 타입 결정
-                if '의류' in sheet or 'clothing' in sheet_lower:
-                    data_type = '의류'
-                elif '신발' in sheet or 'shoes' in sheet_lower:
-                    data_type = '신발'
-                elif '잡화' in sheet or 'accessories' in sheet_lower:
-                    data_type = '잡화'
-                else:
-                    data_type = sheet
+        elif file_type in ('original', 'custom'):
+            # 원본/커스텀 데이터 (단일 표)
+            file_id = save_upload_file(saved_name, original_name, file_type, 0)
+            progress(stage='parse', file_id=file_id)
 
-                rows = save_monthly_data(df, file_id, data_type)
-                total_rows += rows
+            for df in iter_table_batches(filepath, columns=SALES_SOURCE_COLUMNS, info=info):
+                rows_parsed += len(df)
+                progress(stage='write', rows_parsed=rows_parsed, engine=info.get('engine'))
+                total_rows += save_sales_data(df, file_id)
+                progress(stage='parse', rows_written=total_rows)
 
-            # row_count 업데이트
+        # row_count 업데이트
+        if file_id:
+            progress(stage='finalize', engine=info.get('engine'), read_seconds=round(info.get('seconds', 0.0), 3))
             update_file_row_count(file_id, total_rows)
 
-        elif file_type == 'custom':
-            # 커스텀 데이터
-            if ext == 'csv':
-                df = pd.read_csv(filepath, encoding='cp949')
-            elif ext == 'xls':
-                try:
-                    df = pd.read_csv(filepath, sep='\t', encoding='cp949')
-                except:
-                    df = pd.read_excel(filepath, engine='xlrd')
-            else:
-                df = pd.read_excel(filepath, engine='openpyxl')
-
-            file_id = save_upload_file(saved_name, original_name, file_type, len(df))
-            total_rows = save_sales_data(df, file_id)
-
         return True, total_rows
 
     except Exception as e:
         print(f"파일 처리 오류: {e}")
         import traceback
         traceback.print_exc()
+        if file_id:
+            try:
+                delete_file_data(file_id)
+            except Exception as cleanup_error:
+                print(f"업로드 실패 파일 정리 오류: {cleanup_error}")
         return False, str(e)
 
+# ============ 업로드 작업 큐 ============
+
+# 서버 업로드(api_upload)는 파일만 받고 바로 job id를 돌려준 뒤 작업 스레드에서 처리한다.
+# Vercel은 응답 후 스레드가 멈추므로 기본으로 끄고 요청 안에서 처리한다.
+UPLOAD_JOBS_ENABLED = os.environ.get('UPLOAD_JOBS', '0' if IS_VERCEL else '1') != '0'
+UPLOAD_JOB_WORKERS = max(1, int(os.environ.get('UPLOAD_JOB_WORKERS', '2')))  # 동시에 처리할 업로드 수
+UPLOAD_JOB_SAVE_INTERVAL = float(os.environ.get('UPLOAD_JOB_SAVE_INTERVAL', '1.0'))  # 진행 상황 DB 기록 간격 (초)
+UPLOAD_JOB_HISTORY = 100  # 메모리에 남겨둘 끝난 작업 수
+
+_upload_jobs = OrderedDict()  # job id → 진행 상황 (처리 중인 서버의 실시간 값)
+_upload_jobs_lock = threading.Lock()
+_upload_job_executor = ThreadPoolExecutor(max_workers=UPLOAD_JOB_WORKERS, thread_name_prefix='upload-job')
+
+def store_upload_job(job_id, fields):
+    """작업 진행 상황을 DB에 기록 (실패해도 처리는 계속)"""
+    try:
+        update_upload_job(job_id, fields)
+    except Exception as e:
+        print(f"업로드 작업 기록 실패 ({job_id}): {e}")
+
+def submit_upload_job(filepath, file_type, original_name, saved_name):
+    """업로드 파일 처리를 작업 큐에 등록하고 작업 정보 반환
+
+    UPLOAD_JOB_WORKERS개까지 동시에 처리하고, 나머지는 queued 상태로 기다린다.
+    """
+    job = {
+        'id': uuid.uuid4().hex,
+        'original_name': original_name,
+        'saved_name': saved_name,
+        'file_type': file_type,
+        'status': 'queued',
+        'stage': 'queued',
+        'rows_parsed': 0,
+        'rows_written': 0,
+        'file_id': None,
+        'error': None,
+        'engine': None,
+        'read_seconds': None,
+        **upload_job_owner(),
+        'created_at': datetime.now().isoformat(),
+        'started_at': None,
+        'finished_at': None
+    }
+    try:
+        save_upload_job(job)
+    except Exception as e:
+        print(f"업로드 작업 등록 기록 실패: {e}")
+
+    with _upload_jobs_lock:
+        _upload_jobs[job['id']] = job
+        # 끝난 작업은 오래된 것부터 메모리에서 정리 (DB 기록은 남음)
+        finished = [job_id for job_id, item in _upload_jobs.items() if item['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - UPLOAD_JOB_HISTORY)]:
+            del _upload_jobs[job_id]
+        snapshot = dict(job)
+
+    _upload_job_executor.submit(run_upload_job, job['id'], filepath)
+    return snapshot
+
+def run_upload_job(job_id, filepath):
+    """작업 스레드에서 파일 처리 (process_and_save_file의 진행 상황을 작업에 기록)"""
+    job = _upload_jobs[job_id]
+    last_saved = [0.0]
+
+    def progress(**fields):
+        with _upload_jobs_lock:
+            job.update(fields)
+            snapshot = dict(job)
+        # DB 기록은 UPLOAD_JOB_SAVE_INTERVAL마다 (실시간 값은 메모리에서 조회)
+        # file_id는 재시작 후 남은 행을 지우는 데 필요하므로 바로 기록
+        now = time.monotonic()
+        if 'file_id' in fields or now - last_saved[0] >= UPLOAD_JOB_SAVE_INTERVAL:
+            last_saved[0] = now
+            store_upload_job(job_id, snapshot)
+
+    progress(status='running', stage='parse', started_at=datetime.now().isoformat())
+    try:
+        success, result = process_and_save_file(filepath, job['file_type'], job['original_name'], job['saved_name'], progress)
+    except Exception as e:
+        success, result = False, str(e)
+
+    if success:
+        warm_report_cache()
+        fields = {'status': 'done', 'stage': 'done', 'rows_written': result}
+    else:
+        fields = {'status': 'failed', 'stage': 'failed', 'error': result}
+    fields['finished_at'] = datetime.now().isoformat()
+    with _upload_jobs_lock:
+        job.update(fields)
+        snapshot = dict(job)
+    store_upload_job(job_id, snapshot)
+    print(f"[job] {job['original_name']}: {fields['status']} ({job['rows_written']:,}행, 엔진 {job.get('engine')})")
+
+def get_upload_job(job_id):
+    """작업 진행 상황 (이 서버에서 처리 중이면 메모리 값, 아니면 DB 기록)
+
+    경과 시간(elapsed)과 초당 저장 행 수(rows_per_sec)를 더해서 반환한다.
+    """
+    with _upload_jobs_lock:
+        job = dict(_upload_jobs[job_id]) if job_id in _upload_jobs else None
+    if job is None:
+        job = get_upload_job_record(job_id)
+        if job is None:
+            return None
+
+    if job.get('started_at'):
+        finished = datetime.fromisoformat(job['finished_at']) if job.get('finished_at') else datetime.now()
+        elapsed = (finished - datetime.fromisoformat(job['started_at'])).total_seconds()
+        job['elapsed'] = round(elapsed, 2)
+        job['rows_per_sec'] = round((job.get('rows_written') or 0) / elapsed) if elapsed > 0 else None
+    return job
+
 # ============ 라우트 ============
 
 @app.route('/')
@@ -209,7 +361,7 @@ def upload_page():
     try:
         files = get_upload_files()
         is_admin = session.get('role') == 'admin'
-        return render_template('upload.html', files=files, is_admin=is_admin)
+        return render_template('upload.html', files=files, is_admin=is_admin, raw_upload_limit=RAW_UPLOAD_MAX_BYTES)
     except Exception as e:
         import traceback
         error_msg = f"Error: {str(e)}\n{traceback.format_exc()}"
@@ -355,6 +507,8 @@ def api_store_sales():
 def api_supplier_category():
     file_id = request.args.get('file_id', type=int)
     data = get_supplier_category_matrix(file_id)
+    if wants_ndjson():
+        return ndjson_response(data)  # 업체 단위로 한 줄씩
     return jsonify(data)
 
 @app.route('/api/store-category')
@@ -363,34 +517,78 @@ def api_store_category():
     """매장별 상세 분석 - 매장→카테고리→상품 드릴다운"""
     file_id = request.args.get('file_id', type=int)
     data = get_store_category_matrix(file_id)
+    if wants_ndjson():
+        return ndjson_response(data)  # 매장 단위로 한 줄씩
     return jsonify(data)
 
+@app.route('/api/dashboard-bundle')
+@login_required
+def api_dashboard_bundle():
+    """대시보드 전체 패널 한 번에 조회 (필터는 /api/summary 등과 동일)"""
+    file_id = request.args.get('file_id', type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    try:
+        data = get_dashboard_bundle(file_id, start_date, end_date)
+        return jsonify({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/upload', methods=['POST'])
 @admin_required
 def api_upload():
-    """파일 업로드 API"""
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'error': '파일이 없습니다.'})
+    """파일 업로드 API
 
-    file = request.files['file']
-    file_type = request.form.get('file_type', 'custom')
+    multipart(file 필드) 또는 파일 원본 그대로(Content-Type: application/octet-stream,
+    ?filename=&file_type=)를 받는다. 원본은 디스크에 조금씩 복사한 뒤 서버에서 스트리밍 파싱한다.
+    """
+    if request.mimetype == 'application/octet-stream':
+        original_name = request.args.get('filename', '')
+        file_type = request.args.get('file_type', 'custom')
+        upload = None
+    else:
+        if 'file' not in request.files:
+            return jsonify({'success': False, 'error': '파일이 없습니다.'})
+        upload = request.files['file']
+        original_name = upload.filename
+        file_type = request.form.get('file_type', 'custom')
 
-    if file.filename == '':
+    if original_name == '':
         return jsonify({'success': False, 'error': '파일이 선택되지 않았습니다.'})
 
-    if file and allowed_file(file.filename):
-        original_name = file.filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if allowed_file(original_name):
+        # 같은 초에 여러 파일이 올라와도 작업끼리 파일을 덮어쓰지 않도록 임의 접미사 추가
+        timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
         ext = original_name.rsplit('.', 1)[1].lower()
         safe_name = f"{timestamp}_{secure_filename(original_name)}"
+        if not safe_name.lower().endswith('.' + ext):
+            # 한글 파일명은 secure_filename에서 확장자 점까지 지워지므로 확장자만 붙임
+            safe_name = f"{timestamp}.{ext}"
 
         filepath = os.path.join(UPLOAD_DIR, safe_name)
-        file.save(filepath)
+        if upload is not None:
+            upload.save(filepath)
+        else:
+            with open(filepath, 'wb') as f:
+                shutil.copyfileobj(request.stream, f, UPLOAD_COPY_BUFFER)
+
+        # 작업 큐에 넘기고 바로 응답 (?wait=1이면 예전처럼 끝날 때까지 처리)
+        if UPLOAD_JOBS_ENABLED and request.args.get('wait') != '1':
+            job = submit_upload_job(filepath, file_type, original_name, safe_name)
+            return jsonify({
+                'success': True,
+                'job_id': job['id'],
+                'status': job['status'],
+                'filename': original_name,
+                'saved_as': safe_name,
+                'message': '파일을 받았습니다. 서버에서 처리 중입니다.'
+            }), 202
 
         # 데이터 처리 및 DB 저장
         success, result = process_and_save_file(filepath, file_type, original_name, safe_name)
 
         if success:
+            warm_report_cache()
             return jsonify({
                 'success': True,
                 'filename': original_name,
@@ -403,10 +601,26 @@ def api_upload():
 
     return jsonify({'success': False, 'error': '허용되지 않는 파일 형식입니다. (xls, xlsx, csv만 가능)'})
 
+@app.route('/api/jobs/<job_id>')
+@admin_required
+def api_upload_job(job_id):
+    """업로드 작업 진행 상황 (단계, 읽은/저장한 행 수, 초당 저장 행 수)"""
+    try:
+        job = get_upload_job(job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': '작업을 찾을 수 없습니다.'}), 404
+        return jsonify({'success': True, 'job': job})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/upload-chunk', methods=['POST'])
 @admin_required
 def api_upload_chunk():
-    """청크 데이터 업로드 API (브라우저에서 파싱된 JSON 데이터 수신)"""
+    """청크 데이터 업로드 API (브라우저에서 파싱된 JSON 데이터 수신)
+
+    청크마다 upload_chunks에 기록하므로 재전송되거나 중복된 청크는 다시 저장하지 않는다.
+    upload_key를 같이 보내면 첫 청크가 재전송되어도 같은 파일에 이어서 저장한다.
+    """
     try:
         data = request.get_json()
         if not data:
@@ -419,33 +633,38 @@ def api_upload_chunk():
         total_chunks = data.get('total_chunks', 1)
         original_name = data.get('original_name', 'unknown')
         data_type = data.get('data_type', '')  # 월별 데이터용
+        upload_key = data.get('upload_key') or None
 
         if not rows:
             return jsonify({'success': False, 'error': '데이터 행이 없습니다.'})
 
-        # 첫 번째 청크면 upload_files에 기록
-        if chunk_index == 0:
-            file_id = save_upload_file(f"chunk_{datetime.now().strftime('%Y%m%d_%H%M%S')}", original_name, file_type, 0)
-
-        # DataFrame으로 변환
-        df = pd.DataFrame(rows)
-
-        # 디버깅: 컬럼명과 첫 행 출력
-        print(f"[DEBUG] chunk_index={chunk_index}, rows_count={len(rows)}")
-        print(f"[DEBUG] columns: {list(df.columns)[:10]}")
-        if len(df) > 0:
-            print(f"[DEBUG] first_row: {df.iloc[0].to_dict()}")
-
-        # 데이터 저장
-        if file_type == 'original':
-            inserted = save_sales_data(df, file_id)
-        elif file_type == 'monthly':
-            inserted = save_monthly_data(df, file_id, data_type)
-        else:
-            inserted = save_sales_data(df, file_id)
-
-        # row_count 업데이트
-        update_file_row_count(file_id, inserted, increment=True)
+        # 첫 번째 청크면 upload_files에 기록 (같은 upload_key면 기존 파일)
+        if chunk_index == 0 or not file_id:
+            file_id = save_upload_file(f"chunk_{datetime.now().strftime('%Y%m%d_%H%M%S')}", original_name, file_type, 0,
+                                       upload_key=upload_key)
+
+        def save_rows():
+            # DataFrame으로 변환
+            df = pd.DataFrame(rows)
+            if file_type == 'monthly':
+                return save_monthly_data(df, file_id, data_type, strict=True)
+            return save_sales_data(df, file_id, strict=True)
+
+        status, inserted = save_upload_chunk(file_id, chunk_index, chunk_checksum(rows), save_rows)
+        print(f"[chunk] file_id={file_id} chunk={chunk_index + 1}/{total_chunks} {status} ({inserted}건)")
+
+        if status == 'conflict':
+            return jsonify({'success': False, 'file_id': file_id, 'chunk_index': chunk_index, 'status': status,
+                            'error': f'청크 {chunk_index + 1}이(가) 다른 내용으로 이미 저장되어 있습니다.'}), 409
+        if status == 'pending':
+            return jsonify({'success': False, 'file_id': file_id, 'chunk_index': chunk_index, 'status': status,
+                            'retry': True, 'error': f'청크 {chunk_index + 1}을(를) 다른 요청이 처리 중입니다.'}), 409
+
+        # 모든 청크가 저장되면 리포트 미리 생성 (병렬 전송이라 마지막 번호가 마지막에 끝난다는 보장이 없음)
+        if status == 'saved':
+            stored = [chunk for chunk in get_upload_chunks(file_id) if chunk['row_count'] is not None]
+            if len(stored) >= total_chunks:
+                warm_report_cache()
 
         return jsonify({
             'success': True,
@@ -453,13 +672,46 @@ def api_upload_chunk():
             'inserted': inserted,
             'chunk_index': chunk_index,
             'total_chunks': total_chunks,
+            'status': status,
             'message': f'청크 {chunk_index + 1}/{total_chunks} 저장 완료 ({inserted}건)'
+                       + (' - 이미 저장된 청크' if status == 'duplicate' else '')
         })
 
     except Exception as e:
         import traceback
         return jsonify({'success': False, 'error': str(e), 'trace': traceback.format_exc()})
 
+@app.route('/api/upload-status')
+@admin_required
+def api_upload_status():
+    """분할 업로드 진행 상태 (이어 올리기용)
+
+    file_id 또는 upload_key로 조회하며, 저장이 끝난 청크 번호 목록을 돌려준다.
+    브라우저는 이 목록에 없는 청크만 다시 보내면 된다.
+    """
+    try:
+        file_id = request.args.get('file_id', type=int)
+        upload_key = request.args.get('upload_key')
+        if not file_id and upload_key:
+            file_id = find_upload_file_id(upload_key)
+        if not file_id:
+            return jsonify({'success': True, 'file_id': None, 'chunks': [], 'pending': [], 'row_count': 0})
+
+        upload_file = get_upload_file(file_id)
+        if upload_file is None:
+            return jsonify({'success': False, 'error': '파일을 찾을 수 없습니다.'}), 404
+
+        chunks = get_upload_chunks(file_id)
+        return jsonify({
+            'success': True,
+            'file_id': file_id,
+            'chunks': [chunk['chunk_index'] for chunk in chunks if chunk['row_count'] is not None],
+            'pending': [chunk['chunk_index'] for chunk in chunks if chunk['row_count'] is None],
+            'row_count': upload_file.get('row_count') or 0
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/delete-file', methods=['POST'])
 @admin_required
 def api_delete_file():
@@ -609,68 +861,74 @@ def api_data_counts():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/cache-stats')
+@admin_required
+def api_cache_stats():
+    """분류명/상품명 정규화 캐시 상태 (함수별 크기, 적중/누락 횟수, 적중률)"""
+    try:
+        return jsonify({'success': True, 'normalizers': get_normalizer_cache_stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/custom-data')
 @login_required
 def api_custom_data():
-    """파일의 원본 데이터 조회 (커스텀 뷰어용)"""
+    """파일의 원본 데이터 페이지 조회 (커스텀 뷰어용)
+
+    파라미터: file_id, page_size, after_id/after_value(이전 응답의 next_cursor),
+    sort, order(asc/desc), filter_<컬럼>=값. 첫 페이지(커서 없음)에서만 total을 센다.
+    NDJSON 요청이면 page_size 대신 커서 위치부터 끝까지 한 행씩 스트리밍한다.
+    """
     file_id = request.args.get('file_id', type=int)
-    limit = request.args.get('limit', 100000, type=int)  # 10만행까지 허용
 
     if not file_id:
         return jsonify({'success': False, 'error': '파일 ID가 필요합니다.'})
 
     try:
         # 파일 정보 조회
-        files = get_upload_files()
-        file_info = next((f for f in files if f['id'] == file_id), None)
+        file_info = get_upload_file(file_id)
 
         if not file_info:
             return jsonify({'success': False, 'error': '파일을 찾을 수 없습니다.'})
 
-        # 파일 타입에 따라 다른 테이블에서 조회
-        if IS_LOCAL:
-            import sqlite3
-            conn = sqlite3.connect(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sales_data.db'))
-            conn.row_factory = sqlite3.Row
+        after_id = request.args.get('after_id', type=int)
+        after_value = request.args.get('after_value')
+        if after_value is not None:
+            try:
+                after_value = json.loads(after_value)  # 커서 값은 JSON (null/숫자/문자열 구분)
+            except ValueError:
+                pass
+        filters = {k[len('filter_'):]: v for k, v in request.args.items() if k.startswith('filter_')}
+
+        if wants_ndjson():
+            return ndjson_response(iter_custom_data(
+                file_id, file_info['file_type'],
+                after_id=after_id,
+                after_value=after_value,
+                sort=request.args.get('sort'),
+                descending=request.args.get('order') == 'desc',
+                filters=filters
+            ))
+
+        page = get_custom_data_page(
+            file_id, file_info['file_type'],
+            page_size=request.args.get('page_size', CUSTOM_DATA_PAGE_SIZE, type=int),
+            after_id=after_id,
+            after_value=after_value,
+            sort=request.args.get('sort'),
+            descending=request.args.get('order') == 'desc',
+            filters=filters,
+            with_total=after_id is None
+        )
 
-            if file_info['file_type'] == 'monthly':
-                cursor = conn.execute(f'SELECT * FROM monthly_sales WHERE file_id = ? LIMIT ?', (file_id, limit))
-            else:
-                cursor = conn.execute(f'SELECT * FROM sales_data WHERE file_id = ? LIMIT ?', (file_id, limit))
-
-            rows = [dict(row) for row in cursor.fetchall()]
-            columns = list(rows[0].keys()) if rows else []
-            conn.close()
-
-            # 내부 컬럼 제외
-            exclude_cols = ['id', 'file_id', 'created_at']
-            columns = [c for c in columns if c not in exclude_cols]
-            for row in rows:
-                for col in exclude_cols:
-                    row.pop(col, None)
-
-            return jsonify({
-                'success': True,
-                'data': rows,
-                'columns': columns,
-                'total': len(rows),
-                'file_info': file_info
-            })
-        else:
-            # Supabase
-            if file_info['file_type'] == 'monthly':
-                data = supabase_select('monthly_sales', '*', f'file_id=eq.{file_id}')
-            else:
-                data = supabase_select('sales_data', '*', f'file_id=eq.{file_id}')
-
-            columns = list(data[0].keys()) if data else []
-            return jsonify({
-                'success': True,
-                'data': data[:limit],
-                'columns': columns,
-                'total': len(data),
-                'file_info': file_info
-            })
+        return jsonify({
+            'success': True,
+            'data': page['rows'],
+            'columns': page['columns'],
+            'total': page.get('total'),
+            'next_cursor': page['next_cursor'],
+            'file_info': file_info
+        })
 
     except Exception as e:
         import traceback
@@ -686,115 +944,288 @@ def api_version():
     })
 
 def flatten_supplier_category_matrix(data):
-    """업체-카테고리-상품 계층 데이터를 평탄화
-    
-    get_supplier_category_matrix()는 categories를 리스트로 반환함
-    각 category는 {'카테고리': name, 'products': [...]} 구조
+    """업체-카테고리-상품 계층 데이터를 평탄화 (리스트)"""
+    return list(iter_supplier_category_rows(data))
+
+def iter_supplier_category_rows(data):
+    """업체-카테고리-상품 계층 데이터를 옵션(개별상품) 단위 행으로 하나씩 넘겨줌
+
+    get_supplier_category_matrix()는 업체 → categories → product_groups → options 구조
     """
-    flat_data = []
     for supplier in data:
         업체명 = supplier.get('업체명', '')
-        categories = supplier.get('categories', [])
-        # categories는 리스트 구조
-        for cat in categories:
+        for cat in supplier.get('categories', []):
             카테고리 = cat.get('카테고리', '')
-            for product in cat.get('products', []):
-                flat_data.append({
-                    '업체명': 업체명,
-                    '카테고리': 카테고리,
-                    '상품코드': product.get('상품코드', ''),
-                    '상품명': product.get('상품명', ''),
-                    '매출액': product.get('매출액', 0),
-                    '판매량': product.get('판매량', 0)
-                })
-    return flat_data
+            for group in cat.get('product_groups', []):
+                for option in group.get('options', []):
+                    yield {
+                        '업체명': 업체명,
+                        '카테고리': 카테고리,
+                        '기본코드': group.get('기본코드', ''),
+                        '상품코드': option.get('상품코드', ''),
+                        '상품명': option.get('상품명', ''),
+                        '옵션명': option.get('옵션명', ''),
+                        '매출액': option.get('매출액', 0),
+                        '판매량': option.get('판매량', 0)
+                    }
+
+# ============ 내보내기 (CSV 스트리밍 / XLSX write_only) ============
+
+EXPORT_FLUSH_BYTES = 64 * 1024  # CSV를 이 크기만큼 모아서 전송
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# data_type → (파일명, 행 조회 함수, 날짜 필터 사용 여부)
+EXPORT_TYPES = {
+    'supplier': ('업체별_매출', get_sales_by_supplier, False),
+    'category': ('카테고리별_매출', get_sales_by_category, False),
+    'products': ('베스트셀러', get_top_products, False),
+    'daily': ('일별매출', get_daily_sales, True),
+    'weekly': ('주간별매출', get_weekly_sales, True),
+    'store': ('매장별_매출', get_store_sales, True),
+    'matrix': ('업체_카테고리_상품', lambda file_id=None: iter_supplier_category_rows(get_supplier_category_matrix(file_id)), False),
+    'monthly': ('월별_매출', get_monthly_sales, True),
+}
+
+def iter_csv(rows):
+    """dict 행 iterable을 CSV 텍스트 조각으로 (utf-8-sig용 BOM 포함, 첫 행의 키가 헤더)
+
+    DataFrame을 만들지 않고 행을 받는 대로 EXPORT_FLUSH_BYTES 단위로 내보낸다.
+    """
+    yield '\ufeff'  # 엑셀에서 한글이 깨지지 않도록 BOM (UTF-8로 인코딩되면 utf-8-sig와 동일)
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row.keys()), extrasaction='ignore', lineterminator='\n')
+            writer.writeheader()
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def write_csv(output, rows):
+    """iter_csv 조각을 바이너리 파일에 UTF-8로 기록"""
+    for chunk in iter_csv(rows):
+        output.write(chunk.encode('utf-8'))
+
+def write_xlsx_sheet(workbook, title, rows):
+    """write_only 워크북에 시트 하나를 행 단위로 기록 (첫 행의 키가 헤더)"""
+    sheet = workbook.create_sheet(title=title)
+    columns = None
+    for row in rows:
+        if columns is None:
+            columns = list(row.keys())
+            sheet.append(columns)
+        sheet.append([row.get(col) for col in columns])
+
+def write_xlsx(output, sheets):
+    """[(시트명, 행 iterable)]를 write_only 워크북으로 output에 저장
+
+    write_only 모드라 셀을 메모리에 쌓지 않고 시트별 임시 파일로 바로 쓴다.
+    """
+    workbook = Workbook(write_only=True)
+    for title, rows in sheets:
+        write_xlsx_sheet(workbook, title, rows)
+    workbook.save(output)
+
+def build_xlsx_file(sheets):
+    """xlsx를 BytesIO 대신 임시 파일에 저장 (send_file이 조금씩 읽어 보냄)"""
+    output = tempfile.TemporaryFile()
+    write_xlsx(output, sheets)
+    output.seek(0)
+    return output
+
+def export_filters(uses_dates=True):
+    """요청의 file_id(/start_date/end_date) 필터 - 조회 함수 인자 순서대로"""
+    filters = {'file_id': request.args.get('file_id', type=int)}
+    if uses_dates:
+        filters['start_date'] = request.args.get('start_date') or None
+        filters['end_date'] = request.args.get('end_date') or None
+    return filters
+
+def write_report(output, filters):
+    """종합 리포트 xlsx 작성
+
+    여섯 시트를 따로 조회하지 않고 대시보드 묶음 한 번으로 계산한다
+    (Supabase는 RPC 한 번 또는 공유 스캔, 대시보드에서 이미 불러왔으면 캐시 적중).
+    """
+    bundle = get_dashboard_bundle(**filters)
+
+    # 시트 순서는 고정, 하나씩 write_only로 기록
+    write_xlsx(output, [
+        ('업체별매출', bundle['suppliers']),
+        ('카테고리별', bundle['categories']),
+        ('베스트셀러', bundle['products']),
+        ('일별매출', bundle['daily']),
+        ('매장별', bundle['stores']),
+        ('업체_카테고리_상품', iter_supplier_category_rows(bundle['supplier_category'])),
+    ])
+
+# ============ 리포트 파일 캐시 (data_version 기준) ============
+
+REPORT_DIR = os.path.join(DATA_DIR, 'reports')
+REPORT_CACHE_ENABLED = os.environ.get('REPORT_CACHE', '1') != '0'
+# 업로드 직후 기본 종합 리포트를 미리 생성 (Vercel은 응답 후 스레드가 멈추므로 기본 끔)
+REPORT_WARM_AFTER_UPLOAD = os.environ.get('REPORT_WARM', '0' if IS_VERCEL else '1') != '0'
+# 현재 data_version 리포트도 필터 조합마다 파일이 생기므로 개수 상한 (오래 안 쓴 파일부터 삭제)
+REPORT_CACHE_MAX_FILES = int(os.environ.get('REPORT_CACHE_MAX_FILES', '50' if IS_VERCEL else '200'))
+
+_report_locks = {}
+_report_locks_lock = threading.Lock()
+
+def cached_report_path(kind, fmt, filters, write):
+    """data_version 기준으로 캐시된 리포트 파일 경로 (없으면 write(output)로 생성)
+
+    파일명은 {종류}-{필터 해시}-{data_version}.{확장자}라서 업로드/삭제로 data_version이
+    바뀌면 새로 만든다. 새 파일을 만들 때마다 prune_report_cache로 디렉터리를 정리한다.
+    임시 파일에 쓴 뒤 이름을 바꾸므로 생성 중인 파일이 내려가지 않는다.
+    캐시를 끄거나 data_version을 알 수 없으면 None.
+    """
+    version = get_data_version() if REPORT_CACHE_ENABLED else None
+    if version is None:
+        return None
+
+    key = hashlib.sha1(json.dumps([kind, fmt, filters], sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    prefix = f'{kind}-{key}-'
+    filename = f'{prefix}{secure_filename(str(version))}.{fmt}'
+    path = os.path.join(REPORT_DIR, filename)
+    if touch_report_file(path):
+        return path
+
+    # 같은 리포트를 여러 요청이 동시에 만들지 않도록 키별 잠금
+    with _report_locks_lock:
+        lock = _report_locks.setdefault(prefix, threading.Lock())
+    with lock:
+        if touch_report_file(path):
+            return path
+
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=REPORT_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                write(output)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        prune_report_cache(version, keep=filename)
+    return path
+
+def touch_report_file(path):
+    """캐시 파일이 있으면 수정 시각을 지금으로 바꾸고 True (개수 상한 정리 시 최근 사용 순서로 씀)"""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+def prune_report_cache(version, keep=None):
+    """리포트 캐시 디렉터리 정리
+
+    현재 data_version이 아닌 파일은 종류·필터와 관계없이 모두 지우고, 남은 파일이
+    REPORT_CACHE_MAX_FILES개를 넘으면 최근에 쓰지 않은 파일부터 지운다. 임시 파일은 생성 도중
+    멈춘 것(1시간 이상 지난 것)만 지운다.
+    """
+    version_suffix = f'-{secure_filename(str(version))}'
+    current = []
+    for name in os.listdir(REPORT_DIR):
+        if name == keep:
+            continue
+        path = os.path.join(REPORT_DIR, name)
+        try:
+            if name.endswith('.tmp'):
+                if time.time() - os.path.getmtime(path) > 3600:
+                    os.remove(path)
+            elif os.path.splitext(name)[0].endswith(version_suffix):
+                current.append((os.path.getmtime(path), path))
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+    current.sort(reverse=True)
+    for _, path in current[max(REPORT_CACHE_MAX_FILES - 1, 0):]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def send_report_file(path, download_name, mimetype):
+    """캐시 파일 전송 - ETag/Last-Modified로 조건부 GET(304) 지원"""
+    response = send_file(path, as_attachment=True, download_name=download_name, mimetype=mimetype, conditional=True)
+    response.headers['Cache-Control'] = 'private, no-cache'  # 매번 재검증 (data_version이 바뀌면 파일이 바뀜)
+    return response
+
+def warm_report_cache():
+    """업로드 직후 기본(필터 없는) 종합 리포트를 백그라운드에서 미리 생성"""
+    if not (REPORT_CACHE_ENABLED and REPORT_WARM_AFTER_UPLOAD):
+        return
+
+    def run():
+        try:
+            filters = {'file_id': None, 'start_date': None, 'end_date': None}
+            cached_report_path('report', 'xlsx', filters, lambda output: write_report(output, filters))
+        except Exception as e:
+            print(f"리포트 미리 생성 실패: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
 
 @app.route('/export/<data_type>')
 @login_required
 def export_data(data_type):
-    """데이터 Excel로 내보내기"""
-    from io import BytesIO
+    """데이터 Excel/CSV로 내보내기 (format=csv, file_id/start_date/end_date 필터 지원)"""
+    if data_type not in EXPORT_TYPES:
+        return jsonify({'error': 'Invalid data type'}), 400
 
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-    if data_type == 'supplier':
-        data = get_sales_by_supplier()
-        df = pd.DataFrame(data)
-        filename = f'업체별_매출_{timestamp}.xlsx'
-    elif data_type == 'category':
-        data = get_sales_by_category()
-        df = pd.DataFrame(data)
-        filename = f'카테고리별_매출_{timestamp}.xlsx'
-    elif data_type == 'products':
-        data = get_top_products()
-        df = pd.DataFrame(data)
-        filename = f'베스트셀러_{timestamp}.xlsx'
-    elif data_type == 'daily':
-        data = get_daily_sales()
-        df = pd.DataFrame(data)
-        filename = f'일별매출_{timestamp}.xlsx'
-    elif data_type == 'weekly':
-        data = get_weekly_sales()
-        df = pd.DataFrame(data)
-        filename = f'주간별매출_{timestamp}.xlsx'
-    elif data_type == 'store':
-        data = get_store_sales()
-        df = pd.DataFrame(data)
-        filename = f'매장별_매출_{timestamp}.xlsx'
-    elif data_type == 'matrix':
-        data = flatten_supplier_category_matrix(get_supplier_category_matrix())
-        df = pd.DataFrame(data)
-        filename = f'업체_카테고리_상품_{timestamp}.xlsx'
-    elif data_type == 'monthly':
-        data = get_monthly_sales()
-        df = pd.DataFrame(data)
-        filename = f'월별_매출_{timestamp}.xlsx'
-    else:
-        return jsonify({'error': 'Invalid data type'}), 400
+    name, load_rows, uses_dates = EXPORT_TYPES[data_type]
+    filters = export_filters(uses_dates)
 
     # 포맷 선택 (기본 xlsx, csv 지원)
-    fmt = request.args.get('format', 'xlsx')
-    
-    output = BytesIO()
+    fmt = 'csv' if request.args.get('format') == 'csv' else 'xlsx'
+    filename = f'{name}_{timestamp}.{fmt}'
+    mimetype = 'text/csv' if fmt == 'csv' else XLSX_MIMETYPE
+
     if fmt == 'csv':
-        filename = filename.replace('.xlsx', '.csv')
-        df.to_csv(output, index=False, encoding='utf-8-sig')
-        mimetype = 'text/csv'
+        write = lambda output: write_csv(output, load_rows(*filters.values()))
     else:
-        df.to_excel(output, index=False, engine='openpyxl')
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    output.seek(0)
+        write = lambda output: write_xlsx(output, [(name, load_rows(*filters.values()))])
 
+    path = cached_report_path(data_type, fmt, filters, write)
+    if path:
+        return send_report_file(path, filename, mimetype)
+
+    # 캐시를 쓸 수 없으면 CSV는 스트리밍, XLSX는 임시 파일로
+    if fmt == 'csv':
+        response = Response(stream_with_context(iter_csv(load_rows(*filters.values()))), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        return response
+    output = build_xlsx_file([(name, load_rows(*filters.values()))])
     return send_file(output, as_attachment=True, download_name=filename, mimetype=mimetype)
 
 @app.route('/save-report', methods=['POST', 'GET'])
 @login_required
 def save_report():
-    """현재 대시보드 데이터를 리포트로 다운로드"""
-    from io import BytesIO
-
+    """현재 대시보드 데이터를 리포트로 다운로드 (file_id/start_date/end_date 필터 지원)"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f'판매현황_종합리포트_{timestamp}.xlsx'
+    filters = export_filters()
 
-    # 메모리에서 Excel 파일 생성 (Vercel 서버리스 호환)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        pd.DataFrame(get_sales_by_supplier()).to_excel(writer, sheet_name='업체별매출', index=False)
-        pd.DataFrame(get_sales_by_category()).to_excel(writer, sheet_name='카테고리별', index=False)
-        pd.DataFrame(get_top_products()).to_excel(writer, sheet_name='베스트셀러', index=False)
-        pd.DataFrame(get_daily_sales()).to_excel(writer, sheet_name='일별매출', index=False)
-        pd.DataFrame(get_store_sales()).to_excel(writer, sheet_name='매장별', index=False)
-        pd.DataFrame(flatten_supplier_category_matrix(get_supplier_category_matrix())).to_excel(writer, sheet_name='업체_카테고리_상품', index=False)
+    path = cached_report_path('report', 'xlsx', filters, lambda output: write_report(output, filters))
+    if path:
+        return send_report_file(path, filename, XLSX_MIMETYPE)
 
+    output = tempfile.TemporaryFile()
+    write_report(output, filters)
     output.seek(0)
-
-    # 메모리에서 직접 반환 (파일 저장 없이)
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    return send_file(output, as_attachment=True, download_name=filename, mimetype=XLSX_MIMETYPE)
 
 # ============ 상품 이미지 API (이지어드민 연동) ============
 
@@ -832,10 +1263,15 @@ def api_product_images():
     Query params:
         search: 검색 키워드 (상품명)
         limit: 조회 개수 (기본 100)
+        stream: 1이면 NDJSON 스트리밍 (Accept: application/x-ndjson도 동일)
     """
     search = request.args.get('search')
 
     try:
+        if wants_ndjson():
+            # 검색 결과는 최대 100건이라 그대로, 전체 목록은 generator로 스트리밍
+            return ndjson_response(search_product_images(search) if search else iter_all_product_images())
+
         if search:
             data = search_product_images(search)
         else:
@@ -879,6 +1315,9 @@ def catalog_page():
 def api_catalog():
     """공개 카탈로그 API (로그인 불필요)"""
     try:
+        if wants_ndjson():
+            return ndjson_response(iter_all_product_images())
+
         data = get_all_product_images()
         return jsonify({
             'success': True,
@@ -925,12 +1364,22 @@ def api_inventory():
         search: 검색 키워드
         low_stock: true면 재고 부족 상품만
         limit: 조회 개수
+        stream: 1이면 NDJSON 스트리밍 (Accept: application/x-ndjson도 동일)
     """
     search = request.args.get('search')
     low_stock = request.args.get('low_stock')
     limit = request.args.get('limit', type=int)
 
     try:
+        if wants_ndjson():
+            if search:
+                rows = search_inventory(search)  # 최대 100건
+            elif low_stock == 'true':
+                rows = iter_low_stock_items(threshold=10)
+            else:
+                rows = iter_all_inventory(limit=limit)
+            return ndjson_response(rows)
+
         if search:
             data = search_inventory(search)
         elif low_stock == 'true':
@@ -972,11 +1421,21 @@ def inventory_page():
     return render_template('inventory.html', summary=summary)
 
 
-# Vercel 서버리스에서는 앱 로드 시 DB 초기화
-init_database()
+def startup():
+    """서버 시작 시 DB 초기화와 멈춘 업로드 작업 정리"""
+    init_database()
+    # 이전 실행에서 처리 도중 멈춘 업로드 작업 정리 (맡은 프로세스가 끝난 작업만)
+    fail_interrupted_upload_jobs('서버 재시작으로 처리가 중단되었습니다. 파일을 다시 업로드해주세요.')
+
+# Vercel/WSGI 서버는 이 모듈을 import해서 쓰므로 로드 시 초기화한다.
+# python app.py로 실행하면 아래 __main__에서 초기화하고, 시트 작업 프로세스(spawn)가
+# 이 파일을 __mp_main__으로 다시 불러올 때는 건너뛴다 (parent_process()는 이 시점에 아직 None).
+if __name__ not in ('__main__', '__mp_main__'):
+    startup()
 
 if __name__ == '__main__':
     print("데이터베이스 초기화 중...")
+    startup()
     print(f"DB 경로: {DB_PATH if 'DB_PATH' in dir() else 'N/A'}")
     print("서버 시작: http://localhost:8080")
     app.run(debug=True, host='0.0.0.0', port=8080)
@@ -1,6 +1,19 @@
 import os
+import atexit
+import threading
+import time
+import uuid
+import hashlib
+import inspect
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from datetime import datetime, timezone, timedelta
 import pandas as pd
+import numpy as np
 import httpx
 import json
 
@@ -23,6 +36,80 @@ if IS_LOCAL:
     sqlite3 = _sqlite3
     DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sales_data.db')
 
+# HTTP 연결 풀 설정 (모든 supabase_* 함수가 하나의 keep-alive 클라이언트를 재사용)
+HTTP_MAX_CONNECTIONS = int(os.environ.get('SUPABASE_MAX_CONNECTIONS', '20'))
+HTTP_MAX_KEEPALIVE = int(os.environ.get('SUPABASE_MAX_KEEPALIVE', '10'))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('SUPABASE_KEEPALIVE_EXPIRY', '30'))
+HTTP2_ENABLED = os.environ.get('SUPABASE_HTTP2', '0') != '0'  # h2 패키지 필요 (pip install httpx[http2])
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """공유 httpx.Client 반환 (최초 호출 시 생성)
+
+    매 요청마다 TCP+TLS 핸드셰이크를 하지 않도록 연결 풀을 프로세스 전체에서 재사용.
+    타임아웃은 호출하는 쪽에서 요청 단위로 지정한다.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                try:
+                    _http_client = _new_http_client(HTTP2_ENABLED)
+                except ImportError:
+                    # httpx는 http2=True인데 h2 패키지가 없으면 클라이언트 생성 시 ImportError를 낸다
+                    print("SUPABASE_HTTP2 설정됨 - h2 패키지가 없어 HTTP/1.1로 연결합니다.")
+                    _http_client = _new_http_client(False)
+    return _http_client
+
+def _new_http_client(http2):
+    """연결 풀 설정을 적용한 httpx.Client 생성"""
+    return httpx.Client(
+        timeout=60.0,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+    )
+
+def close_http_client():
+    """공유 httpx.Client 종료 (프로세스 종료 시 자동 호출)"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+atexit.register(close_http_client)
+
+# SQLite 연결 설정 (스레드마다 연결 하나를 재사용, 끝난 스레드의 연결은 다음 스레드가 이어받음)
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '65536'))  # 연결당 페이지 캐시 (64MB)
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '30'))  # 쓰기 잠금 대기(초)
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '8'))  # 재사용을 위해 보관할 유휴 연결 수
+SQLITE_FETCH_BATCH = int(os.environ.get('SQLITE_FETCH_BATCH', '1000'))  # iter_query가 한 번에 읽는 행 수
+
+# SQLite 대량 적재 설정 (적재하는 동안 연결에 적용)
+SQLITE_BULK_SYNCHRONOUS = os.environ.get('SQLITE_BULK_SYNCHRONOUS', 'NORMAL').upper()  # OFF / NORMAL / FULL
+SQLITE_BULK_JOURNAL_MODE = os.environ.get('SQLITE_BULK_JOURNAL_MODE', 'WAL').upper()  # 빈 값이면 변경 안 함
+
+# 조회 결과 캐시 설정 (키: 함수, 인자, data_version)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '256'))  # 0이면 캐시 끔
+# 분류명/상품명 정규화 함수별 LRU 캐시 크기 (고유 분류명/상품명 수보다 넉넉하게, 0이면 캐시 끔)
+NORMALIZER_CACHE_SIZE = int(os.environ.get('NORMALIZER_CACHE_SIZE', '8192'))
+# 파일 캐시 디렉터리 (Vercel은 warm 인스턴스 간 /tmp가 유지되므로 기본 사용)
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', '/tmp/result_cache' if os.environ.get('VERCEL') else '').strip()
+# data_version 재조회 간격(초) - 로컬 SQLite는 조회가 싸므로 매번 확인
+DATA_VERSION_TTL = float(os.environ.get('DATA_VERSION_TTL', '0' if IS_LOCAL else '5'))
+
+# REST 페이지 크기 (Supabase 기본 최대값) 및 병렬 페이지 조회 워커 수
+SUPABASE_PAGE_SIZE = 1000
+SELECT_MAX_WORKERS = int(os.environ.get('SUPABASE_SELECT_WORKERS', '6'))
+PANEL_MAX_WORKERS = int(os.environ.get('DASHBOARD_PANEL_WORKERS', '4'))  # Supabase 패널별 조회 동시 실행 수
+
 def get_supabase_headers():
     """Supabase API 헤더"""
     return {
@@ -32,135 +119,506 @@ def get_supabase_headers():
         'Prefer': 'return=representation'
     }
 
-def supabase_select(table, columns='*', filters=None, order=None, limit=None):
-    """Supabase REST API로 SELECT 쿼리 - 페이지네이션으로 전체 데이터 조회"""
+def parse_count(resp):
+    """content-range 헤더(예: 0-0/12345)에서 전체 건수 추출"""
+    content_range = resp.headers.get('content-range', '*/0')
+    if '/' in content_range:
+        total = content_range.split('/')[-1]
+        return int(total) if total.isdigit() else 0
+    return 0
+
+def supabase_count(table, filters=None):
+    """조건에 맞는 행 수 조회 (Prefer: count=exact + content-range 트릭)"""
+    headers = get_supabase_headers()
+    headers['Prefer'] = 'count=exact'
+    headers['Range'] = '0-0'  # 데이터 최소화
+
+    url = f"{SUPABASE_URL}/rest/v1/{table}?select=id"
+    if filters:
+        url += f"&{filters}"
+
+    response = get_http_client().get(url, headers=headers, timeout=30.0)
+    if response.status_code >= 400 and response.status_code != 416:  # 416: 빈 결과의 Range 요청
+        response.raise_for_status()
+    return parse_count(response)
+
+def supabase_select(table, columns='*', filters=None, order=None, limit=None, parallel=False):
+    """Supabase REST API로 SELECT 쿼리 - 페이지네이션으로 전체 데이터 조회
+
+    기본은 id 기준 keyset 페이지네이션(id=gt.<마지막 id>&order=id.asc)으로,
+    OFFSET처럼 뒤 페이지로 갈수록 느려지지 않는다. 단일 컬럼 order가 주어지면
+    (정렬컬럼, id) 복합 커서를 쓰고, 다중 컬럼 정렬은 OFFSET 방식으로 처리한다.
+
+    parallel=True면 먼저 전체 건수를 조회한 뒤 페이지들을 동시에 가져온다
+    (전체 테이블 집계용). 결과 순서는 순차 조회와 동일하게 유지된다.
+    """
+    if parallel:
+        return _supabase_select_parallel(table, columns, filters, order, limit)
+
     all_data = []
-    page_size = 1000  # Supabase 기본 최대값
+    for page in iter_supabase_pages(table, columns, filters, order, limit):
+        all_data.extend(page)
+    return all_data
+
+def iter_supabase_pages(table, columns='*', filters=None, order=None, limit=None):
+    """supabase_select의 페이지 단위 generator - 받은 페이지를 바로 넘겨준다
+
+    전체 결과를 모으지 않으므로 스트리밍 응답처럼 메모리를 일정하게 유지해야 할 때 쓴다.
+    정렬/커서 규칙은 supabase_select와 같다.
+    """
+    cursor_order = _parse_cursor_order(order)
+    if cursor_order is None or (filters and 'or=' in filters and cursor_order[0] != 'id'):
+        yield from _iter_supabase_offset_pages(table, columns, filters, order, limit)
+        return
+
+    order_col, ascending, nulls_first = cursor_order
+
+    # 커서 값을 읽기 위해 id/정렬 컬럼을 select에 추가 (요청하지 않은 컬럼은 나중에 제거)
+    extra_columns = []
+    if columns != '*':
+        requested = [c.strip() for c in columns.split(',')]
+        for col in ('id', order_col):
+            if col not in requested and col not in extra_columns:
+                extra_columns.append(col)
+        if extra_columns:
+            columns = ','.join(requested + extra_columns)
+
+    if order_col == 'id':
+        order_param = f"id.{'asc' if ascending else 'desc'}"
+    else:
+        nulls = 'nullsfirst' if nulls_first else 'nullslast'
+        order_param = f"{order_col}.{'asc' if ascending else 'desc'}.{nulls},id.asc"
+
+    base_url = f"{SUPABASE_URL}/rest/v1/{table}?select={columns}"
+    if filters:
+        base_url += f"&{filters}"
+    base_url += f"&order={order_param}"
+
+    fetched = 0
+    target_count = limit if limit else float('inf')
+    last_row = None
+
+    client = get_http_client()
+    headers = get_supabase_headers()
+    while fetched < target_count:
+        url = base_url
+        if last_row is not None:
+            url += '&' + _keyset_cursor_filter(order_col, ascending, nulls_first, last_row)
+
+        current_limit = min(SUPABASE_PAGE_SIZE, int(target_count - fetched)) if limit else SUPABASE_PAGE_SIZE
+        url += f"&limit={current_limit}"
+
+        response = client.get(url, headers=headers, timeout=60.0)
+        response.raise_for_status()
+        data = response.json()
+
+        if not data:  # 더 이상 데이터 없음
+            break
+
+        fetched += len(data)
+        last_row = dict(data[-1])
+
+        if extra_columns:
+            for row in data:
+                for col in extra_columns:
+                    row.pop(col, None)
+        yield data
+
+        if len(data) < current_limit:  # 마지막 페이지
+            break
+
+def _parse_cursor_order(order):
+    """order 문자열을 (컬럼, 오름차순 여부, NULL 먼저 여부)로 변환
+
+    keyset 커서로 처리할 수 없는 다중 컬럼 정렬이면 None 반환.
+    PostgreSQL 기본값: ASC는 NULLS LAST, DESC는 NULLS FIRST.
+    """
+    if not order:
+        return 'id', True, False
+    if ',' in order:
+        return None
+
+    parts = order.strip().split('.')
+    col = parts[0]
+    ascending = not (len(parts) > 1 and parts[1] == 'desc')
+    nulls_first = not ascending
+    if 'nullsfirst' in parts[1:]:
+        nulls_first = True
+    elif 'nullslast' in parts[1:]:
+        nulls_first = False
+    return col, ascending, nulls_first
+
+def _quote_filter_value(value):
+    """PostgREST 필터 값 인용 (쉼표/괄호/한글이 포함돼도 안전하도록)"""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return quote(f'"{text}"', safe='')
+
+def _keyset_cursor_filter(order_col, ascending, nulls_first, last_row):
+    """마지막으로 받은 행 다음부터 조회하는 keyset 조건 생성"""
+    last_id = last_row['id']
+    if order_col == 'id':
+        return f"id={'gt' if ascending else 'lt'}.{last_id}"
+
+    last_value = last_row.get(order_col)
+    if last_value is None:
+        if nulls_first:
+            # NULL 구간 이후에는 NULL이 아닌 행 전체가 이어진다
+            return f"or=({order_col}.not.is.null,and({order_col}.is.null,id.gt.{last_id}))"
+        return f"{order_col}=is.null&id=gt.{last_id}"
+
+    value = _quote_filter_value(last_value)
+    op = 'gt' if ascending else 'lt'
+    conditions = [f"{order_col}.{op}.{value}", f"and({order_col}.eq.{value},id.gt.{last_id})"]
+    if not nulls_first:
+        conditions.append(f"{order_col}.is.null")
+    return f"or=({','.join(conditions)})"
+
+def _iter_supabase_offset_pages(table, columns='*', filters=None, order=None, limit=None):
+    """OFFSET 기반 페이지네이션 (keyset 커서로 표현할 수 없는 정렬용)"""
+    fetched = 0
+    page_size = SUPABASE_PAGE_SIZE
     offset = 0
 
     # limit이 지정되면 해당 수만큼만, 아니면 전체 조회
     target_count = limit if limit else float('inf')
 
-    with httpx.Client(timeout=60.0) as client:
-        while len(all_data) < target_count:
-            url = f"{SUPABASE_URL}/rest/v1/{table}?select={columns}"
+    client = get_http_client()
+    while fetched < target_count:
+        url = f"{SUPABASE_URL}/rest/v1/{table}?select={columns}"
 
-            if filters:
-                url += f"&{filters}"
-            if order:
-                url += f"&order={order}"
+        if filters:
+            url += f"&{filters}"
+        if order:
+            url += f"&order={order}"
 
-            # 페이지네이션
-            current_limit = min(page_size, int(target_count - len(all_data))) if limit else page_size
-            url += f"&limit={current_limit}&offset={offset}"
+        # 페이지네이션
+        current_limit = min(page_size, int(target_count - fetched)) if limit else page_size
+        url += f"&limit={current_limit}&offset={offset}"
 
-            response = client.get(url, headers=get_supabase_headers())
-            response.raise_for_status()
-            data = response.json()
+        response = client.get(url, headers=get_supabase_headers(), timeout=60.0)
+        response.raise_for_status()
+        data = response.json()
 
-            if not data:  # 더 이상 데이터 없음
-                break
+        if not data:  # 더 이상 데이터 없음
+            break
 
-            all_data.extend(data)
+        fetched += len(data)
+        yield data
 
-            if len(data) < page_size:  # 마지막 페이지
-                break
+        if len(data) < page_size:  # 마지막 페이지
+            break
+
+        offset += page_size
+
+def _supabase_select_parallel(table, columns, filters, order, limit):
+    """건수 사전 조회 후 페이지를 병렬로 가져와 원래 순서대로 합침"""
+    total = supabase_count(table, filters)
+    if limit:
+        total = min(total, limit)
+    if total <= 0:
+        return []
+
+    url = f"{SUPABASE_URL}/rest/v1/{table}?select={columns}"
+    if filters:
+        url += f"&{filters}"
+    # 페이지 경계가 요청마다 달라지지 않도록 정렬 고정
+    url += f"&order={order or 'id.asc'}"
+
+    client = get_http_client()
+    headers = get_supabase_headers()
+
+    def fetch_page(offset):
+        page_limit = min(SUPABASE_PAGE_SIZE, total - offset)
+        response = client.get(f"{url}&limit={page_limit}&offset={offset}", headers=headers, timeout=60.0)
+        response.raise_for_status()
+        return response.json()
 
-            offset += page_size
+    offsets = list(range(0, total, SUPABASE_PAGE_SIZE))
+    workers = max(1, min(SELECT_MAX_WORKERS, len(offsets)))
+    all_data = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # executor.map은 입력 순서대로 결과를 돌려준다
+        for page in executor.map(fetch_page, offsets):
+            all_data.extend(page)
 
     return all_data
 
 def supabase_insert(table, data):
     """Supabase REST API로 INSERT (bulk 지원)"""
     url = f"{SUPABASE_URL}/rest/v1/{table}"
+    client = get_http_client()
 
     # 대량 데이터는 배치로 분할 (500건씩)
     if isinstance(data, list) and len(data) > 500:
         all_results = []
         for i in range(0, len(data), 500):
             batch = data[i:i+500]
-            with httpx.Client(timeout=120.0) as client:
-                response = client.post(url, headers=get_supabase_headers(), json=batch)
-                if response.status_code >= 400:
-                    print(f"Supabase INSERT error: {response.status_code} - {response.text[:500]}")
-                    response.raise_for_status()
-                result = response.json()
-                if isinstance(result, list):
-                    all_results.extend(result)
+            response = client.post(url, headers=get_supabase_headers(), json=batch, timeout=120.0)
+            if response.status_code >= 400:
+                print(f"Supabase INSERT error: {response.status_code} - {response.text[:500]}")
+                response.raise_for_status()
+            result = response.json()
+            if isinstance(result, list):
+                all_results.extend(result)
         return all_results
 
-    with httpx.Client(timeout=120.0) as client:
-        response = client.post(url, headers=get_supabase_headers(), json=data)
+    response = client.post(url, headers=get_supabase_headers(), json=data, timeout=120.0)
+    if response.status_code >= 400:
+        print(f"Supabase INSERT error: {response.status_code} - {response.text[:500]}")
+        response.raise_for_status()
+    return response.json()
+
+def supabase_upsert(table, data, on_conflict):
+    """Supabase REST API로 UPSERT (on_conflict 컬럼의 unique 인덱스 기준, 500건씩)
+
+    같은 키의 행이 있으면 보낸 컬럼만 갱신하고, 없으면 삽입한다. 반환은 보낸 행 수.
+    """
+    url = f"{SUPABASE_URL}/rest/v1/{table}?on_conflict={quote(on_conflict)}"
+    headers = get_supabase_headers()
+    headers['Prefer'] = 'resolution=merge-duplicates,return=minimal'
+    client = get_http_client()
+
+    sent = 0
+    for i in range(0, len(data), 500):
+        batch = data[i:i+500]
+        response = client.post(url, headers=headers, json=batch, timeout=120.0)
         if response.status_code >= 400:
-            print(f"Supabase INSERT error: {response.status_code} - {response.text[:500]}")
+            print(f"Supabase UPSERT error: {response.status_code} - {response.text[:500]}")
             response.raise_for_status()
-        return response.json()
+        sent += len(batch)
+    return sent
 
 def supabase_update(table, data, filters):
     """Supabase REST API로 UPDATE"""
     url = f"{SUPABASE_URL}/rest/v1/{table}?{filters}"
 
-    with httpx.Client(timeout=30.0) as client:
-        response = client.patch(url, headers=get_supabase_headers(), json=data)
-        response.raise_for_status()
-        return response.json()
+    response = get_http_client().patch(url, headers=get_supabase_headers(), json=data, timeout=30.0)
+    response.raise_for_status()
+    return response.json()
 
 def supabase_delete(table, filters):
     """Supabase REST API로 DELETE"""
     url = f"{SUPABASE_URL}/rest/v1/{table}?{filters}"
 
-    with httpx.Client(timeout=30.0) as client:
-        response = client.delete(url, headers=get_supabase_headers())
-        response.raise_for_status()
-        return True
+    response = get_http_client().delete(url, headers=get_supabase_headers(), timeout=30.0)
+    response.raise_for_status()
+    return True
 
-def supabase_rpc(function_name, params=None):
+def supabase_rpc(function_name, params=None, timeout=30.0):
     """Supabase RPC 함수 호출 (집계 쿼리용)"""
     url = f"{SUPABASE_URL}/rest/v1/rpc/{function_name}"
 
-    with httpx.Client(timeout=30.0) as client:
-        if params:
-            response = client.post(url, headers=get_supabase_headers(), json=params)
+    client = get_http_client()
+    if params:
+        response = client.post(url, headers=get_supabase_headers(), json=params, timeout=timeout)
+    else:
+        response = client.post(url, headers=get_supabase_headers(), timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+# 설치되지 않은 것으로 확인된 RPC 함수 (매 요청마다 404를 다시 받지 않도록 기억)
+_missing_rpc_functions = set()
+
+def supabase_rpc_optional(function_name, params=None):
+    """선택 설치 RPC 호출 (supabase/*.sql의 집계/롤업 함수)
+
+    함수가 없거나 호출이 실패하면 None을 반환하고, 호출한 쪽은 기존
+    Python 집계 등으로 폴백한다.
+    """
+    if function_name in _missing_rpc_functions:
+        return None
+    try:
+        return supabase_rpc(function_name, params or {}, timeout=60.0)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            print(f"RPC 함수 없음 ({function_name}) - Python 집계 사용")
+            _missing_rpc_functions.add(function_name)
         else:
-            response = client.post(url, headers=get_supabase_headers())
-        response.raise_for_status()
-        return response.json()
+            print(f"RPC {function_name} error: {e.response.status_code} - {e.response.text[:200]}")
+        return None
+    except Exception as e:
+        print(f"RPC {function_name} error: {e}")
+        return None
+
+# ============ SQLite 연결 관리 (로컬 전용) ============
+
+_sqlite_local = threading.local()
+_sqlite_idle = []  # 끝난 스레드가 반납한 (DB_PATH, 연결)
+_sqlite_idle_lock = threading.Lock()
+
+class _ThreadConnection:
+    """스레드별 연결 보관 - 스레드가 끝나 정리되면 연결을 유휴 목록으로 반납"""
+
+    def __init__(self, conn, path):
+        self.conn = conn
+        self.path = path
+        weakref.finalize(self, _release_connection, conn, path)
+
+def _open_connection():
+    """새 SQLite 연결 생성 (WAL + 캐시/mmap 설정)
+
+    isolation_level=None(autocommit)이라 단일 문장은 바로 커밋되고,
+    여러 문장을 묶을 때는 transaction()을 쓴다.
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+def _release_connection(conn, path):
+    """스레드가 끝난 연결을 유휴 목록에 반납 (꽉 찼거나 DB가 바뀌었으면 닫기)"""
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        with _sqlite_idle_lock:
+            if path == DB_PATH and len(_sqlite_idle) < SQLITE_POOL_SIZE:
+                _sqlite_idle.append((path, conn))
+                return
+        conn.close()
+    except Exception:
+        pass
+
+def get_connection():
+    """현재 스레드의 SQLite 연결 반환
+
+    스레드당 연결 하나를 계속 쓰므로 요청마다 connect/close를 반복하지 않는다.
+    스레드별 연결이라 별도 잠금 없이 여러 요청 스레드가 동시에 읽을 수 있다 (WAL).
+    """
+    holder = getattr(_sqlite_local, 'holder', None)
+    if holder is not None and holder.path == DB_PATH:
+        return holder.conn
+
+    conn = None
+    with _sqlite_idle_lock:
+        while _sqlite_idle:
+            path, idle_conn = _sqlite_idle.pop()
+            if path == DB_PATH:
+                conn = idle_conn
+                break
+            idle_conn.close()
+    if conn is None:
+        conn = _open_connection()
+    _sqlite_local.holder = _ThreadConnection(conn, DB_PATH)
+    return conn
+
+@contextmanager
+def transaction(immediate=False):
+    """현재 스레드 연결에서 여러 문장을 하나의 트랜잭션으로 실행 (cursor 전달)
+
+    정상 종료 시 커밋, 예외 시 롤백한다. 이미 트랜잭션 안이면 바깥 트랜잭션에 합류한다.
+    immediate=True면 시작할 때 쓰기 잠금을 잡는다 (읽은 값으로 바로 쓰는 경우).
+
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM sales_data WHERE file_id = ?', (file_id,))
+            cursor.execute('DELETE FROM monthly_sales WHERE file_id = ?', (file_id,))
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        yield cursor
+        return
+
+    cursor.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+    try:
+        yield cursor
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
 
 def execute_query(query, params=None):
     """쿼리 실행 (Supabase/SQLite 호환) - 복잡한 쿼리는 RPC 사용"""
     if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        result = cursor.fetchall()
-        conn.commit()
-        conn.close()
-        return [dict(row) for row in result]
+        cursor = get_connection().execute(query, params or ())
+        return [dict(row) for row in cursor.fetchall()]
     else:
         # Supabase에서는 SQL 직접 실행 불가 - REST API 또는 RPC 사용
         # 이 함수는 로컬 테스트용으로 유지
         raise NotImplementedError("Use Supabase REST API or RPC functions")
 
+def iter_query(query, params=None, batch_size=SQLITE_FETCH_BATCH):
+    """SELECT 결과를 fetchmany로 조금씩 읽어 dict로 하나씩 넘겨주는 generator (로컬 전용)
+
+    execute_query와 달리 전체 결과를 리스트로 만들지 않는다 (스트리밍 응답용).
+    """
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    finally:
+        cursor.close()
+
 def execute_write(query, params=None):
     """쓰기 쿼리 실행"""
     if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        lastrowid = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return lastrowid
+        cursor = get_connection().execute(query, params or ())
+        return cursor.lastrowid
     else:
         raise NotImplementedError("Use Supabase REST API")
 
+@contextmanager
+def sqlite_bulk_load(label):
+    """SQLite 대량 적재 (로컬 전용) - 하나의 명시적 트랜잭션으로 묶고 행/초 출력
+
+    (cursor, insert_rows)를 넘겨주며, insert_rows(table, columns, rows)는 튜플 이터레이터를
+    executemany로 그대로 흘려보낸다. 적재 중에는 SQLITE_BULK_SYNCHRONOUS /
+    SQLITE_BULK_JOURNAL_MODE 설정을 쓰고, 예외가 나면 전체를 롤백한다.
+
+        with sqlite_bulk_load('inventory') as (cursor, insert_rows):
+            cursor.execute('DELETE FROM inventory')
+            insert_rows('inventory', ['product_code', 'supplier'], rows)
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    # 바깥 트랜잭션(예: 청크 기록과 함께 저장)에 합류할 때는 PRAGMA를 바꿀 수 없으므로 그대로 둔다
+    tune = not conn.in_transaction
+    if tune:
+        previous_journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        if SQLITE_BULK_JOURNAL_MODE:
+            cursor.execute(f'PRAGMA journal_mode={SQLITE_BULK_JOURNAL_MODE}')
+        previous_synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+        cursor.execute(f'PRAGMA synchronous={SQLITE_BULK_SYNCHRONOUS}')
+
+    loaded = [0]
+
+    def insert_rows(table, columns, rows):
+        placeholders = ', '.join('?' * len(columns))
+        cursor.executemany(f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})', rows)
+        count = max(cursor.rowcount, 0)
+        loaded[0] += count
+        return count
+
+    started = time.perf_counter()
+    try:
+        # IMMEDIATE: 적재 전에 쓰기 잠금을 잡아 MAX(id) 같은 사전 조회와 INSERT 사이에 끼어들지 못하게
+        with transaction(immediate=True):
+            yield cursor, insert_rows
+    finally:
+        # 스레드 연결을 계속 쓰므로 적재용 설정은 되돌려 둔다
+        if tune:
+            cursor.execute(f'PRAGMA synchronous={previous_synchronous}')
+            if SQLITE_BULK_JOURNAL_MODE and SQLITE_BULK_JOURNAL_MODE != previous_journal_mode.upper():
+                cursor.execute(f'PRAGMA journal_mode={previous_journal_mode}')
+
+    elapsed = time.perf_counter() - started
+    if loaded[0]:
+        print(f"[bulk] {label}: {loaded[0]:,}행 {elapsed:.2f}초 ({loaded[0] / max(elapsed, 1e-9):,.0f}행/초)")
+
+def add_missing_column(cursor, table, column, definition):
+    """기존 SQLite 테이블에 컬럼이 없으면 추가 (로컬 전용)"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
 def init_database():
     """데이터베이스 초기화 - 테이블 생성"""
     if IS_LOCAL:
@@ -184,7 +642,40 @@ def init_database():
                 row_count INTEGER,
                 upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
                 status TEXT DEFAULT 'active',
-                data_period TEXT DEFAULT NULL
+                data_period TEXT DEFAULT NULL,
+                upload_key TEXT DEFAULT NULL
+            )''',
+
+            # 분할 업로드 청크 기록 (같은 청크가 다시 와도 한 번만 저장)
+            '''CREATE TABLE IF NOT EXISTS upload_chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                row_count INTEGER,
+                checksum TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (file_id, chunk_index)
+            )''',
+
+            # 서버 업로드 처리 작업 (api_upload가 등록하고 작업 스레드가 진행 상황을 기록)
+            '''CREATE TABLE IF NOT EXISTS upload_jobs (
+                id TEXT PRIMARY KEY,
+                original_name TEXT,
+                saved_name TEXT,
+                file_type TEXT,
+                status TEXT DEFAULT 'queued',
+                stage TEXT DEFAULT 'queued',
+                rows_parsed INTEGER DEFAULT 0,
+                rows_written INTEGER DEFAULT 0,
+                file_id INTEGER,
+                error TEXT,
+                engine TEXT,
+                read_seconds REAL,
+                owner_pid INTEGER,
+                owner_started TEXT,
+                created_at TEXT,
+                started_at TEXT,
+                finished_at TEXT
             )''',
 
             # 판매 데이터 테이블 (원본)
@@ -255,6 +746,8 @@ def init_database():
                 product_name TEXT,
                 barcode TEXT,
                 image_url TEXT,
+                sync_key TEXT,
+                content_hash TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )''',
 
@@ -274,36 +767,72 @@ def init_database():
                 is_soldout INTEGER DEFAULT 0,
                 product_tag TEXT,
                 location TEXT,
+                sync_key TEXT,
+                content_hash TEXT,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )''',
+
+            # 일별 롤업 테이블 (monthly_sales를 판매일자/매장/분류/업체/상품 단위로 미리 합산)
+            # 키 컬럼의 NULL은 빈 문자열로 저장 (UNIQUE 충돌 판정을 위해)
+            '''CREATE TABLE IF NOT EXISTS daily_rollup (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_id INTEGER NOT NULL DEFAULT 0,
+                판매일자 TEXT NOT NULL DEFAULT '',
+                매장명 TEXT NOT NULL DEFAULT '',
+                분류명 TEXT NOT NULL DEFAULT '',
+                업체명 TEXT NOT NULL DEFAULT '',
+                상품코드 TEXT NOT NULL DEFAULT '',
+                실판매금액 REAL NOT NULL DEFAULT 0,
+                판매량 REAL NOT NULL DEFAULT 0,
+                건수 INTEGER NOT NULL DEFAULT 0
+            )''',
+
+            # 앱 메타 정보 (data_version 등)
+            '''CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )''',
 
-            # 인덱스 생성
-            'CREATE INDEX IF NOT EXISTS idx_sales_업체명 ON sales_data(업체명)',
-            'CREATE INDEX IF NOT EXISTS idx_sales_카테고리 ON sales_data(카테고리)',
-            'CREATE INDEX IF NOT EXISTS idx_sales_상품코드 ON sales_data(상품코드)',
+            # 인덱스 생성 (대시보드 집계용 복합 인덱스는 migrate_local_indexes에서 생성)
             'CREATE INDEX IF NOT EXISTS idx_monthly_판매일자 ON monthly_sales(판매일자)',
-            'CREATE INDEX IF NOT EXISTS idx_monthly_매장명 ON monthly_sales(매장명)',
-            'CREATE INDEX IF NOT EXISTS idx_monthly_업체명 ON monthly_sales(업체명)',
             'CREATE INDEX IF NOT EXISTS idx_product_images_supplier_option ON product_images(supplier_option)',
             'CREATE INDEX IF NOT EXISTS idx_product_images_product_code ON product_images(product_code)',
             'CREATE INDEX IF NOT EXISTS idx_inventory_supplier_option ON inventory(supplier_option)',
-            'CREATE INDEX IF NOT EXISTS idx_inventory_product_code ON inventory(product_code)'
+            'CREATE INDEX IF NOT EXISTS idx_inventory_product_code ON inventory(product_code)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_rollup_key ON daily_rollup(file_id, 판매일자, 매장명, 분류명, 업체명, 상품코드)'
         ]
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        for query in queries:
-            cursor.execute(query)
-        # 기본 관리자 계정 생성
-        cursor.execute('SELECT COUNT(*) FROM admin_users WHERE username = ?', ('admin',))
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('INSERT INTO admin_users (username, password, role) VALUES (?, ?, ?)', ('admin', 'admin123', 'admin'))
-        # viewer 계정 생성
-        cursor.execute('SELECT COUNT(*) FROM admin_users WHERE username = ?', ('user',))
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('INSERT INTO admin_users (username, password, role) VALUES (?, ?, ?)', ('user', 'user123', 'user'))
-        conn.commit()
-        conn.close()
+        with transaction() as cursor:
+            for query in queries:
+                cursor.execute(query)
+            migrate_local_indexes(cursor)
+            # 컬럼 도입 이전 DB 보완
+            add_missing_column(cursor, 'upload_files', 'upload_key', 'TEXT DEFAULT NULL')
+            add_missing_column(cursor, 'upload_jobs', 'engine', 'TEXT')
+            add_missing_column(cursor, 'upload_jobs', 'read_seconds', 'REAL')
+            add_missing_column(cursor, 'upload_jobs', 'owner_pid', 'INTEGER')
+            add_missing_column(cursor, 'upload_jobs', 'owner_started', 'TEXT')
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_upload_files_upload_key ON upload_files(upload_key)')
+            for table in CATALOG_SYNC_COLUMNS:
+                add_missing_column(cursor, table, 'sync_key', 'TEXT')
+                add_missing_column(cursor, table, 'content_hash', 'TEXT')
+                cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_sync_key ON {table}(sync_key)')
+            # 기본 관리자 계정 생성
+            cursor.execute('SELECT COUNT(*) FROM admin_users WHERE username = ?', ('admin',))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute('INSERT INTO admin_users (username, password, role) VALUES (?, ?, ?)', ('admin', 'admin123', 'admin'))
+            # viewer 계정 생성
+            cursor.execute('SELECT COUNT(*) FROM admin_users WHERE username = ?', ('user',))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute('INSERT INTO admin_users (username, password, role) VALUES (?, ?, ?)', ('user', 'user123', 'user'))
+            # 롤업 도입 이전 데이터가 있으면 한 번 채워넣기
+            cursor.execute('SELECT 1 FROM daily_rollup LIMIT 1')
+            if cursor.fetchone() is None:
+                cursor.execute('SELECT 1 FROM monthly_sales LIMIT 1')
+                if cursor.fetchone() is not None:
+                    update_daily_rollup_local(cursor)
+                    print("daily_rollup 초기 생성 완료")
         print(f"데이터베이스 초기화 완료: {DB_PATH}")
     else:
         # Supabase는 대시보드에서 테이블 생성 (SQL Editor)
@@ -320,6 +849,147 @@ def init_database():
         except Exception as e:
             print(f"Supabase 초기화 중 오류 (테이블 생성 필요할 수 있음): {e}")
 
+# ============ 인덱스 마이그레이션 (로컬 전용, Supabase는 supabase/indexes.sql) ============
+
+# 대시보드 쿼리 형태에 맞춘 복합/커버링 인덱스
+# file_id를 앞에 두어 파일 필터 조회와 file_id 삭제가 인덱스를 타고,
+# 집계 컬럼까지 포함해 테이블 행을 읽지 않고 인덱스만으로 집계한다.
+LOCAL_INDEX_VERSION = 1  # PRAGMA user_version에 기록
+LOCAL_INDEXES = [
+    # 파일 단위 조회/삭제 (SQLite 인덱스는 끝에 rowid가 붙어 file_id + id 순서로 페이징 가능)
+    'CREATE INDEX IF NOT EXISTS idx_sales_file_id ON sales_data(file_id)',
+    'CREATE INDEX IF NOT EXISTS idx_monthly_file_id ON monthly_sales(file_id)',
+    # get_sales_by_supplier, get_supplier_category_matrix, get_summary_stats(원본)
+    'CREATE INDEX IF NOT EXISTS idx_sales_file_supplier ON sales_data(file_id, 업체명, 카테고리, 상품코드, 상품명, 실판매금액, 판매량)',
+    # get_sales_by_category
+    'CREATE INDEX IF NOT EXISTS idx_sales_file_category ON sales_data(file_id, 카테고리, 상품코드, 실판매금액, 판매량)',
+    # get_top_products (분류명 등 묶음 밖 컬럼은 그룹의 마지막 행 값을 쓰므로 커버링하지 않고 id 순서 유지)
+    'CREATE INDEX IF NOT EXISTS idx_sales_file_product ON sales_data(file_id, 상품코드, 상품명)',
+    # get_summary_stats(월별: 파일 + 기간 필터)
+    'CREATE INDEX IF NOT EXISTS idx_monthly_file_date ON monthly_sales(file_id, 판매일자, 매장명, 실판매금액, 판매량)',
+    # get_summary_stats(데이터 타입별 건수)
+    'CREATE INDEX IF NOT EXISTS idx_monthly_data_type ON monthly_sales(data_type)',
+    # get_store_category_matrix
+    'CREATE INDEX IF NOT EXISTS idx_monthly_file_store ON monthly_sales(file_id, 매장명, 분류명, 상품코드, 상품명, 실판매금액, 판매량)',
+    # 일별/주간/월별/매장별 시계열 (daily_rollup, 파일 필터는 idx_daily_rollup_key)
+    'CREATE INDEX IF NOT EXISTS idx_daily_rollup_date_cover ON daily_rollup(판매일자, 매장명, file_id, 실판매금액, 판매량, 건수)',
+]
+# 위 인덱스로 대체된 단일 컬럼 인덱스 (쓰기 비용만 늘리므로 삭제)
+SUPERSEDED_INDEXES = [
+    'idx_sales_업체명', 'idx_sales_카테고리', 'idx_sales_상품코드',
+    'idx_monthly_매장명', 'idx_monthly_업체명', 'idx_daily_rollup_판매일자',
+]
+
+def migrate_local_indexes(cursor):
+    """로컬 DB 인덱스 마이그레이션 (init_database 트랜잭션 안에서 실행)"""
+    for query in LOCAL_INDEXES:
+        cursor.execute(query)
+
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    if version >= LOCAL_INDEX_VERSION:
+        return
+    for name in SUPERSEDED_INDEXES:
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    cursor.execute(f'PRAGMA user_version = {LOCAL_INDEX_VERSION}')
+    print(f"인덱스 마이그레이션 완료 (v{version} → v{LOCAL_INDEX_VERSION})")
+
+def explain_dashboard_queries(file_id=None, start_date=None, end_date=None):
+    """대시보드 쿼리 실행 계획 점검 (로컬 전용)
+
+    각 대시보드 함수를 캐시 없이 실행하면서 실제로 실행된 SELECT를 모아
+    EXPLAIN QUERY PLAN을 확인한다. WHERE 조건이 있는데 테이블을 인덱스 없이 전체 스캔하면 ok=False
+    (조건 없는 전체 집계는 어차피 모든 행을 읽으므로 제외).
+
+    Returns:
+        list: [{'function', 'query', 'plan', 'ok'}, ...]
+    """
+    if not IS_LOCAL:
+        raise NotImplementedError("Supabase는 SQL Editor에서 EXPLAIN으로 확인")
+
+    options = {'file_id': file_id, 'start_date': start_date, 'end_date': end_date}
+    conn = get_connection()
+    report = []
+    for func in DASHBOARD_QUERY_FUNCTIONS:
+        run = getattr(func, '__wrapped__', func)  # 결과 캐시 우회
+        params = inspect.signature(run).parameters
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            run(**{k: v for k, v in options.items() if k in params})
+        finally:
+            conn.set_trace_callback(None)
+
+        for query in statements:
+            if not query.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query).fetchall()]
+            query = ' '.join(query.split())
+            full_scans = [d for d in plan if re.match(r'SCAN [^(]\S*$', d)]
+            report.append({
+                'function': func.__name__,
+                'query': query,
+                'plan': plan,
+                'ok': not (full_scans and ' WHERE ' in query.upper()),
+            })
+    return report
+
+# ============ 분류명/상품명 정규화 (LRU 캐시) ============
+
+# 파일 하나에 고유 분류명은 수백 개, 상품명도 행 수보다 훨씬 적으므로 같은 문자열은 한 번만 처리한다.
+# 함수별로 NORMALIZER_CACHE_SIZE개까지 최근 결과를 기억하고 적중/누락 횟수를 센다 (/api/cache-stats).
+_normalizer_caches = {}
+
+def memoized_normalizer(func):
+    """문자열 정규화 함수 결과를 인자 키로 캐시하는 데코레이터 (functools.lru_cache, 크기 제한)
+
+    1과 1.0처럼 타입이 다른 값은 따로 캐시하고(typed), NaN이나 해시할 수 없는 값은
+    캐시하지 않고 바로 계산한다. 반환값은 공유되므로 변경 불가능한 값(문자열/튜플/None)을
+    반환하는 함수에만 쓴다.
+    """
+    if NORMALIZER_CACHE_SIZE <= 0:
+        return func
+    cached = lru_cache(maxsize=NORMALIZER_CACHE_SIZE, typed=True)(func)
+    _normalizer_caches[func.__name__] = cached
+
+    @wraps(func)
+    def wrapper(*args):
+        for arg in args:
+            # 문자열/None이 대부분이므로 먼저 확인, NaN은 자기 자신과 같지 않아 키가 쌓이기만 하므로 제외
+            if arg is not None and type(arg) is not str and not _normalizer_cacheable(arg):
+                return func(*args)
+        return cached(*args)
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+def _normalizer_cacheable(value):
+    """캐시 키로 쓸 수 있는 인자인지 (문자열/정수/NaN이 아닌 실수)"""
+    if isinstance(value, float):
+        return value == value
+    return isinstance(value, (str, int))
+
+def get_normalizer_cache_stats():
+    """정규화 함수별 캐시 상태 (크기, 적중/누락 횟수, 적중률)"""
+    stats = {}
+    for name, cached in _normalizer_caches.items():
+        info = cached.cache_info()
+        total = info.hits + info.misses
+        stats[name] = {
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': round(info.hits / total, 4) if total else None,
+        }
+    return stats
+
+def clear_normalizer_caches():
+    """정규화 캐시와 적중/누락 횟수 초기화"""
+    for cached in _normalizer_caches.values():
+        cached.cache_clear()
+
+@memoized_normalizer
 def parse_classification(분류명):
     """분류명에서 카테고리와 업체명 추출
 
@@ -356,6 +1026,12 @@ def clean_numeric(value):
 
 import re
 
+# 상품명 정규화용 정규식 (행마다 패턴 캐시를 찾지 않도록 미리 컴파일)
+PRODUCT_CODE_PATTERN = re.compile(r'^[A-Za-z0-9]+$')
+ALPHA_LEADING_CODE_PATTERN = re.compile(r'^([A-Za-z]+[0-9]+[A-Za-z0-9]*)')
+DIGIT_LEADING_CODE_PATTERN = re.compile(r'^([0-9]+[A-Za-z]+[A-Za-z0-9]*)')
+
+@memoized_normalizer
 def extract_base_product_code(상품명):
     """상품명에서 기본 상품코드(옵션 제외)를 추출
 
@@ -376,21 +1052,22 @@ def extract_base_product_code(상품명):
     if '_' in 상품명:
         base_code = 상품명.split('_')[0].strip()
         # 영문+숫자 조합인지 확인
-        if re.match(r'^[A-Za-z0-9]+$', base_code):
+        if PRODUCT_CODE_PATTERN.match(base_code):
             return base_code.upper()
 
     # 패턴 2: 시작 부분의 영문+숫자 코드 추출 (예: BJK001 작업조끼)
-    match = re.match(r'^([A-Za-z]+[0-9]+[A-Za-z0-9]*)', 상품명)
+    match = ALPHA_LEADING_CODE_PATTERN.match(상품명)
     if match:
         return match.group(1).upper()
 
     # 패턴 3: 숫자로 시작하는 코드 (예: 1234ABC 상품)
-    match = re.match(r'^([0-9]+[A-Za-z]+[A-Za-z0-9]*)', 상품명)
+    match = DIGIT_LEADING_CODE_PATTERN.match(상품명)
     if match:
         return match.group(1).upper()
 
     return None
 
+@memoized_normalizer
 def get_product_display_name(상품명, base_code):
     """상품명에서 옵션 부분만 추출 (기본코드 제외한 표시명)
 
@@ -465,238 +1142,497 @@ def convert_excel_date(value):
 
     return None
 
-def save_upload_file(filename, original_name, file_type, row_count):
-    """업로드 파일 정보 저장"""
+# ============ 업로드 데이터 열 단위 변환 ============
+# save_sales_data / save_monthly_data에서 iterrows + 셀마다 함수 호출 대신 사용.
+# 결과는 clean_numeric / parse_classification / convert_excel_date를 행마다 호출한 것과 같다.
+
+SALES_NUMERIC_COLUMNS = ['판매일', '주문수', '주문건', '주문량', '판매단가', '최종단가', '수발주단가',
+                         '판매가', '취소수', '취소량', '취소금액', '할인량', '할인금액',
+                         '판매량', '실판매단가', '실판매금액']
+MONTHLY_NUMERIC_COLUMNS = ['판매일', '주문수', '주문건', '주문량', '판매단가', '수발주단가',
+                           '판매가', '취소수', '취소량', '취소금액', '할인량', '할인금액',
+                           '판매량', '실판매단가', '실판매금액']
+
+# 저장 함수가 업로드 파일에서 읽는 컬럼 (excel_reader가 이 컬럼만 DataFrame으로 만든다)
+SALES_SOURCE_COLUMNS = ['분류명', '상품코드', '바코드', '상품명'] + SALES_NUMERIC_COLUMNS
+MONTHLY_SOURCE_COLUMNS = ['판매일자', '매장코드', '매장명', '분류명', '상품코드', '상품명'] + MONTHLY_NUMERIC_COLUMNS
+
+# SQLite INSERT 컬럼 순서 (저장/백업 복원 공용)
+SALES_INSERT_COLUMNS = ['file_id', '분류명', '카테고리', '업체명', '상품코드', '바코드', '상품명'] + SALES_NUMERIC_COLUMNS
+MONTHLY_INSERT_COLUMNS = ['file_id', 'data_type', '판매일자', '매장코드', '매장명', '분류명', '카테고리', '업체명',
+                          '상품코드', '상품명'] + MONTHLY_NUMERIC_COLUMNS
+
+# "카테고리(업체명)": 마지막 '(' 와 그 뒤의 마지막 ')' 사이를 업체명으로 (parse_classification과 동일)
+CLASSIFICATION_PATTERN = r'^(.*)\(([^(]*)\)([^()]*)$'
+EXCEL_BASE_DATE = pd.Timestamp(1899, 12, 30)
+
+def source_columns(df):
+    """df.iterrows()의 row.get()과 같은 값을 열 단위로 읽을 수 있게 정리
+
+    iterrows는 모든 열이 숫자형이면 행을 공통 dtype으로 올려서 돌려주므로(예: int → float)
+    같은 변환을 먼저 적용한다.
+    """
+    if len(df.columns) and all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+        return pd.DataFrame(df.values, index=df.index, columns=df.columns)
+    return df
+
+def source_column(df, column, default=None):
+    """row.get(column, default)와 같은 값의 Series
+
+    숫자/날짜 열은 dtype을 유지한다. 셀 값을 그대로 저장할 때는 .astype(object)로
+    row.get()과 같은 Python 객체(int, float, str, Timestamp)로 바꿔서 쓴다.
+    """
+    if column in df.columns:
+        return df[column]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+def _map_each(values, func):
+    """값마다 func 호출 (같은 타입/값은 한 번만 계산)"""
+    cache = {}
+    result = []
+    for value in values:
+        key = (type(value), value)
+        if key not in cache:
+            cache[key] = func(value)
+        result.append(cache[key])
+    return result
+
+def _factorize(values):
+    """(codes, 고유값 Series) 반환 - 반복이 많은 열은 고유값만 변환한 뒤 codes로 펼친다"""
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Series(uniques, dtype=object)
+
+def clean_numeric_column(values):
+    """clean_numeric의 열 단위 버전 - float 또는 None인 object 배열 반환
+
+    숫자 열은 그대로 float로, 문자열은 쉼표/공백 제거 후 한 번에 변환한다.
+    pd.to_numeric으로 변환되지 않는 문자열('nan', '1_000' 같이 float()만 받는 표기나
+    잘못된 값)과 섞여 있는 기타 값만 clean_numeric으로 따로 처리한다.
+    """
+    values = pd.Series(values)
+    if values.dtype != object and pd.api.types.is_numeric_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        result = numbers.astype(object)
+        result[np.isnan(numbers)] = None
+        return result
+
+    values = values.astype(object)
+    result = np.full(len(values), None, dtype=object)
+    valid = values.notna().to_numpy()
+    if not valid.any():
+        return result
+
+    present = values[valid]
+    kind = pd.api.types.infer_dtype(present, skipna=False)
+    if kind in ('integer', 'floating', 'mixed-integer-float', 'boolean'):
+        result[valid] = present.to_numpy(dtype=object).astype(float).tolist()
+        return result
+
+    # 같은 값(1, 1.0, True처럼 ==인 값 포함)은 clean_numeric 결과도 같으므로 고유값만 변환
+    codes, uniques = _factorize(present)
+    converted = np.full(len(uniques), None, dtype=object)
+    done = (uniques.map(type) == str).to_numpy(copy=True)
+    if done.any():
+        text = uniques[done].str.replace(',', '', regex=False).str.strip()
+        ok = pd.to_numeric(text, errors='coerce').notna().to_numpy()
+        try:
+            # to_numeric은 변환 가능 여부 확인용, 값은 float()과 같은 numpy 변환으로 계산
+            parsed = np.full(len(text), None, dtype=object)
+            parsed[ok] = text[ok].to_numpy(dtype=object).astype(float).tolist()
+            converted[done] = parsed
+            done[done] = ok
+        except (TypeError, ValueError):
+            done[:] = False
+    if not done.all():
+        converted[~done] = _map_each(uniques[~done], clean_numeric)
+    result[valid] = converted[codes]
+    return result
+
+def parse_classification_column(values):
+    """parse_classification의 열 단위 버전 - (카테고리, 업체명) object 배열 반환"""
+    values = pd.Series(values, dtype=object)
+    카테고리 = np.full(len(values), None, dtype=object)
+    업체명 = np.full(len(values), None, dtype=object)
+
+    # NaN/None과 빈 문자열 같은 거짓 값은 (None, None)
+    mask = values.notna().to_numpy(copy=True)
+    mask[mask] = values[mask].to_numpy().astype(bool)
+    if not mask.any():
+        return 카테고리, 업체명
+
+    present = values[mask]
+    if pd.api.types.infer_dtype(present, skipna=False) != 'string':
+        # str(분류명) - 1, 1.0, True처럼 ==인 값이 고유값 처리에서 합쳐지지 않도록 먼저 변환
+        present = present.map(str)
+    codes, text = _factorize(present)
+    text = text.str.strip()
+    parts = text.str.extract(CLASSIFICATION_PATTERN, flags=re.DOTALL)
+    matched = parts[0].notna()
+    카테고리[mask] = parts[0].str.strip().where(matched, text).to_numpy(dtype=object)[codes]
+    # 괄호가 없는 경우: 업체명은 "미지정"
+    업체명[mask] = parts[1].str.strip().where(matched, '미지정').to_numpy(dtype=object)[codes]
+    return 카테고리, 업체명
+
+def convert_excel_date_column(values):
+    """convert_excel_date의 열 단위 버전 - 'YYYY-MM-DD' 또는 None인 object 배열 반환
+
+    날짜 열, Excel 시리얼 숫자, 'YYYY-MM-DD'/'YYYY/MM/DD'로 시작하는 문자열은 고유값 단위로
+    한 번에 변환하고, 나머지 값은 convert_excel_date로 처리한다.
+    """
+    values = pd.Series(values, dtype=object)
+    result = np.full(len(values), None, dtype=object)
+    valid = values.notna().to_numpy()
+    if not valid.any():
+        return result
+
+    present = values[valid]
+    kind = pd.api.types.infer_dtype(present, skipna=False)
+
+    if kind in ('datetime', 'datetime64'):
+        try:
+            # 한 열 안에서는 같은 시각 → 같은 날짜이므로 변환된 datetime 기준으로 고유값 처리
+            codes, uniques = pd.factorize(pd.to_datetime(present))
+            result[valid] = uniques.strftime('%Y-%m-%d').to_numpy(dtype=object)[codes]
+            return result
+        except (TypeError, ValueError, AttributeError):
+            kind = 'mixed'
+
+    if kind not in ('integer', 'floating', 'mixed-integer-float', 'string'):
+        result[valid] = _map_each(present, convert_excel_date)
+        return result
+
+    codes, uniques = _factorize(present)
+    converted = np.full(len(uniques), None, dtype=object)
+    if kind == 'string':
+        # YYYY-MM-DD 또는 YYYY/MM/DD 형식은 앞 10자리만 사용
+        text = uniques.str.strip()
+        done = ((text.str.len() >= 10) & text.str[4].isin(['-', '/'])).to_numpy(copy=True)
+        if done.any():
+            converted[done] = text[done].str[:10].str.replace('/', '-', regex=False).to_numpy(dtype=object)
+    else:
+        # Excel 시리얼 넘버 (1 ~ 100000) - 기준일 1899-12-30 + 정수 일수
+        numbers = uniques.to_numpy(dtype=object).astype(float)
+        done = (numbers > 1) & (numbers < 100000)
+        if done.any():
+            dates = EXCEL_BASE_DATE + pd.to_timedelta(np.trunc(numbers[done]), unit='D')
+            converted[done] = dates.strftime('%Y-%m-%d').to_numpy(dtype=object)
+
+    if not done.all():
+        converted[~done] = _map_each(uniques[~done], convert_excel_date)
+    result[valid] = converted[codes]
+    return result
+
+def text_column(values, skip_missing=True, skip_falsy=False):
+    """값을 str로 바꾼 object 배열 반환 (건너뛴 값은 None)
+
+    skip_missing: str(value) if pd.notna(value) else None
+    skip_falsy: str(value) if value else None (빈 문자열/0 제외)
+    """
+    values = pd.Series(values, dtype=object)
+    result = np.full(len(values), None, dtype=object)
+    mask = np.ones(len(values), dtype=bool)
+    if skip_missing:
+        mask &= values.notna().to_numpy()
+    if skip_falsy:
+        mask[mask] = values[mask].to_numpy().astype(bool)
+    if mask.any():
+        result[mask] = values[mask].map(str).to_numpy(dtype=object)
+    return result
+
+# ============ 일별 롤업 (daily_rollup) ============
+
+ROLLUP_KEY_COLUMNS = ['file_id', '판매일자', '매장명', '분류명', '업체명', '상품코드']
+
+def update_daily_rollup_local(cursor, where='1=1', params=()):
+    """monthly_sales의 행들을 daily_rollup에 합산 (SQLite)
+
+    where로 이번에 추가된 행만 골라 기존 롤업 값에 더한다.
+    호출하는 쪽의 트랜잭션 안에서 실행된다.
+    """
+    cursor.execute(f'''
+        INSERT INTO daily_rollup (file_id, 판매일자, 매장명, 분류명, 업체명, 상품코드, 실판매금액, 판매량, 건수)
+        SELECT
+            IFNULL(file_id, 0), IFNULL(판매일자, ''), IFNULL(매장명, ''), IFNULL(분류명, ''),
+            IFNULL(업체명, ''), IFNULL(상품코드, ''),
+            IFNULL(SUM(실판매금액), 0), IFNULL(SUM(판매량), 0), COUNT(*)
+        FROM monthly_sales
+        WHERE {where}
+        GROUP BY 1, 2, 3, 4, 5, 6
+        ON CONFLICT(file_id, 판매일자, 매장명, 분류명, 업체명, 상품코드) DO UPDATE SET
+            실판매금액 = 실판매금액 + excluded.실판매금액,
+            판매량 = 판매량 + excluded.판매량,
+            건수 = 건수 + excluded.건수
+    ''', params)
+
+def add_rows_to_rollup(rollup, rows):
+    """monthly_sales 행(dict)들을 롤업 키별로 합산 (Supabase 업로드용)"""
+    for r in rows:
+        key = tuple('' if r.get(col) is None else str(r.get(col)) for col in ROLLUP_KEY_COLUMNS[1:])
+        key = (r.get('file_id') or 0,) + key
+        if key not in rollup:
+            rollup[key] = [0.0, 0.0, 0]
+        rollup[key][0] += float(r.get('실판매금액') or 0)
+        rollup[key][1] += float(r.get('판매량') or 0)
+        rollup[key][2] += 1
+
+def push_daily_rollup(rollup):
+    """합산된 롤업을 Supabase daily_rollup에 반영 (apply_daily_rollup RPC)
+
+    반영이 실패하면 예외를 그대로 던진다. 일부 배치만 더해진 롤업이 남지 않도록
+    호출한 쪽의 업로드 정리(파일 데이터와 롤업 행 삭제)가 실행되어야 한다.
+    함수가 설치되지 않았으면(404) monthly_sales 전체로 롤업을 다시 만든다.
+    """
+    if not rollup:
+        return
+    if 'apply_daily_rollup' not in _missing_rpc_functions:
+        rows = [dict(zip(ROLLUP_KEY_COLUMNS, key), 실판매금액=v[0], 판매량=v[1], 건수=v[2]) for key, v in rollup.items()]
+        try:
+            for i in range(0, len(rows), 5000):
+                supabase_rpc('apply_daily_rollup', {'p_rows': rows[i:i+5000]}, timeout=60.0)
+            return
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 404:
+                raise
+            print("RPC 함수 없음 (apply_daily_rollup) - 일별 롤업 전체 재생성")
+            _missing_rpc_functions.add('apply_daily_rollup')
+    rebuild_daily_rollup()
+
+def rebuild_daily_rollup():
+    """daily_rollup 전체 재생성 (백업 복원 등 대량 변경 후)"""
     if IS_LOCAL:
-        query = '''INSERT INTO upload_files (filename, original_name, file_type, row_count)
-                   VALUES (?, ?, ?, ?)'''
-        return execute_write(query, (filename, original_name, file_type, row_count))
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM daily_rollup')
+            update_daily_rollup_local(cursor)
     else:
-        # 한국 시간으로 upload_date 설정
-        kst_now = datetime.now(KST).isoformat()
-        result = supabase_insert('upload_files', {
-            'filename': filename,
-            'original_name': original_name,
-            'file_type': file_type,
-            'row_count': row_count,
-            'upload_date': kst_now
-        })
-        return result[0]['id'] if result else 0
+        supabase_rpc_optional('rebuild_daily_rollup')
+
+def delete_daily_rollup(filters):
+    """daily_rollup에서 조건에 맞는 롤업 행 삭제 (Supabase, 테이블이 없으면 무시)"""
+    try:
+        supabase_delete('daily_rollup', filters)
+    except Exception as e:
+        print(f"daily_rollup 삭제 건너뜀: {e}")
+
+def save_upload_file(filename, original_name, file_type, row_count, upload_key=None):
+    """업로드 파일 정보 저장
+
+    upload_key(브라우저가 업로드마다 만드는 키)를 주면 같은 키로 이미 등록된 파일의 id를 돌려준다.
+    첫 청크가 재전송되어도 파일이 두 번 등록되지 않는다.
+    """
+    if upload_key:
+        file_id = find_upload_file_id(upload_key)
+        if file_id:
+            return file_id
+        if not IS_LOCAL and not upload_ledger_available():
+            upload_key = None
+
+    try:
+        if IS_LOCAL:
+            query = '''INSERT INTO upload_files (filename, original_name, file_type, row_count, upload_key)
+                       VALUES (?, ?, ?, ?, ?)'''
+            file_id = execute_write(query, (filename, original_name, file_type, row_count, upload_key))
+        else:
+            # 한국 시간으로 upload_date 설정
+            kst_now = datetime.now(KST).isoformat()
+            record = {
+                'filename': filename,
+                'original_name': original_name,
+                'file_type': file_type,
+                'row_count': row_count,
+                'upload_date': kst_now
+            }
+            if upload_key:
+                record['upload_key'] = upload_key
+            result = supabase_insert('upload_files', record)
+            file_id = result[0]['id'] if result else 0
+    except Exception:
+        # 같은 upload_key로 동시에 들어온 요청이 먼저 등록한 경우
+        existing = find_upload_file_id(upload_key) if upload_key else None
+        if not existing:
+            raise
+        return existing
+
+    bump_data_version()
+    return file_id
+
+# 청크 업로드 저장이 실패했을 때 이미 넣은 행을 id로 지우는 단위 (id=in.(...) URL 길이 제한)
+UPLOAD_DELETE_BATCH = 200
+
+def insert_record_batches(table, records, batch_size=1000, inserted_ids=None, on_batch=None):
+    """records를 배치로 Supabase에 삽입하고 저장 건수 반환
+
+    inserted_ids가 None이면 실패한 배치는 로그만 남기고 건너뛴다 (파일 업로드는 저장 가능한 행을 모두 저장).
+    inserted_ids(list)를 주면 넣은 행의 id를 모으고, 배치가 실패하면 예외를 그대로 던진다.
+    on_batch(batch)는 저장에 성공한 배치마다 호출된다.
+    """
+    inserted = 0
+    for i in range(0, len(records), batch_size):
+        batch_data = records[i:i+batch_size]
+        try:
+            result = supabase_insert(table, batch_data)
+        except Exception as e:
+            print(f"Bulk insert error: {e}")
+            if inserted_ids is not None:
+                raise
+            continue
+        inserted += len(batch_data)
+        if inserted_ids is not None:
+            inserted_ids.extend(row['id'] for row in result if isinstance(row, dict) and 'id' in row)
+        if on_batch:
+            on_batch(batch_data)
+    return inserted
+
+def discard_inserted_rows(table, inserted_ids):
+    """저장 도중 실패한 호출이 넣은 행 삭제 (다시 보낸 청크가 중복 저장되지 않도록)"""
+    try:
+        for i in range(0, len(inserted_ids), UPLOAD_DELETE_BATCH):
+            batch = inserted_ids[i:i + UPLOAD_DELETE_BATCH]
+            supabase_delete(table, f"id=in.({','.join(str(row_id) for row_id in batch)})")
+    except Exception as e:
+        print(f"{table} 부분 저장 행 삭제 실패: {e}")
 
-def save_sales_data(df, file_id):
-    """원본 판매 데이터 저장 - Supabase bulk insert로 초고속"""
+def save_sales_data(df, file_id, strict=False):
+    """원본 판매 데이터 저장 - Supabase bulk insert로 초고속
+
+    strict면 Supabase 저장 실패 시 이번에 넣은 행을 지우고 예외를 던진다 (청크 업로드용).
+    """
     inserted = 0
 
-    if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+    # 열 단위 전처리 (행마다 clean_numeric / parse_classification을 호출하지 않도록)
+    df = source_columns(df)
+    상품명 = source_column(df, '상품명', '').astype(object).map(str).astype(object)
 
-        for _, row in df.iterrows():
-            상품코드 = row.get('상품코드', '')
-            상품명 = str(row.get('상품명', ''))
+    # 상품명이 없거나 합계 행이면 건너뛰기
+    keep = ((상품명 != '') & (상품명 != 'nan') & ~상품명.str.contains('row(s)', regex=False)).to_numpy()
+    df = df[keep]
+    상품명 = 상품명[keep]
 
-            # 상품명이 없거나 합계 행이면 건너뛰기
-            if not 상품명 or 'row(s)' in 상품명 or 상품명 == 'nan':
-                continue
+    분류명 = source_column(df, '분류명', '')
+    카테고리, 업체명 = parse_classification_column(분류명)
+    numeric = [clean_numeric_column(source_column(df, col)) for col in SALES_NUMERIC_COLUMNS]
 
-            # 상품코드가 없으면 빈 문자열로 처리
-            if pd.isna(상품코드):
-                상품코드 = ''
-
-            분류명 = row.get('분류명', '')
-            카테고리, 업체명 = parse_classification(분류명)
-
-            cursor.execute('''
-                INSERT INTO sales_data (
-                    file_id, 분류명, 카테고리, 업체명, 상품코드, 바코드, 상품명,
-                    판매일, 주문수, 주문건, 주문량, 판매단가, 최종단가, 수발주단가,
-                    판매가, 취소수, 취소량, 취소금액, 할인량, 할인금액,
-                    판매량, 실판매단가, 실판매금액
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                file_id, 분류명, 카테고리, 업체명,
-                row.get('상품코드'), row.get('바코드'), row.get('상품명'),
-                clean_numeric(row.get('판매일')),
-                clean_numeric(row.get('주문수')), clean_numeric(row.get('주문건')),
-                clean_numeric(row.get('주문량')), clean_numeric(row.get('판매단가')),
-                clean_numeric(row.get('최종단가')), clean_numeric(row.get('수발주단가')),
-                clean_numeric(row.get('판매가')), clean_numeric(row.get('취소수')),
-                clean_numeric(row.get('취소량')), clean_numeric(row.get('취소금액')),
-                clean_numeric(row.get('할인량')), clean_numeric(row.get('할인금액')),
-                clean_numeric(row.get('판매량')), clean_numeric(row.get('실판매단가')),
-                clean_numeric(row.get('실판매금액'))
-            ))
-            inserted += 1
-
-        conn.commit()
-        conn.close()
+    if IS_LOCAL:
+        rows = zip(
+            [file_id] * len(df), 분류명.astype(object), 카테고리, 업체명,
+            source_column(df, '상품코드').astype(object), source_column(df, '바코드').astype(object),
+            source_column(df, '상품명').astype(object),
+            *numeric
+        )
+        with sqlite_bulk_load('sales_data') as (cursor, insert_rows):
+            inserted = insert_rows('sales_data', SALES_INSERT_COLUMNS, rows)
     else:
         # Supabase bulk insert - 1000건씩 한 번에 (초고속!)
         batch_size = 1000
-        batch_data = []
 
-        for _, row in df.iterrows():
-            상품코드 = row.get('상품코드', '')
-            상품명 = str(row.get('상품명', ''))
+        상품코드 = source_column(df, '상품코드')
+        columns = {
+            'file_id': [file_id] * len(df),
+            '분류명': text_column(분류명, skip_missing=False, skip_falsy=True),
+            '카테고리': 카테고리,
+            '업체명': 업체명,
+            # 상품코드가 없으면 빈 문자열 → None
+            '상품코드': text_column(상품코드, skip_falsy=True),
+            '바코드': text_column(source_column(df, '바코드')),
+            '상품명': 상품명.to_numpy(),
+        }
+        columns.update(zip(SALES_NUMERIC_COLUMNS, numeric))
+        keys = list(columns.keys())
+        records = [dict(zip(keys, values)) for values in zip(*columns.values())]
 
-            # 상품명이 없거나 합계 행이면 건너뛰기
-            if not 상품명 or 'row(s)' in 상품명 or 상품명 == 'nan':
-                continue
+        if strict:
+            # supabase_insert가 500건씩 나눠 보내므로, 배치 하나가 POST 한 번이 되게 해 실패한 배치는 통째로 빠지게 한다
+            inserted_ids = []
+            try:
+                inserted = insert_record_batches('sales_data', records, 500, inserted_ids)
+            except Exception:
+                discard_inserted_rows('sales_data', inserted_ids)
+                raise
+        else:
+            inserted = insert_record_batches('sales_data', records, batch_size)
 
-            # 상품코드가 없으면 빈 문자열로 처리
-            if pd.isna(상품코드):
-                상품코드 = ''
+    # 분할 업로드는 save_upload_file 이후에도 행이 추가되므로 저장 후 다시 무효화
+    if inserted:
+        bump_data_version()
+    return inserted
 
-            분류명 = row.get('분류명', '')
-            카테고리, 업체명 = parse_classification(분류명)
+def save_monthly_data(df, file_id, data_type, strict=False):
+    """월별 판매 데이터 저장 - Supabase bulk insert로 초고속
 
-            batch_data.append({
-                'file_id': file_id,
-                '분류명': str(분류명) if 분류명 else None,
-                '카테고리': 카테고리,
-                '업체명': 업체명,
-                '상품코드': str(상품코드) if 상품코드 else None,
-                '바코드': str(row.get('바코드', '')) if pd.notna(row.get('바코드')) else None,
-                '상품명': 상품명,
-                '판매일': clean_numeric(row.get('판매일')),
-                '주문수': clean_numeric(row.get('주문수')),
-                '주문건': clean_numeric(row.get('주문건')),
-                '주문량': clean_numeric(row.get('주문량')),
-                '판매단가': clean_numeric(row.get('판매단가')),
-                '최종단가': clean_numeric(row.get('최종단가')),
-                '수발주단가': clean_numeric(row.get('수발주단가')),
-                '판매가': clean_numeric(row.get('판매가')),
-                '취소수': clean_numeric(row.get('취소수')),
-                '취소량': clean_numeric(row.get('취소량')),
-                '취소금액': clean_numeric(row.get('취소금액')),
-                '할인량': clean_numeric(row.get('할인량')),
-                '할인금액': clean_numeric(row.get('할인금액')),
-                '판매량': clean_numeric(row.get('판매량')),
-                '실판매단가': clean_numeric(row.get('실판매단가')),
-                '실판매금액': clean_numeric(row.get('실판매금액'))
-            })
+    strict면 Supabase 저장 실패 시 이번에 넣은 행을 지우고 예외를 던진다 (청크 업로드용).
+    """
+    inserted = 0
 
-            if len(batch_data) >= batch_size:
-                try:
-                    supabase_insert('sales_data', batch_data)
-                    inserted += len(batch_data)
-                except Exception as e:
-                    print(f"Bulk insert error: {e}")
-                batch_data = []
-
-        # 남은 데이터 처리
-        if batch_data:
-            try:
-                supabase_insert('sales_data', batch_data)
-                inserted += len(batch_data)
-            except Exception as e:
-                print(f"Bulk insert error: {e}")
+    # 열 단위 전처리 (행마다 clean_numeric / parse_classification / convert_excel_date를 호출하지 않도록)
+    df = source_columns(df)
+    매장명 = source_column(df, '매장명', '').astype(object)
 
-    return inserted
+    # 매장수 합계 행은 건너뛰기
+    keep = ~(매장명.notna() & 매장명.map(str).astype(object).str.contains('매장수', regex=False)).to_numpy()
+    df = df[keep]
 
-def save_monthly_data(df, file_id, data_type):
-    """월별 판매 데이터 저장 - Supabase bulk insert로 초고속"""
-    inserted = 0
+    분류명 = source_column(df, '분류명', '')
+    카테고리, 업체명 = parse_classification_column(분류명)
+    # Excel 시리얼 날짜 변환 적용
+    판매일자 = convert_excel_date_column(source_column(df, '판매일자'))
+    numeric = [clean_numeric_column(source_column(df, col)) for col in MONTHLY_NUMERIC_COLUMNS]
 
     if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        rows = zip(
+            [file_id] * len(df), [data_type] * len(df), 판매일자,
+            source_column(df, '매장코드').astype(object), source_column(df, '매장명').astype(object),
+            분류명.astype(object), 카테고리, 업체명,
+            source_column(df, '상품코드').astype(object), source_column(df, '상품명').astype(object),
+            *numeric
+        )
+        with sqlite_bulk_load('monthly_sales') as (cursor, insert_rows):
+            # 이번에 추가되는 행만 롤업에 더하기 위해 시작 시점의 마지막 id 기록
+            cursor.execute('SELECT IFNULL(MAX(id), 0) FROM monthly_sales')
+            last_id = cursor.fetchone()[0]
 
-        for _, row in df.iterrows():
-            매장명 = row.get('매장명', '')
-            if pd.notna(매장명) and '매장수' in str(매장명):
-                continue
+            inserted = insert_rows('monthly_sales', MONTHLY_INSERT_COLUMNS, rows)
 
-            분류명 = row.get('분류명', '')
-            카테고리, 업체명 = parse_classification(분류명)
-
-            # Excel 시리얼 날짜 변환 적용
-            판매일자 = convert_excel_date(row.get('판매일자'))
-
-            cursor.execute('''
-                INSERT INTO monthly_sales (
-                    file_id, data_type, 판매일자, 매장코드, 매장명, 분류명, 카테고리, 업체명,
-                    상품코드, 상품명, 판매일, 주문수, 주문건, 주문량, 판매단가, 수발주단가,
-                    판매가, 취소수, 취소량, 취소금액, 할인량, 할인금액,
-                    판매량, 실판매단가, 실판매금액
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                file_id, data_type, 판매일자,
-                row.get('매장코드'), row.get('매장명'), 분류명, 카테고리, 업체명,
-                row.get('상품코드'), row.get('상품명'),
-                clean_numeric(row.get('판매일')),
-                clean_numeric(row.get('주문수')), clean_numeric(row.get('주문건')),
-                clean_numeric(row.get('주문량')), clean_numeric(row.get('판매단가')),
-                clean_numeric(row.get('수발주단가')), clean_numeric(row.get('판매가')),
-                clean_numeric(row.get('취소수')), clean_numeric(row.get('취소량')),
-                clean_numeric(row.get('취소금액')), clean_numeric(row.get('할인량')),
-                clean_numeric(row.get('할인금액')), clean_numeric(row.get('판매량')),
-                clean_numeric(row.get('실판매단가')), clean_numeric(row.get('실판매금액'))
-            ))
-            inserted += 1
-
-        conn.commit()
-        conn.close()
+            update_daily_rollup_local(cursor, 'id > ?', (last_id,))
     else:
         # Supabase bulk insert - 1000건씩 한 번에 (초고속!)
         batch_size = 1000
-        batch_data = []
-
-        for _, row in df.iterrows():
-            매장명 = row.get('매장명', '')
-            if pd.notna(매장명) and '매장수' in str(매장명):
-                continue
-
-            분류명 = row.get('분류명', '')
-            카테고리, 업체명 = parse_classification(분류명)
-
-            # Excel 시리얼 날짜 변환 적용
-            판매일자_str = convert_excel_date(row.get('판매일자'))
+        rollup = {}
+
+        columns = {
+            'file_id': [file_id] * len(df),
+            'data_type': [data_type] * len(df),
+            '판매일자': 판매일자,
+            '매장코드': text_column(source_column(df, '매장코드')),
+            '매장명': text_column(source_column(df, '매장명')),
+            '분류명': text_column(분류명, skip_missing=False, skip_falsy=True),
+            '카테고리': 카테고리,
+            '업체명': 업체명,
+            '상품코드': text_column(source_column(df, '상품코드')),
+            '상품명': text_column(source_column(df, '상품명')),
+        }
+        columns.update(zip(MONTHLY_NUMERIC_COLUMNS, numeric))
+        keys = list(columns.keys())
+        records = [dict(zip(keys, values)) for values in zip(*columns.values())]
 
-            batch_data.append({
-                'file_id': file_id,
-                'data_type': data_type,
-                '판매일자': 판매일자_str,
-                '매장코드': str(row.get('매장코드', '')) if pd.notna(row.get('매장코드')) else None,
-                '매장명': str(row.get('매장명', '')) if pd.notna(row.get('매장명')) else None,
-                '분류명': str(분류명) if 분류명 else None,
-                '카테고리': 카테고리,
-                '업체명': 업체명,
-                '상품코드': str(row.get('상품코드', '')) if pd.notna(row.get('상품코드')) else None,
-                '상품명': str(row.get('상품명', '')) if pd.notna(row.get('상품명')) else None,
-                '판매일': clean_numeric(row.get('판매일')),
-                '주문수': clean_numeric(row.get('주문수')),
-                '주문건': clean_numeric(row.get('주문건')),
-                '주문량': clean_numeric(row.get('주문량')),
-                '판매단가': clean_numeric(row.get('판매단가')),
-                '수발주단가': clean_numeric(row.get('수발주단가')),
-                '판매가': clean_numeric(row.get('판매가')),
-                '취소수': clean_numeric(row.get('취소수')),
-                '취소량': clean_numeric(row.get('취소량')),
-                '취소금액': clean_numeric(row.get('취소금액')),
-                '할인량': clean_numeric(row.get('할인량')),
-                '할인금액': clean_numeric(row.get('할인금액')),
-                '판매량': clean_numeric(row.get('판매량')),
-                '실판매단가': clean_numeric(row.get('실판매단가')),
-                '실판매금액': clean_numeric(row.get('실판매금액'))
-            })
+        def add_to_rollup(batch_data):
+            add_rows_to_rollup(rollup, batch_data)
 
-            if len(batch_data) >= batch_size:
-                try:
-                    supabase_insert('monthly_sales', batch_data)
-                    inserted += len(batch_data)
-                except Exception as e:
-                    print(f"Bulk insert error: {e}")
-                batch_data = []
-
-        # 남은 데이터 처리
-        if batch_data:
+        if strict:
+            # 롤업 반영이 실패해도 넣은 행을 지운다 (청크 1000행은 apply_daily_rollup 한 번이라 롤업은 그대로)
+            inserted_ids = []
             try:
-                supabase_insert('monthly_sales', batch_data)
-                inserted += len(batch_data)
-            except Exception as e:
-                print(f"Bulk insert error: {e}")
+                inserted = insert_record_batches('monthly_sales', records, 500, inserted_ids, add_to_rollup)
+                push_daily_rollup(rollup)
+            except Exception:
+                discard_inserted_rows('monthly_sales', inserted_ids)
+                raise
+        else:
+            inserted = insert_record_batches('monthly_sales', records, batch_size, on_batch=add_to_rollup)
+            # 저장된 행만큼 일별 롤업 갱신
+            push_daily_rollup(rollup)
 
+    # 분할 업로드는 save_upload_file 이후에도 행이 추가되므로 저장 후 다시 무효화
+    if inserted:
+        bump_data_version()
     return inserted
 
 def get_upload_files():
@@ -711,6 +1647,18 @@ def get_upload_files():
     else:
         return supabase_select('upload_files', '*', 'status=eq.active', 'upload_date.desc')
 
+def get_upload_file(file_id):
+    """업로드 파일 하나 조회 (활성 파일만, 없으면 None)"""
+    if IS_LOCAL:
+        rows = execute_query('''
+            SELECT id, filename, original_name, file_type, row_count, upload_date, status, data_period
+            FROM upload_files
+            WHERE id = ? AND status = 'active'
+        ''', (file_id,))
+    else:
+        rows = supabase_select('upload_files', '*', f'id=eq.{file_id}&status=eq.active', limit=1)
+    return rows[0] if rows else None
+
 def update_file_period(file_id, data_period):
     """파일의 데이터 기간 메모 업데이트"""
     if IS_LOCAL:
@@ -727,16 +1675,582 @@ def update_file_period(file_id, data_period):
 def delete_file_data(file_id):
     """파일 및 관련 데이터 삭제"""
     if IS_LOCAL:
-        execute_write('DELETE FROM sales_data WHERE file_id = ?', (file_id,))
-        execute_write('DELETE FROM monthly_sales WHERE file_id = ?', (file_id,))
-        execute_write('UPDATE upload_files SET status = "deleted" WHERE id = ?', (file_id,))
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM sales_data WHERE file_id = ?', (file_id,))
+            cursor.execute('DELETE FROM monthly_sales WHERE file_id = ?', (file_id,))
+            cursor.execute('DELETE FROM daily_rollup WHERE file_id = ?', (file_id,))
+            cursor.execute('DELETE FROM upload_chunks WHERE file_id = ?', (file_id,))
+            cursor.execute('UPDATE upload_files SET status = "deleted" WHERE id = ?', (file_id,))
     else:
         supabase_delete('sales_data', f'file_id=eq.{file_id}')
         supabase_delete('monthly_sales', f'file_id=eq.{file_id}')
+        delete_daily_rollup(f'file_id=eq.{file_id}')
+        if upload_ledger_available():
+            supabase_delete('upload_chunks', f'file_id=eq.{file_id}')
         supabase_update('upload_files', {'status': 'deleted'}, f'id=eq.{file_id}')
+    bump_data_version()
+
+# ============ 분할 업로드 청크 기록 ============
+
+# 처리 중(row_count가 NULL)으로 남은 청크를 다른 요청이 다시 가져갈 수 있게 되는 시간 (초)
+# 서버가 저장 도중 죽은 경우에만 남으므로 넉넉하게 둔다
+UPLOAD_CHUNK_CLAIM_TIMEOUT = int(os.environ.get('UPLOAD_CHUNK_CLAIM_TIMEOUT', '300'))
+
+# Supabase 선택 설치 테이블(supabase/*.sql)의 존재 여부 (한 번 확인 후 기억)
+_optional_tables = {}
+
+def supabase_table_available(table, columns='*', script=None):
+    """선택 설치 테이블(또는 컬럼)이 있는지 확인 (없으면 호출한 쪽이 해당 기능을 생략)
+
+    columns를 주면 기존 테이블에 선택 설치 컬럼이 추가되었는지 확인한다.
+    script는 안내할 SQL 파일명 (기본: supabase/<table>.sql).
+    """
+    key = (table, columns)
+    if key not in _optional_tables:
+        try:
+            supabase_select(table, columns, limit=1)
+            _optional_tables[key] = True
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                return False
+            target = table if columns == '*' else f"{table}({columns})"
+            print(f"{target} 없음 ({e.response.status_code}) - supabase/{script or table + '.sql'} 실행 필요")
+            _optional_tables[key] = False
+        except Exception as e:
+            print(f"{table} 확인 실패: {e}")
+            return False
+    return _optional_tables[key]
+
+def upload_ledger_available():
+    """청크 기록 테이블 사용 가능 여부
+
+    Supabase는 supabase/upload_chunks.sql을 실행해야 테이블이 생긴다. 없으면 예전처럼
+    중복 확인 없이 저장한다.
+    """
+    return IS_LOCAL or supabase_table_available('upload_chunks')
+
+def chunk_checksum(rows):
+    """청크 행 목록의 sha256 (같은 청크가 다시 왔는지, 내용이 바뀌었는지 판별)"""
+    payload = json.dumps(rows, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def find_upload_file_id(upload_key):
+    """upload_key로 등록된 활성 파일 id (없으면 None)"""
+    if IS_LOCAL:
+        rows = execute_query("SELECT id FROM upload_files WHERE upload_key = ? AND status = 'active'", (upload_key,))
+    else:
+        if not upload_ledger_available():
+            return None
+        rows = supabase_select('upload_files', 'id', f'upload_key=eq.{quote(upload_key)}&status=eq.active', limit=1)
+    return rows[0]['id'] if rows else None
+
+def increment_file_row_count(file_id, delta):
+    """upload_files.row_count에 delta를 더하기 (동시에 여러 청크가 끝나도 누락 없이)
+
+    로컬은 UPDATE 한 문장으로 원자적으로 더한다. Supabase는 increment_upload_row_count RPC를 쓰고,
+    RPC가 없으면 청크 기록의 row_count 합계로 다시 계산한다.
+    """
+    if IS_LOCAL:
+        execute_write('UPDATE upload_files SET row_count = IFNULL(row_count, 0) + ? WHERE id = ?', (delta, file_id))
+        return
+
+    if supabase_rpc_optional('increment_upload_row_count', {'p_file_id': file_id, 'p_delta': delta}) is not None:
+        return
+    if upload_ledger_available():
+        chunks = supabase_select('upload_chunks', 'row_count', f'file_id=eq.{file_id}&row_count=not.is.null')
+        supabase_update('upload_files', {'row_count': sum(c['row_count'] for c in chunks)}, f'id=eq.{file_id}')
+    else:
+        current = supabase_select('upload_files', 'row_count', f'id=eq.{file_id}')
+        current_count = (current[0]['row_count'] or 0) if current else 0
+        supabase_update('upload_files', {'row_count': current_count + delta}, f'id=eq.{file_id}')
+
+def get_upload_chunks(file_id):
+    """파일의 청크 기록 목록 (chunk_index 순, row_count가 None이면 처리 중)"""
+    if IS_LOCAL:
+        return execute_query('''
+            SELECT chunk_index, row_count, checksum
+            FROM upload_chunks
+            WHERE file_id = ?
+            ORDER BY chunk_index
+        ''', (file_id,))
+    if not upload_ledger_available():
+        return []
+    return supabase_select('upload_chunks', 'chunk_index,row_count,checksum', f'file_id=eq.{file_id}', 'chunk_index.asc')
+
+def save_upload_chunk(file_id, chunk_index, checksum, save_rows):
+    """청크 하나를 한 번만 저장
+
+    save_rows()는 실제 저장 함수(save_sales_data 등, strict=True)를 호출하고 저장 건수를 돌려준다.
+    저장이 실패하면 예외를 던져야 선점이 풀리고 같은 청크를 다시 보낼 수 있다.
+    (상태, 건수)를 반환한다.
+      - 'saved': 이번에 저장함
+      - 'duplicate': 같은 내용의 청크가 이미 저장됨 (건수는 처음 저장한 값)
+      - 'conflict': 같은 번호의 청크가 다른 내용으로 이미 저장됨
+      - 'pending': 다른 요청이 같은 청크를 처리 중
+
+    로컬은 청크 기록 확인, 행 저장, row_count 증가를 한 트랜잭션으로 묶는다.
+    Supabase는 먼저 (file_id, chunk_index) 행을 넣어 청크를 선점하고(UNIQUE), 저장 후 건수를 채운다.
+    """
+    if IS_LOCAL:
+        with transaction(immediate=True) as cursor:
+            cursor.execute('SELECT row_count, checksum FROM upload_chunks WHERE file_id = ? AND chunk_index = ?',
+                           (file_id, chunk_index))
+            existing = cursor.fetchone()
+            if existing is not None:
+                return ('duplicate' if existing['checksum'] == checksum else 'conflict'), existing['row_count']
+
+            inserted = save_rows()
+            cursor.execute('INSERT INTO upload_chunks (file_id, chunk_index, row_count, checksum) VALUES (?, ?, ?, ?)',
+                           (file_id, chunk_index, inserted, checksum))
+            cursor.execute('UPDATE upload_files SET row_count = IFNULL(row_count, 0) + ? WHERE id = ?',
+                           (inserted, file_id))
+        # 저장 함수가 트랜잭션 안에서 올린 data_version은 커밋 전이었으므로 커밋 후 다시 무효화
+        bump_data_version()
+        return 'saved', inserted
+
+    if not upload_ledger_available():
+        inserted = save_rows()
+        increment_file_row_count(file_id, inserted)
+        return 'saved', inserted
+
+    chunk_filter = f'file_id=eq.{file_id}&chunk_index=eq.{chunk_index}'
+    existing = supabase_select('upload_chunks', 'row_count,checksum', chunk_filter, limit=1)
+    if existing:
+        if existing[0]['checksum'] != checksum:
+            return 'conflict', existing[0]['row_count']
+        if existing[0]['row_count'] is not None:
+            return 'duplicate', existing[0]['row_count']
+        # 오래된 선점은 저장 도중 서버가 멈춘 것으로 보고 풀어준다
+        cutoff = quote((datetime.now(timezone.utc) - timedelta(seconds=UPLOAD_CHUNK_CLAIM_TIMEOUT)).isoformat())
+        if not supabase_select('upload_chunks', 'file_id', f'{chunk_filter}&row_count=is.null&created_at=lt.{cutoff}', limit=1):
+            return 'pending', None
+        supabase_delete('upload_chunks', f'{chunk_filter}&row_count=is.null')
+
+    try:
+        supabase_insert('upload_chunks', {'file_id': file_id, 'chunk_index': chunk_index, 'checksum': checksum})
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 409:
+            # 동시에 들어온 같은 청크가 먼저 선점함
+            return 'pending', None
+        raise
+
+    try:
+        inserted = save_rows()
+    except Exception:
+        supabase_delete('upload_chunks', f'{chunk_filter}&row_count=is.null')
+        raise
+    supabase_update('upload_chunks', {'row_count': inserted}, chunk_filter)
+    increment_file_row_count(file_id, inserted)
+    return 'saved', inserted
+
+# ============ 업로드 작업 기록 ============
+
+UPLOAD_JOB_COLUMNS = ['id', 'original_name', 'saved_name', 'file_type', 'status', 'stage',
+                      'rows_parsed', 'rows_written', 'file_id', 'error', 'engine', 'read_seconds',
+                      'owner_pid', 'owner_started', 'created_at', 'started_at', 'finished_at']
+
+def upload_jobs_available():
+    """업로드 작업 테이블 사용 가능 여부 (Supabase는 supabase/upload_jobs.sql 필요)"""
+    return IS_LOCAL or supabase_table_available('upload_jobs')
+
+def save_upload_job(job):
+    """업로드 작업 등록 (job: UPLOAD_JOB_COLUMNS 키를 가진 dict)"""
+    record = {col: job.get(col) for col in UPLOAD_JOB_COLUMNS}
+    if IS_LOCAL:
+        placeholders = ', '.join('?' * len(UPLOAD_JOB_COLUMNS))
+        execute_write(f'INSERT INTO upload_jobs ({", ".join(UPLOAD_JOB_COLUMNS)}) VALUES ({placeholders})',
+                      tuple(record.values()))
+    elif upload_jobs_available():
+        supabase_insert('upload_jobs', record)
+
+def update_upload_job(job_id, fields):
+    """업로드 작업 진행 상황 갱신"""
+    fields = {col: value for col, value in fields.items() if col in UPLOAD_JOB_COLUMNS and col != 'id'}
+    if not fields:
+        return
+    if IS_LOCAL:
+        assignments = ', '.join(f'{col} = ?' for col in fields)
+        execute_write(f'UPDATE upload_jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+    elif upload_jobs_available():
+        supabase_update('upload_jobs', fields, f'id=eq.{job_id}')
+
+def get_upload_job_record(job_id):
+    """저장된 업로드 작업 하나 (없으면 None)"""
+    if IS_LOCAL:
+        rows = execute_query(f'SELECT {", ".join(UPLOAD_JOB_COLUMNS)} FROM upload_jobs WHERE id = ?', (job_id,))
+    elif upload_jobs_available():
+        rows = supabase_select('upload_jobs', ','.join(UPLOAD_JOB_COLUMNS), f'id=eq.{quote(job_id)}', limit=1)
+    else:
+        rows = []
+    return rows[0] if rows else None
+
+def process_start_marker(pid):
+    """프로세스 시작 시각 표시 (Linux /proc의 starttime, 알 수 없으면 None) - 재사용된 pid 구분용"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # 두 번째 필드(실행 파일명)에 공백/괄호가 있을 수 있어 마지막 ')' 뒤부터 센다
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+def process_alive(pid):
+    """pid 프로세스가 실행 중인지"""
+    if os.name == 'nt':
+        # Windows의 os.kill(pid, 0)은 프로세스를 종료시키므로 핸들로 확인
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def upload_job_owner():
+    """작업을 처리하는 현재 프로세스 정보 (owner_pid, owner_started)"""
+    pid = os.getpid()
+    return {'owner_pid': pid, 'owner_started': process_start_marker(pid)}
+
+def upload_job_owner_alive(job):
+    """작업을 맡은 프로세스가 아직 실행 중인지 (owner 기록이 없는 예전 작업은 멈춘 것으로 봄)"""
+    pid = job.get('owner_pid')
+    if not pid or not process_alive(pid):
+        return False
+    started = job.get('owner_started')
+    # 같은 pid를 다른 프로세스가 재사용했으면 시작 시각이 다르다
+    return started is None or process_start_marker(pid) in (None, started)
+
+def fail_interrupted_upload_jobs(message):
+    """서버가 멈추면서 끝나지 못한 작업을 실패로 정리 (로컬 전용, 시작 시 호출)
+
+    맡은 프로세스가 끝난 작업만 정리한다 (다른 서버 프로세스가 처리 중인 작업은 그대로).
+    저장 도중 멈춘 파일은 일부 행만 남으므로 파일 데이터도 지운다.
+    """
+    if not IS_LOCAL:
+        return 0
+    jobs = execute_query('''SELECT id, file_id, owner_pid, owner_started FROM upload_jobs
+                            WHERE status IN ('queued', 'running')''')
+    jobs = [job for job in jobs if not upload_job_owner_alive(job)]
+    for job in jobs:
+        if job['file_id']:
+            delete_file_data(job['file_id'])
+        update_upload_job(job['id'], {'status': 'failed', 'stage': 'failed', 'error': message,
+                                      'finished_at': datetime.now().isoformat()})
+    return len(jobs)
+
+# ============ 원본 데이터 페이지 조회 (커스텀 뷰어) ============
+
+# 파일 타입별 원본 테이블과 조회 가능한 컬럼 (정렬/필터 컬럼은 이 목록으로 검증)
+CUSTOM_DATA_SOURCES = {
+    'monthly': ('monthly_sales', MONTHLY_INSERT_COLUMNS[1:], MONTHLY_NUMERIC_COLUMNS),
+    'sales': ('sales_data', SALES_INSERT_COLUMNS[1:], SALES_NUMERIC_COLUMNS),
+}
+CUSTOM_DATA_DATE_COLUMNS = ('판매일자',)
+CUSTOM_DATA_PAGE_SIZE = 500
+CUSTOM_DATA_MAX_PAGE_SIZE = 5000
+
+def get_custom_data_source(file_type):
+    """파일 타입의 (테이블, 컬럼 목록, 숫자 컬럼 목록)"""
+    return CUSTOM_DATA_SOURCES['monthly' if file_type == 'monthly' else 'sales']
+
+def _date_prefix_range(value):
+    """'2025', '2025-03', '2025-03-04' 형태의 날짜 필터를 (시작일, 종료일)로 변환 (형식이 다르면 None)"""
+    try:
+        if len(value) == 4:
+            year = int(value)
+            return f"{year:04d}-01-01", f"{year:04d}-12-31"
+        if len(value) == 7:
+            start = datetime.strptime(value, '%Y-%m')
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        if len(value) == 10:
+            day = datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+            return day, day
+    except ValueError:
+        pass
+    return None
+
+def _custom_data_conditions(columns, numeric_columns, filters):
+    """컬럼 필터를 (SQLite 조건 목록, 파라미터, PostgREST 필터 목록)으로 변환
+
+    문자열 컬럼은 부분 일치, 숫자 컬럼은 같은 값, 판매일자는 연/월/일 단위 범위로 거른다.
+    """
+    sql, params, rest = [], [], []
+    for col, value in (filters or {}).items():
+        value = str(value).strip()
+        if col not in columns or not value:
+            continue
+        if col in numeric_columns:
+            try:
+                number = float(value.replace(',', ''))
+            except ValueError:
+                continue
+            sql.append(f'"{col}" = ?')
+            params.append(number)
+            rest.append(f'{col}=eq.{number}')
+            continue
+        date_range = _date_prefix_range(value) if col in CUSTOM_DATA_DATE_COLUMNS else None
+        if date_range:
+            sql.append(f'"{col}" >= ? AND "{col}" <= ?')
+            params.extend(date_range)
+            rest.append(f'{col}=gte.{date_range[0]}&{col}=lte.{date_range[1]}')
+        else:
+            escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            sql.append(f'"{col}" LIKE ? ESCAPE \'\\\'')
+            params.append(f'%{escaped}%')
+            rest.append(f"{col}=ilike.{quote('*' + value + '*', safe='*')}")
+    return sql, params, rest
+
+def _sqlite_keyset_condition(col, ascending, nulls_first, last_value, last_id):
+    """(정렬컬럼, id) 커서 다음 행 조건 - _keyset_cursor_filter의 SQLite 버전"""
+    if col == 'id':
+        return f"id {'>' if ascending else '<'} ?", [last_id]
+    if last_value is None:
+        if nulls_first:
+            return f'("{col}" IS NOT NULL OR id > ?)', [last_id]
+        return f'("{col}" IS NULL AND id > ?)', [last_id]
+    condition = f'("{col}" {">" if ascending else "<"} ? OR ("{col}" = ? AND id > ?)'
+    if not nulls_first:
+        condition += f' OR "{col}" IS NULL'
+    return condition + ')', [last_value, last_value, last_id]
+
+def get_custom_data_page(file_id, file_type, page_size=CUSTOM_DATA_PAGE_SIZE, after_id=None, after_value=None,
+                         sort=None, descending=False, filters=None, with_total=False):
+    """파일 원본 데이터 한 페이지 조회 (커서 기반)
+
+    (정렬컬럼, id) keyset 커서로 다음 페이지를 가져오므로 뒤 페이지도 같은 비용이다.
+    정렬은 PostgreSQL 기본값과 같이 ASC는 NULL을 뒤에, DESC는 NULL을 앞에 둔다.
+
+    Returns:
+        dict: rows(id 포함), columns, next_cursor({'after_id', 'after_value'} 또는 None), total(with_total일 때)
+    """
+    table, columns, numeric_columns = get_custom_data_source(file_type)
+    page_size = max(1, min(int(page_size or CUSTOM_DATA_PAGE_SIZE), CUSTOM_DATA_MAX_PAGE_SIZE))
+    sort_col = sort if sort in columns else 'id'
+    ascending = not descending
+    nulls_first = descending
+    sql_conditions, sql_params, rest_filters = _custom_data_conditions(columns, numeric_columns, filters)
+
+    if sort_col in numeric_columns and after_value is not None:
+        after_value = float(after_value)
+
+    page = {'columns': columns}
+    if IS_LOCAL:
+        where = ['file_id = ?'] + sql_conditions
+        params = [file_id] + sql_params
+        if with_total:
+            page['total'] = execute_query(f'SELECT COUNT(*) as cnt FROM {table} WHERE {" AND ".join(where)}', params)[0]['cnt']
+        if after_id is not None:
+            condition, cursor_params = _sqlite_keyset_condition(sort_col, ascending, nulls_first, after_value, after_id)
+            where.append(condition)
+            params += cursor_params
+        if sort_col == 'id':
+            order_by = f"id {'ASC' if ascending else 'DESC'}"
+        else:
+            order_by = f'"{sort_col}" {"ASC" if ascending else "DESC"} NULLS {"FIRST" if nulls_first else "LAST"}, id ASC'
+        select_columns = ', '.join(['id'] + [f'"{c}"' for c in columns])
+        rows = execute_query(f'''
+            SELECT {select_columns}
+            FROM {table}
+            WHERE {" AND ".join(where)}
+            ORDER BY {order_by}
+            LIMIT ?
+        ''', params + [page_size])
+    else:
+        base_filters = '&'.join([f'file_id=eq.{file_id}'] + rest_filters)
+        if with_total:
+            page['total'] = supabase_count(table, base_filters)
+        page_filters = base_filters
+        if after_id is not None:
+            last_row = {sort_col: after_value, 'id': after_id}
+            page_filters += '&' + _keyset_cursor_filter(sort_col, ascending, nulls_first, last_row)
+        if sort_col == 'id':
+            order = f"id.{'asc' if ascending else 'desc'}"
+        else:
+            order = f"{sort_col}.{'asc' if ascending else 'desc'}.{'nullsfirst' if nulls_first else 'nullslast'},id.asc"
+        rows = supabase_select(table, ','.join(['id'] + columns), page_filters, order=order, limit=page_size)
+
+    page['rows'] = rows
+    page['next_cursor'] = None
+    if len(rows) == page_size:
+        last = rows[-1]
+        page['next_cursor'] = {'after_id': last['id'], 'after_value': None if sort_col == 'id' else last.get(sort_col)}
+    return page
+
+def iter_custom_data(file_id, file_type, after_id=None, after_value=None, sort=None, descending=False, filters=None):
+    """파일 원본 데이터 전체를 페이지 단위로 읽어 행을 하나씩 넘겨주는 generator (NDJSON 스트리밍용)
+
+    get_custom_data_page를 커서로 이어 부르므로 정렬/필터/커서 규칙이 같고,
+    메모리에는 한 페이지(CUSTOM_DATA_MAX_PAGE_SIZE행)만 올라간다.
+    """
+    while True:
+        page = get_custom_data_page(file_id, file_type, page_size=CUSTOM_DATA_MAX_PAGE_SIZE,
+                                    after_id=after_id, after_value=after_value,
+                                    sort=sort, descending=descending, filters=filters)
+        yield from page['rows']
+        if not page['next_cursor']:
+            break
+        after_id = page['next_cursor']['after_id']
+        after_value = page['next_cursor']['after_value']
+
+# ============ 조회 결과 캐시 ============
+
+# 대시보드 집계는 업로드/삭제/초기화/복원 때만 바뀌므로, 그때마다 data_version을
+# 새 토큰으로 바꾸고 (함수, 인자, data_version)을 키로 결과를 캐시한다.
+_data_version = {'value': None, 'checked': 0.0}
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+# 조회 오류로 대체값(0/빈 목록)을 돌려준 횟수 - 계산 중에 값이 바뀐 결과는 캐시하지 않는다
+_result_errors = {'count': 0}
+
+def get_data_version():
+    """현재 data_version 조회 (DATA_VERSION_TTL 동안은 메모리 값 사용)
+
+    app_meta 테이블이 없거나 조회에 실패하면 None을 반환하고, 이때는 캐시를 쓰지 않는다.
+    """
+    now = time.monotonic()
+    with _result_cache_lock:
+        if _data_version['value'] is not None and now - _data_version['checked'] < DATA_VERSION_TTL:
+            return _data_version['value']
+
+    try:
+        if IS_LOCAL:
+            rows = execute_query("SELECT value FROM app_meta WHERE key = 'data_version'")
+        else:
+            rows = supabase_select('app_meta', 'value', 'key=eq.data_version')
+        version = rows[0]['value'] if rows else '0'
+    except Exception as e:
+        print(f"data_version 조회 실패 (캐시 사용 안 함): {e}")
+        version = None
+
+    with _result_cache_lock:
+        if version != _data_version['value']:
+            _result_cache.clear()
+        _data_version['value'] = version
+        _data_version['checked'] = now
+    return version
+
+def bump_data_version():
+    """데이터 변경 후 data_version을 새 토큰으로 교체 (기존 캐시 무효화)"""
+    token = uuid.uuid4().hex
+    try:
+        if IS_LOCAL:
+            execute_write('''INSERT INTO app_meta (key, value, updated_at) VALUES ('data_version', ?, CURRENT_TIMESTAMP)
+                             ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at''', (token,))
+        else:
+            if not supabase_update('app_meta', {'value': token, 'updated_at': datetime.now(KST).isoformat()}, 'key=eq.data_version'):
+                supabase_insert('app_meta', {'key': 'data_version', 'value': token})
+    except Exception as e:
+        print(f"data_version 갱신 실패: {e}")
+        token = None
+
+    with _result_cache_lock:
+        _result_cache.clear()
+        _data_version['value'] = token
+        _data_version['checked'] = time.monotonic()
+    return token
+
+def _result_cache_path(key_hash):
+    return os.path.join(RESULT_CACHE_DIR, f"{key_hash}.json")
+
+def _load_file_cache(key_hash, version):
+    """파일 캐시에서 결과 읽기 (같은 data_version으로 저장된 것만 사용)"""
+    try:
+        with open(_result_cache_path(key_hash), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get('version') == version:
+            return entry.get('result')
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _store_file_cache(key_hash, version, result):
+    """파일 캐시에 결과 저장 (임시 파일에 쓴 뒤 교체해 동시 읽기에도 안전)"""
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        path = _result_cache_path(key_hash)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'result': result}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"결과 캐시 파일 저장 실패: {e}")
+
+def mark_result_uncacheable():
+    """조회 함수가 오류 때문에 대체값을 돌려줄 때 호출 (그 사이 계산된 결과는 캐시하지 않음)
+
+    패널 조회는 여러 스레드에서 동시에 실행되므로 호출 스레드와 관계없이 전역 카운터를 올린다.
+    다른 요청의 오류와 겹치면 정상 결과도 한 번 캐시하지 않을 뿐이다.
+    """
+    with _result_cache_lock:
+        _result_errors['count'] += 1
+
+def cached_result(func):
+    """조회 함수 결과를 (함수, 인자, data_version) 키로 캐시하는 데코레이터
+
+    메모리 LRU(RESULT_CACHE_SIZE개) → 파일 캐시(RESULT_CACHE_DIR 설정 시) 순으로 찾고,
+    없으면 계산해서 둘 다 저장한다. 빈 결과와, 계산 중에 mark_result_uncacheable()이
+    호출된 결과(오류 시 대체값, 그 값을 포함한 묶음)는 캐시하지 않는다.
+    캐시된 객체를 그대로 반환하므로 호출하는 쪽에서 수정하지 않아야 한다.
+    """
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        version = get_data_version() if RESULT_CACHE_SIZE > 0 else None
+        if version is None:
+            return func(*args, **kwargs)
+
+        # 위치/키워드 인자와 기본값을 정규화해서 같은 호출은 같은 키가 되도록
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        call_key = json.dumps([func.__name__, list(bound.arguments.items())], default=str, ensure_ascii=False)
+        key = (call_key, version)
+
+        with _result_cache_lock:
+            if key in _result_cache:
+                _result_cache.move_to_end(key)
+                return _result_cache[key]
+
+        key_hash = None
+        result = None
+        if RESULT_CACHE_DIR:
+            # 파일명에는 data_version을 넣지 않아 같은 호출은 같은 파일을 덮어쓴다
+            key_hash = hashlib.sha1(call_key.encode('utf-8')).hexdigest()
+            result = _load_file_cache(key_hash, version)
+
+        if result is None:
+            errors = _result_errors['count']
+            result = func(*args, **kwargs)
+            if not result or _result_errors['count'] != errors:
+                return result
+            if key_hash:
+                _store_file_cache(key_hash, version, result)
+
+        with _result_cache_lock:
+            _result_cache[key] = result
+            _result_cache.move_to_end(key)
+            while len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+        return result
+
+    return wrapper
 
 # ============ 통계 조회 함수들 ============
 
+@cached_result
 def get_summary_stats(file_id=None, start_date=None, end_date=None):
     """요약 통계 (file_id, 날짜로 필터링 가능)"""
     stats = {}
@@ -787,11 +2301,18 @@ def get_summary_stats(file_id=None, start_date=None, end_date=None):
         ''')
         stats['by_type'] = {row['data_type']: row['cnt'] for row in result if row.get('data_type')}
     else:
+        # 서버측 집계 함수 우선 사용
+        result = supabase_rpc_optional('dashboard_summary_stats', {
+            'p_file_id': file_id, 'p_start_date': start_date, 'p_end_date': end_date
+        })
+        if result is not None:
+            return result
+
         # Supabase - file_id 및 날짜 필터링 적용
         try:
             # sales_data 필터
             sales_filter = f'file_id=eq.{file_id}' if file_id else None
-            sales = supabase_select('sales_data', '*', sales_filter) if sales_filter else supabase_select('sales_data', '*')
+            sales = supabase_select('sales_data', '실판매금액,판매량,상품코드,업체명,카테고리', sales_filter, parallel=True)
 
             # monthly_sales 필터 (날짜 조건 포함)
             monthly_filters = []
@@ -802,7 +2323,7 @@ def get_summary_stats(file_id=None, start_date=None, end_date=None):
             if end_date:
                 monthly_filters.append(f'판매일자=lte.{end_date}')
             monthly_filter = '&'.join(monthly_filters) if monthly_filters else None
-            monthly = supabase_select('monthly_sales', '*', monthly_filter) if monthly_filter else supabase_select('monthly_sales', '*')
+            monthly = supabase_select('monthly_sales', '실판매금액,판매량,매장명,data_type', monthly_filter, parallel=True)
 
             stats['original'] = {
                 'total_records': len(sales),
@@ -825,6 +2346,7 @@ def get_summary_stats(file_id=None, start_date=None, end_date=None):
                     type_counts[dt] = type_counts.get(dt, 0) + 1
             stats['by_type'] = type_counts
         except:
+            mark_result_uncacheable()
             stats = {
                 'original': {'total_records': 0, 'total_sales': 0, 'total_qty': 0, 'unique_products': 0, 'unique_suppliers': 0, 'unique_categories': 0},
                 'monthly': {'total_records': 0, 'total_sales': 0, 'total_qty': 0, 'unique_stores': 0},
@@ -833,6 +2355,7 @@ def get_summary_stats(file_id=None, start_date=None, end_date=None):
 
     return stats
 
+@cached_result
 def get_sales_by_supplier(file_id=None):
     """업체별 매출 (file_id로 필터링 가능)"""
     file_filter_and = f"AND file_id = {file_id}" if file_id else ""
@@ -851,12 +2374,18 @@ def get_sales_by_supplier(file_id=None):
             LIMIT 30
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_sales_by_supplier', {'p_file_id': file_id})
+        if rows is not None:
+            return rows
+
         try:
             # file_id 필터링 적용
+            columns = '업체명,실판매금액,판매량,상품코드'
             if file_id:
-                sales = supabase_select('sales_data', '*', f'업체명=not.is.null&file_id=eq.{file_id}')
+                sales = supabase_select('sales_data', columns, f'업체명=not.is.null&file_id=eq.{file_id}')
             else:
-                sales = supabase_select('sales_data', '*', '업체명=not.is.null')
+                sales = supabase_select('sales_data', columns, '업체명=not.is.null')
             agg = {}
             for r in sales:
                 supplier = r.get('업체명')
@@ -870,8 +2399,10 @@ def get_sales_by_supplier(file_id=None):
             result = [{'업체명': k, '매출액': v['매출액'], '판매량': v['판매량'], '상품수': len(v['상품수'])} for k, v in agg.items()]
             return sorted(result, key=lambda x: x['매출액'], reverse=True)[:30]
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_sales_by_category(file_id=None):
     """카테고리별 매출 (file_id로 필터링 가능)"""
     file_filter_and = f"AND file_id = {file_id}" if file_id else ""
@@ -890,12 +2421,18 @@ def get_sales_by_category(file_id=None):
             LIMIT 30
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_sales_by_category', {'p_file_id': file_id})
+        if rows is not None:
+            return rows
+
         try:
             # file_id 필터링 적용
+            columns = '카테고리,실판매금액,판매량,상품코드'
             if file_id:
-                sales = supabase_select('sales_data', '*', f'카테고리=not.is.null&file_id=eq.{file_id}')
+                sales = supabase_select('sales_data', columns, f'카테고리=not.is.null&file_id=eq.{file_id}')
             else:
-                sales = supabase_select('sales_data', '*', '카테고리=not.is.null')
+                sales = supabase_select('sales_data', columns, '카테고리=not.is.null')
             agg = {}
             for r in sales:
                 cat = r.get('카테고리')
@@ -909,8 +2446,10 @@ def get_sales_by_category(file_id=None):
             result = [{'카테고리': k, '매출액': v['매출액'], '판매량': v['판매량'], '상품수': len(v['상품수'])} for k, v in agg.items()]
             return sorted(result, key=lambda x: x['매출액'], reverse=True)[:30]
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_top_products(file_id=None):
     """베스트셀러 상품 (file_id로 필터링 가능)"""
     file_filter = f"WHERE file_id = {file_id}" if file_id else ""
@@ -932,12 +2471,18 @@ def get_top_products(file_id=None):
             LIMIT 100
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_top_products', {'p_file_id': file_id})
+        if rows is not None:
+            return rows
+
         try:
             # file_id 필터링 적용 - 전체 데이터 조회 (페이지네이션으로 자동 처리)
+            columns = '상품코드,상품명,분류명,업체명,카테고리,실판매금액,판매량'
             if file_id:
-                sales = supabase_select('sales_data', '*', f'file_id=eq.{file_id}')
+                sales = supabase_select('sales_data', columns, f'file_id=eq.{file_id}')
             else:
-                sales = supabase_select('sales_data', '*')
+                sales = supabase_select('sales_data', columns)
             agg = {}
             for r in sales:
                 code = r.get('상품코드')
@@ -957,8 +2502,10 @@ def get_top_products(file_id=None):
                 agg[code]['판매량'] += float(r.get('판매량') or 0)
             return sorted(agg.values(), key=lambda x: x['실판매금액'], reverse=True)[:100]
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_daily_sales(file_id=None, start_date=None, end_date=None):
     """일별 매출 (file_id, 날짜로 필터링 가능)"""
     file_filter_and = f"AND file_id = {file_id}" if file_id else ""
@@ -969,18 +2516,26 @@ def get_daily_sales(file_id=None, start_date=None, end_date=None):
         date_filter_and += f" AND 판매일자 <= '{end_date}'"
 
     if IS_LOCAL:
+        # 일별 롤업에서 집계 (키의 NULL은 빈 문자열로 저장됨)
         return execute_query(f'''
             SELECT
                 판매일자,
                 SUM(실판매금액) as 실판매금액,
                 SUM(판매량) as 판매량,
-                COUNT(*) as 건수
-            FROM monthly_sales
-            WHERE 판매일자 IS NOT NULL {file_filter_and} {date_filter_and}
+                SUM(건수) as 건수
+            FROM daily_rollup
+            WHERE 판매일자 != '' {file_filter_and} {date_filter_and}
             GROUP BY 판매일자
             ORDER BY 판매일자
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (jsonb 배열이라 max-rows에 잘리지 않음, 없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_daily_sales_json', {
+            'p_file_id': file_id, 'p_start_date': start_date, 'p_end_date': end_date
+        })
+        if rows is not None:
+            return rows
+
         try:
             # 날짜 필터 포함 Supabase 쿼리
             filters = ['판매일자=not.is.null']
@@ -990,7 +2545,7 @@ def get_daily_sales(file_id=None, start_date=None, end_date=None):
                 filters.append(f'판매일자=gte.{start_date}')
             if end_date:
                 filters.append(f'판매일자=lte.{end_date}')
-            monthly = supabase_select('monthly_sales', '*', '&'.join(filters))
+            monthly = supabase_select('monthly_sales', '판매일자,실판매금액,판매량', '&'.join(filters))
             agg = {}
             for r in monthly:
                 date = r.get('판매일자')
@@ -1003,8 +2558,10 @@ def get_daily_sales(file_id=None, start_date=None, end_date=None):
                 agg[date]['건수'] += 1
             return sorted(agg.values(), key=lambda x: x['판매일자'])
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_weekly_sales(file_id=None, start_date=None, end_date=None):
     """주간별 매출 (일별 데이터를 주 단위로 집계, file_id, 날짜로 필터링 가능)"""
     file_filter_and = f" AND file_id = {file_id}" if file_id else ""
@@ -1015,7 +2572,7 @@ def get_weekly_sales(file_id=None, start_date=None, end_date=None):
         date_filter_and += f" AND 판매일자 <= '{end_date}'"
 
     if IS_LOCAL:
-        # SQLite에서 주차 계산: strftime('%W', date)는 주차 번호 반환
+        # SQLite에서 주차 계산: strftime('%W', date)는 주차 번호 반환 (일별 롤업에서 집계)
         return execute_query(f'''
             SELECT
                 SUBSTR(판매일자, 1, 4) || '-W' || PRINTF('%02d', CAST(STRFTIME('%W', 판매일자) AS INTEGER) + 1) as 주차,
@@ -1023,14 +2580,21 @@ def get_weekly_sales(file_id=None, start_date=None, end_date=None):
                 MAX(판매일자) as 종료일,
                 SUM(실판매금액) as 실판매금액,
                 SUM(판매량) as 판매량,
-                COUNT(*) as 건수,
-                COUNT(DISTINCT 매장명) as 매장수
-            FROM monthly_sales
-            WHERE 판매일자 IS NOT NULL {file_filter_and} {date_filter_and}
+                SUM(건수) as 건수,
+                COUNT(DISTINCT NULLIF(매장명, '')) as 매장수
+            FROM daily_rollup
+            WHERE 판매일자 != '' {file_filter_and} {date_filter_and}
             GROUP BY SUBSTR(판매일자, 1, 4), STRFTIME('%W', 판매일자)
             ORDER BY 주차
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_weekly_sales', {
+            'p_file_id': file_id, 'p_start_date': start_date, 'p_end_date': end_date
+        })
+        if rows is not None:
+            return rows
+
         try:
             # 날짜 필터 포함 Supabase 쿼리
             filters = ['판매일자=not.is.null']
@@ -1040,7 +2604,7 @@ def get_weekly_sales(file_id=None, start_date=None, end_date=None):
                 filters.append(f'판매일자=gte.{start_date}')
             if end_date:
                 filters.append(f'판매일자=lte.{end_date}')
-            monthly = supabase_select('monthly_sales', '*', '&'.join(filters))
+            monthly = supabase_select('monthly_sales', '판매일자,실판매금액,판매량,매장명', '&'.join(filters))
 
             # 주차별 집계
             agg = {}
@@ -1092,8 +2656,10 @@ def get_weekly_sales(file_id=None, start_date=None, end_date=None):
             } for v in agg.values()]
             return sorted(result, key=lambda x: x['주차'])
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_monthly_sales(file_id=None, start_date=None, end_date=None):
     """월별 매출 (일별 데이터를 월 단위로 집계, file_id, 날짜로 필터링 가능)"""
     file_filter_and = f"AND file_id = {file_id}" if file_id else ""
@@ -1104,19 +2670,27 @@ def get_monthly_sales(file_id=None, start_date=None, end_date=None):
         date_filter_and += f" AND 판매일자 <= '{end_date}'"
 
     if IS_LOCAL:
+        # 일별 롤업에서 집계
         return execute_query(f'''
             SELECT
                 SUBSTR(판매일자, 1, 7) as 월,
                 SUM(실판매금액) as 실판매금액,
                 SUM(판매량) as 판매량,
-                COUNT(*) as 건수,
-                COUNT(DISTINCT 매장명) as 매장수
-            FROM monthly_sales
-            WHERE 판매일자 IS NOT NULL {file_filter_and} {date_filter_and}
+                SUM(건수) as 건수,
+                COUNT(DISTINCT NULLIF(매장명, '')) as 매장수
+            FROM daily_rollup
+            WHERE 판매일자 != '' {file_filter_and} {date_filter_and}
             GROUP BY SUBSTR(판매일자, 1, 7)
             ORDER BY 월
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_monthly_sales', {
+            'p_file_id': file_id, 'p_start_date': start_date, 'p_end_date': end_date
+        })
+        if rows is not None:
+            return rows
+
         try:
             # 날짜 필터 포함 Supabase 쿼리
             filters = ['판매일자=not.is.null']
@@ -1126,7 +2700,7 @@ def get_monthly_sales(file_id=None, start_date=None, end_date=None):
                 filters.append(f'판매일자=gte.{start_date}')
             if end_date:
                 filters.append(f'판매일자=lte.{end_date}')
-            monthly = supabase_select('monthly_sales', '*', '&'.join(filters))
+            monthly = supabase_select('monthly_sales', '판매일자,실판매금액,판매량,매장명', '&'.join(filters))
             agg = {}
             for r in monthly:
                 date = r.get('판매일자')
@@ -1143,8 +2717,10 @@ def get_monthly_sales(file_id=None, start_date=None, end_date=None):
             result = [{'월': k, '실판매금액': v['실판매금액'], '판매량': v['판매량'], '건수': v['건수'], '매장수': len(v['매장수'])} for k, v in agg.items()]
             return sorted(result, key=lambda x: x['월'])
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_store_sales(file_id=None, start_date=None, end_date=None):
     """매장별 매출 (file_id, 날짜로 필터링 가능)"""
     file_filter_and = f"AND file_id = {file_id}" if file_id else ""
@@ -1155,19 +2731,27 @@ def get_store_sales(file_id=None, start_date=None, end_date=None):
         date_filter_and += f" AND 판매일자 <= '{end_date}'"
 
     if IS_LOCAL:
+        # 일별 롤업에서 집계
         return execute_query(f'''
             SELECT
                 매장명,
                 SUM(실판매금액) as 실판매금액,
                 SUM(판매량) as 판매량,
-                COUNT(*) as 건수
-            FROM monthly_sales
-            WHERE 매장명 IS NOT NULL AND 매장명 != '' {file_filter_and} {date_filter_and}
+                SUM(건수) as 건수
+            FROM daily_rollup
+            WHERE 매장명 != '' {file_filter_and} {date_filter_and}
             GROUP BY 매장명
             ORDER BY 실판매금액 DESC
             LIMIT 30
         ''')
     else:
+        # 서버측 집계 함수 우선 사용 (없으면 Python 집계)
+        rows = supabase_rpc_optional('dashboard_store_sales', {
+            'p_file_id': file_id, 'p_start_date': start_date, 'p_end_date': end_date
+        })
+        if rows is not None:
+            return rows
+
         try:
             # 날짜 필터 포함 Supabase 쿼리
             filters = ['매장명=not.is.null']
@@ -1177,7 +2761,7 @@ def get_store_sales(file_id=None, start_date=None, end_date=None):
                 filters.append(f'판매일자=gte.{start_date}')
             if end_date:
                 filters.append(f'판매일자=lte.{end_date}')
-            monthly = supabase_select('monthly_sales', '*', '&'.join(filters))
+            monthly = supabase_select('monthly_sales', '매장명,실판매금액,판매량', '&'.join(filters))
             agg = {}
             for r in monthly:
                 store = r.get('매장명')
@@ -1190,8 +2774,10 @@ def get_store_sales(file_id=None, start_date=None, end_date=None):
                 agg[store]['건수'] += 1
             return sorted(agg.values(), key=lambda x: x['실판매금액'], reverse=True)[:30]
         except:
+            mark_result_uncacheable()
             return []
 
+@cached_result
 def get_supplier_category_matrix(file_id=None):
     """업체-카테고리-상품그룹-옵션 4단계 계층 구조 (드릴다운용, file_id로 필터링 가능)
 
@@ -1214,23 +2800,32 @@ def get_supplier_category_matrix(file_id=None):
             ORDER BY 매출액 DESC
         ''')
     else:
-        try:
-            if file_id:
-                sales = supabase_select('sales_data', '*', f'업체명=not.is.null&file_id=eq.{file_id}')
-            else:
-                sales = supabase_select('sales_data', '*', '업체명=not.is.null')
-            # 집계
-            agg = {}
-            for r in sales:
-                key = (r.get('업체명'), r.get('카테고리'), r.get('상품코드'), r.get('상품명'))
-                if key not in agg:
-                    agg[key] = {'업체명': r.get('업체명'), '카테고리': r.get('카테고리'), '상품코드': r.get('상품코드'), '상품명': r.get('상품명'), '매출액': 0, '판매량': 0}
-                agg[key]['매출액'] += float(r.get('실판매금액') or 0)
-                agg[key]['판매량'] += float(r.get('판매량') or 0)
-            result = list(agg.values())
-        except:
-            result = []
-
+        # 서버측 집계 함수 우선 사용 (jsonb 배열이라 max-rows에 잘리지 않음, 없으면 Python 집계)
+        result = supabase_rpc_optional('dashboard_supplier_category_json', {'p_file_id': file_id})
+        if result is None:
+            try:
+                columns = '업체명,카테고리,상품코드,상품명,실판매금액,판매량'
+                if file_id:
+                    sales = supabase_select('sales_data', columns, f'업체명=not.is.null&file_id=eq.{file_id}')
+                else:
+                    sales = supabase_select('sales_data', columns, '업체명=not.is.null')
+                # 집계
+                agg = {}
+                for r in sales:
+                    key = (r.get('업체명'), r.get('카테고리'), r.get('상품코드'), r.get('상품명'))
+                    if key not in agg:
+                        agg[key] = {'업체명': r.get('업체명'), '카테고리': r.get('카테고리'), '상품코드': r.get('상품코드'), '상품명': r.get('상품명'), '매출액': 0, '판매량': 0}
+                    agg[key]['매출액'] += float(r.get('실판매금액') or 0)
+                    agg[key]['판매량'] += float(r.get('판매량') or 0)
+                result = list(agg.values())
+            except:
+                mark_result_uncacheable()
+                result = []
+
+    return build_supplier_category_hierarchy(result)
+
+def build_supplier_category_hierarchy(result):
+    """업체-카테고리 집계 행으로 4단계 계층 구조 생성 (업체 → 카테고리 → 상품그룹 → 옵션)"""
     # 4단계 계층 구조 생성: 업체 → 카테고리 → 상품그룹 → 옵션
     hierarchy = {}
 
@@ -1344,6 +2939,7 @@ def get_supplier_category_matrix(file_id=None):
 
     return sorted_suppliers
 
+@cached_result
 def get_store_category_matrix(file_id=None):
     """매장-카테고리-상품 계층 구조 (드릴다운용, file_id로 필터링 가능) - 매장별 뭐가 많이 팔리는지 분석"""
     file_filter_and = f"AND file_id = {file_id}" if file_id else ""
@@ -1362,22 +2958,31 @@ def get_store_category_matrix(file_id=None):
             ORDER BY 매출액 DESC
         ''')
     else:
-        try:
-            if file_id:
-                monthly = supabase_select('monthly_sales', '*', f'매장명=not.is.null&file_id=eq.{file_id}')
-            else:
-                monthly = supabase_select('monthly_sales', '*', '매장명=not.is.null')
-            agg = {}
-            for r in monthly:
-                key = (r.get('매장명'), r.get('분류명'), r.get('상품코드'), r.get('상품명'))
-                if key not in agg:
-                    agg[key] = {'매장명': r.get('매장명'), '분류명': r.get('분류명'), '상품코드': r.get('상품코드'), '상품명': r.get('상품명'), '매출액': 0, '판매량': 0}
-                agg[key]['매출액'] += float(r.get('실판매금액') or 0)
-                agg[key]['판매량'] += float(r.get('판매량') or 0)
-            result = list(agg.values())
-        except:
-            result = []
-
+        # 서버측 집계 함수 우선 사용 (jsonb 배열이라 max-rows에 잘리지 않음, 없으면 Python 집계)
+        result = supabase_rpc_optional('dashboard_store_category_json', {'p_file_id': file_id})
+        if result is None:
+            try:
+                columns = '매장명,분류명,상품코드,상품명,실판매금액,판매량'
+                if file_id:
+                    monthly = supabase_select('monthly_sales', columns, f'매장명=not.is.null&file_id=eq.{file_id}', parallel=True)
+                else:
+                    monthly = supabase_select('monthly_sales', columns, '매장명=not.is.null', parallel=True)
+                agg = {}
+                for r in monthly:
+                    key = (r.get('매장명'), r.get('분류명'), r.get('상품코드'), r.get('상품명'))
+                    if key not in agg:
+                        agg[key] = {'매장명': r.get('매장명'), '분류명': r.get('분류명'), '상품코드': r.get('상품코드'), '상품명': r.get('상품명'), '매출액': 0, '판매량': 0}
+                    agg[key]['매출액'] += float(r.get('실판매금액') or 0)
+                    agg[key]['판매량'] += float(r.get('판매량') or 0)
+                result = list(agg.values())
+            except:
+                mark_result_uncacheable()
+                result = []
+
+    return build_store_category_hierarchy(result)
+
+def build_store_category_hierarchy(result):
+    """매장-분류 집계 행으로 계층 구조 생성 (매장 → 카테고리 → 상품)"""
     # 계층 구조 생성
     hierarchy = {}
 
@@ -1428,6 +3033,260 @@ def get_store_category_matrix(file_id=None):
 
     return sorted_stores
 
+# ============ 대시보드 묶음 조회 ============
+
+# Supabase 폴백에서 한 번만 내려받는 컬럼 (모든 패널 집계에 필요한 합집합)
+BUNDLE_SALES_COLUMNS = '업체명,카테고리,상품코드,상품명,분류명,실판매금액,판매량'
+BUNDLE_MONTHLY_COLUMNS = '판매일자,매장명,분류명,상품코드,상품명,실판매금액,판매량,data_type'
+
+@cached_result
+def get_dashboard_bundle(file_id=None, start_date=None, end_date=None):
+    """대시보드 전체 패널 한 번에 조회 (/api/dashboard-bundle)
+
+    날짜 필터는 패널별 API와 같이 요약/일별/주간/월별/매장별에만 적용한다.
+    Supabase는 dashboard_bundle RPC 한 번으로 가져오고, 함수가 없으면
+    sales_data/monthly_sales를 각각 한 번만 내려받아 모든 패널을 한 번에 집계한다.
+    """
+    if IS_LOCAL:
+        # 로컬은 패널별 쿼리가 인덱스/롤업을 타므로 그대로 쓰고, 같은 시점의 데이터를 보도록 한 트랜잭션에서 실행
+        with transaction():
+            return collect_dashboard_panels(file_id, start_date, end_date)
+
+    bundle = supabase_rpc_optional('dashboard_bundle', {
+        'p_file_id': file_id, 'p_start_date': start_date, 'p_end_date': end_date
+    })
+    if bundle is not None:
+        bundle['supplier_category'] = build_supplier_category_hierarchy(bundle.pop('supplier_category_rows', None) or [])
+        bundle['store_category'] = build_store_category_hierarchy(bundle.pop('store_category_rows', None) or [])
+        return bundle
+
+    try:
+        file_filter = f'file_id=eq.{file_id}' if file_id else None
+        # 두 테이블은 서로 독립이라 동시에 내려받는다
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            sales_future = executor.submit(supabase_select, 'sales_data', BUNDLE_SALES_COLUMNS, file_filter, parallel=True)
+            monthly_future = executor.submit(supabase_select, 'monthly_sales', BUNDLE_MONTHLY_COLUMNS, file_filter, parallel=True)
+            sales = sales_future.result()
+            monthly = monthly_future.result()
+    except Exception as e:
+        print(f"대시보드 묶음 조회 오류 (패널별 조회로 대체): {e}")
+        return collect_dashboard_panels(file_id, start_date, end_date)
+
+    bundle = aggregate_sales_panels(sales)
+    monthly_panels = aggregate_monthly_panels(monthly, start_date, end_date)
+    bundle['summary'].update(monthly_panels.pop('summary'))
+    bundle.update(monthly_panels)
+    return bundle
+
+def collect_dashboard_panels(file_id=None, start_date=None, end_date=None):
+    """패널별 조회 함수를 호출해 묶음 생성
+
+    로컬은 호출한 쪽 트랜잭션(스레드 연결)에서 차례로 실행한다. Supabase는 패널마다
+    독립된 REST 조회라 PANEL_MAX_WORKERS개 스레드로 동시에 실행해, 전체 시간이
+    합계가 아니라 가장 느린 패널 정도가 되도록 한다. 결과 키 순서는 항상 같다.
+    """
+    panels = {
+        'summary': (get_summary_stats, (file_id, start_date, end_date)),
+        'suppliers': (get_sales_by_supplier, (file_id,)),
+        'categories': (get_sales_by_category, (file_id,)),
+        'products': (get_top_products, (file_id,)),
+        'daily': (get_daily_sales, (file_id, start_date, end_date)),
+        'weekly': (get_weekly_sales, (file_id, start_date, end_date)),
+        'monthly': (get_monthly_sales, (file_id, start_date, end_date)),
+        'stores': (get_store_sales, (file_id, start_date, end_date)),
+        'supplier_category': (get_supplier_category_matrix, (file_id,)),
+        'store_category': (get_store_category_matrix, (file_id,)),
+    }
+    if IS_LOCAL or PANEL_MAX_WORKERS <= 1:
+        return {key: func(*args) for key, (func, args) in panels.items()}
+
+    with ThreadPoolExecutor(max_workers=min(PANEL_MAX_WORKERS, len(panels))) as executor:
+        futures = {key: executor.submit(func, *args) for key, (func, args) in panels.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+def aggregate_sales_panels(sales):
+    """sales_data 행을 한 번 순회하며 원본 요약/업체별/카테고리별/베스트셀러/업체-카테고리 집계"""
+    total_sales = total_qty = 0
+    products, suppliers_seen, categories_seen = set(), set(), set()
+    by_supplier, by_category, top, matrix = {}, {}, {}, {}
+
+    for r in sales:
+        supplier = r.get('업체명')
+        category = r.get('카테고리')
+        code = r.get('상품코드')
+        name = r.get('상품명')
+        amount = float(r.get('실판매금액') or 0)
+        qty = float(r.get('판매량') or 0)
+
+        total_sales += amount
+        total_qty += qty
+        if code:
+            products.add(code)
+        if supplier:
+            suppliers_seen.add(supplier)
+        if category:
+            categories_seen.add(category)
+
+        if supplier:
+            if supplier not in by_supplier:
+                by_supplier[supplier] = {'업체명': supplier, '매출액': 0, '판매량': 0, '상품수': set()}
+            by_supplier[supplier]['매출액'] += amount
+            by_supplier[supplier]['판매량'] += qty
+            by_supplier[supplier]['상품수'].add(code)
+
+        if category:
+            if category not in by_category:
+                by_category[category] = {'카테고리': category, '매출액': 0, '판매량': 0, '상품수': set()}
+            by_category[category]['매출액'] += amount
+            by_category[category]['판매량'] += qty
+            by_category[category]['상품수'].add(code)
+
+        if code:
+            if code not in top:
+                top[code] = {
+                    '상품코드': code,
+                    '상품명': name,
+                    '분류명': r.get('분류명'),
+                    '업체명': supplier,
+                    '카테고리': category,
+                    '실판매금액': 0,
+                    '판매량': 0
+                }
+            top[code]['실판매금액'] += amount
+            top[code]['판매량'] += qty
+
+        if supplier is not None:
+            key = (supplier, category, code, name)
+            if key not in matrix:
+                matrix[key] = {'업체명': supplier, '카테고리': category, '상품코드': code, '상품명': name, '매출액': 0, '판매량': 0}
+            matrix[key]['매출액'] += amount
+            matrix[key]['판매량'] += qty
+
+    for agg in (by_supplier, by_category):
+        for v in agg.values():
+            v['상품수'] = len(v['상품수'])
+
+    return {
+        'summary': {
+            'original': {
+                'total_records': len(sales),
+                'total_sales': total_sales,
+                'total_qty': total_qty,
+                'unique_products': len(products),
+                'unique_suppliers': len(suppliers_seen),
+                'unique_categories': len(categories_seen)
+            }
+        },
+        'suppliers': sorted(by_supplier.values(), key=lambda x: x['매출액'], reverse=True)[:30],
+        'categories': sorted(by_category.values(), key=lambda x: x['매출액'], reverse=True)[:30],
+        'products': sorted(top.values(), key=lambda x: x['실판매금액'], reverse=True)[:100],
+        'supplier_category': build_supplier_category_hierarchy(list(matrix.values())),
+    }
+
+def aggregate_monthly_panels(monthly, start_date=None, end_date=None):
+    """monthly_sales 행을 한 번 순회하며 월별 요약/일별/주간/월별/매장별/매장-카테고리 집계
+
+    매장-카테고리 집계는 패널별 API와 같이 날짜 필터 없이 전체 행으로 만든다.
+    """
+    from datetime import datetime as dt
+
+    total_records = total_sales = total_qty = 0
+    stores_seen, type_counts = set(), {}
+    daily, weekly, months, stores, matrix = {}, {}, {}, {}, {}
+
+    for r in monthly:
+        date = r.get('판매일자')
+        store = r.get('매장명')
+        amount = float(r.get('실판매금액') or 0)
+        qty = float(r.get('판매량') or 0)
+
+        if store is not None:
+            key = (store, r.get('분류명'), r.get('상품코드'), r.get('상품명'))
+            if key not in matrix:
+                matrix[key] = {'매장명': key[0], '분류명': key[1], '상품코드': key[2], '상품명': key[3], '매출액': 0, '판매량': 0}
+            matrix[key]['매출액'] += amount
+            matrix[key]['판매량'] += qty
+
+        # 이하 패널은 날짜 필터 적용
+        if start_date and (date is None or date < start_date):
+            continue
+        if end_date and (date is None or date > end_date):
+            continue
+
+        total_records += 1
+        total_sales += amount
+        total_qty += qty
+        if store:
+            stores_seen.add(store)
+        if r.get('data_type'):
+            type_counts[r['data_type']] = type_counts.get(r['data_type'], 0) + 1
+
+        if store:
+            if store not in stores:
+                stores[store] = {'매장명': store, '실판매금액': 0, '판매량': 0, '건수': 0}
+            stores[store]['실판매금액'] += amount
+            stores[store]['판매량'] += qty
+            stores[store]['건수'] += 1
+
+        if not date:
+            continue
+
+        if date not in daily:
+            daily[date] = {'판매일자': date, '실판매금액': 0, '판매량': 0, '건수': 0}
+        daily[date]['실판매금액'] += amount
+        daily[date]['판매량'] += qty
+        daily[date]['건수'] += 1
+
+        month = date[:7] if len(date) >= 7 else date
+        if month not in months:
+            months[month] = {'월': month, '실판매금액': 0, '판매량': 0, '건수': 0, '매장수': set()}
+        months[month]['실판매금액'] += amount
+        months[month]['판매량'] += qty
+        months[month]['건수'] += 1
+        if store:
+            months[month]['매장수'].add(store)
+
+        if len(date) < 10:
+            continue
+        try:
+            d = dt.strptime(date[:10], '%Y-%m-%d')
+            week_key = f"{d.year}-W{d.isocalendar()[1]:02d}"
+        except:
+            continue
+        if week_key not in weekly:
+            weekly[week_key] = {'주차': week_key, '시작일': date, '종료일': date, '실판매금액': 0, '판매량': 0, '건수': 0, '매장수': set()}
+        week = weekly[week_key]
+        if date < week['시작일']:
+            week['시작일'] = date
+        if date > week['종료일']:
+            week['종료일'] = date
+        week['실판매금액'] += amount
+        week['판매량'] += qty
+        week['건수'] += 1
+        if store:
+            week['매장수'].add(store)
+
+    for agg in (months, weekly):
+        for v in agg.values():
+            v['매장수'] = len(v['매장수'])
+
+    return {
+        'summary': {
+            'monthly': {
+                'total_records': total_records,
+                'total_sales': total_sales,
+                'total_qty': total_qty,
+                'unique_stores': len(stores_seen)
+            },
+            'by_type': type_counts
+        },
+        'daily': sorted(daily.values(), key=lambda x: x['판매일자']),
+        'weekly': sorted(weekly.values(), key=lambda x: x['주차']),
+        'monthly': sorted(months.values(), key=lambda x: x['월']),
+        'stores': sorted(stores.values(), key=lambda x: x['실판매금액'], reverse=True)[:30],
+        'store_category': build_store_category_hierarchy(list(matrix.values())),
+    }
+
 # ============ 관리자 계정 함수들 ============
 
 def verify_admin(username, password):
@@ -1509,48 +3368,23 @@ def restore_backup(backup_data):
         reset_all_data()
 
         if IS_LOCAL:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
-            # upload_files 복원
-            for row in backup_data.get('upload_files', []):
-                cursor.execute('''
-                    INSERT INTO upload_files (id, filename, original_name, file_type, row_count, upload_date, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (row['id'], row['filename'], row.get('original_name'), row.get('file_type'),
-                      row.get('row_count', 0), row.get('upload_date'), 'active'))
-
-            # sales_data 복원
-            for row in backup_data.get('sales_data', []):
-                cursor.execute('''
-                    INSERT INTO sales_data (file_id, 분류명, 카테고리, 업체명, 상품코드, 바코드, 상품명,
-                        판매일, 주문수, 주문건, 주문량, 판매단가, 최종단가, 수발주단가,
-                        판매가, 취소수, 취소량, 취소금액, 할인량, 할인금액, 판매량, 실판매단가, 실판매금액)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (row.get('file_id'), row.get('분류명'), row.get('카테고리'), row.get('업체명'),
-                      row.get('상품코드'), row.get('바코드'), row.get('상품명'), row.get('판매일'),
-                      row.get('주문수'), row.get('주문건'), row.get('주문량'), row.get('판매단가'),
-                      row.get('최종단가'), row.get('수발주단가'), row.get('판매가'), row.get('취소수'),
-                      row.get('취소량'), row.get('취소금액'), row.get('할인량'), row.get('할인금액'),
-                      row.get('판매량'), row.get('실판매단가'), row.get('실판매금액')))
-
-            # monthly_sales 복원
-            for row in backup_data.get('monthly_sales', []):
-                cursor.execute('''
-                    INSERT INTO monthly_sales (file_id, data_type, 판매일자, 매장코드, 매장명, 분류명, 카테고리, 업체명,
-                        상품코드, 상품명, 판매일, 주문수, 주문건, 주문량, 판매단가, 수발주단가,
-                        판매가, 취소수, 취소량, 취소금액, 할인량, 할인금액, 판매량, 실판매단가, 실판매금액)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (row.get('file_id'), row.get('data_type'), row.get('판매일자'), row.get('매장코드'),
-                      row.get('매장명'), row.get('분류명'), row.get('카테고리'), row.get('업체명'),
-                      row.get('상품코드'), row.get('상품명'), row.get('판매일'), row.get('주문수'),
-                      row.get('주문건'), row.get('주문량'), row.get('판매단가'), row.get('수발주단가'),
-                      row.get('판매가'), row.get('취소수'), row.get('취소량'), row.get('취소금액'),
-                      row.get('할인량'), row.get('할인금액'), row.get('판매량'), row.get('실판매단가'),
-                      row.get('실판매금액')))
-
-            conn.commit()
-            conn.close()
+            with sqlite_bulk_load('backup restore') as (cursor, insert_rows):
+                # upload_files 복원
+                insert_rows('upload_files',
+                            ['id', 'filename', 'original_name', 'file_type', 'row_count', 'upload_date', 'status'],
+                            ((row['id'], row['filename'], row.get('original_name'), row.get('file_type'),
+                              row.get('row_count', 0), row.get('upload_date'), 'active')
+                             for row in backup_data.get('upload_files', [])))
+
+                # sales_data 복원
+                insert_rows('sales_data', SALES_INSERT_COLUMNS,
+                            (tuple(row.get(col) for col in SALES_INSERT_COLUMNS)
+                             for row in backup_data.get('sales_data', [])))
+
+                # monthly_sales 복원
+                insert_rows('monthly_sales', MONTHLY_INSERT_COLUMNS,
+                            (tuple(row.get(col) for col in MONTHLY_INSERT_COLUMNS)
+                             for row in backup_data.get('monthly_sales', [])))
         else:
             # Supabase 복원 - 배치로 처리
             if backup_data.get('upload_files'):
@@ -1560,6 +3394,10 @@ def restore_backup(backup_data):
             if backup_data.get('monthly_sales'):
                 supabase_insert('monthly_sales', backup_data['monthly_sales'])
 
+        # 복원된 monthly_sales로 일별 롤업 재생성
+        rebuild_daily_rollup()
+        bump_data_version()
+
         return True, "백업 복원 완료"
     except Exception as e:
         return False, str(e)
@@ -1609,13 +3447,13 @@ def load_backup_from_file(filename):
 def reset_all_data():
     """모든 판매 데이터 초기화 (admin_users 제외)"""
     if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM sales_data')
-        cursor.execute('DELETE FROM monthly_sales')
-        cursor.execute('DELETE FROM upload_files')
-        conn.commit()
-        conn.close()
+        with transaction() as cursor:
+            cursor.execute('DELETE FROM sales_data')
+            cursor.execute('DELETE FROM monthly_sales')
+            cursor.execute('DELETE FROM daily_rollup')
+            cursor.execute('DELETE FROM upload_chunks')
+            cursor.execute('DELETE FROM upload_files')
+        bump_data_version()
         return True
     else:
         # Supabase에서 모든 데이터 삭제 (neq.0은 id > 0인 모든 행 삭제)
@@ -1627,10 +3465,17 @@ def reset_all_data():
             supabase_delete('monthly_sales', 'id=gt.0')
         except:
             pass
+        delete_daily_rollup('id=gt.0')
+        if upload_ledger_available():
+            try:
+                supabase_delete('upload_chunks', 'file_id=gt.0')
+            except:
+                pass
         try:
             supabase_delete('upload_files', 'id=gt.0')
         except:
             pass
+        bump_data_version()
         return True
 
 def delete_data_by_year(year):
@@ -1649,29 +3494,26 @@ def delete_data_by_year(year):
     deleted_counts = {'monthly_sales': 0, 'sales_data': 0}
 
     if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # monthly_sales에서 해당 연도 데이터 삭제
-        cursor.execute(f"SELECT COUNT(*) FROM monthly_sales WHERE 판매일자 >= '{start_date}' AND 판매일자 <= '{end_date}'")
-        deleted_counts['monthly_sales'] = cursor.fetchone()[0]
-        cursor.execute(f"DELETE FROM monthly_sales WHERE 판매일자 >= '{start_date}' AND 판매일자 <= '{end_date}'")
-
-        conn.commit()
-        conn.close()
+        with transaction(immediate=True) as cursor:
+            # monthly_sales에서 해당 연도 데이터 삭제
+            cursor.execute(f"SELECT COUNT(*) FROM monthly_sales WHERE 판매일자 >= '{start_date}' AND 판매일자 <= '{end_date}'")
+            deleted_counts['monthly_sales'] = cursor.fetchone()[0]
+            cursor.execute(f"DELETE FROM monthly_sales WHERE 판매일자 >= '{start_date}' AND 판매일자 <= '{end_date}'")
+            cursor.execute(f"DELETE FROM daily_rollup WHERE 판매일자 >= '{start_date}' AND 판매일자 <= '{end_date}'")
     else:
         # Supabase에서 해당 연도 데이터 삭제
         try:
             # 먼저 삭제될 데이터 수 조회
-            monthly = supabase_select('monthly_sales', 'id', f'판매일자=gte.{start_date}&판매일자=lte.{end_date}')
-            deleted_counts['monthly_sales'] = len(monthly)
+            deleted_counts['monthly_sales'] = supabase_count('monthly_sales', f'판매일자=gte.{start_date}&판매일자=lte.{end_date}')
 
             # 데이터 삭제
-            if monthly:
+            if deleted_counts['monthly_sales']:
                 supabase_delete('monthly_sales', f'판매일자=gte.{start_date}&판매일자=lte.{end_date}')
+                delete_daily_rollup(f'판매일자=gte.{start_date}&판매일자=lte.{end_date}')
         except Exception as e:
             print(f"Year deletion error: {e}")
 
+    bump_data_version()
     return deleted_counts
 
 def get_available_years():
@@ -1719,77 +3561,241 @@ def get_data_counts():
     else:
         try:
             # Supabase에서 카운트 조회 (GET 요청 + count=exact 헤더)
-            headers = get_supabase_headers()
-            headers['Prefer'] = 'count=exact'
-            headers['Range'] = '0-0'  # 데이터 최소화
+            return {
+                'sales_data': supabase_count('sales_data'),
+                'monthly_sales': supabase_count('monthly_sales'),
+                'upload_files': supabase_count('upload_files')
+            }
+        except Exception as e:
+            print(f"Count error: {e}")
+            return {'sales_data': 0, 'monthly_sales': 0, 'upload_files': 0}
 
-            def parse_count(resp):
-                content_range = resp.headers.get('content-range', '*/0')
-                if '/' in content_range:
-                    return int(content_range.split('/')[-1])
-                return 0
+# ============ 이지어드민 카탈로그 증분 동기화 ============
+
+# 상품 이미지/재고는 새로 받은 목록 전체를 저장하지만, 실제로 바뀌는 행은 보통 일부다.
+# 행마다 sync_key(공급처 옵션 코드)와 내용 해시(content_hash)를 저장해 두고, 새 목록과 비교해
+# 추가/변경 행만 UPSERT하고 목록에서 빠진 행만 삭제한다. 테이블을 비우는 순간이 없으므로
+# 동기화 중에도 조회하는 쪽이 빈 목록을 보지 않는다.
+# 전체를 다시 넣어야 할 때(full_reload, 바뀐 행이 많을 때)는 스테이징 테이블에 먼저 넣고 한 번에 교체한다.
+# Supabase는 supabase/catalog_sync.sql(증분)과 catalog_swap.sql(교체)을 실행해야 하며,
+# 둘 다 없으면 예전처럼 삭제 후 전체 삽입한다.
+
+CATALOG_SYNC_COLUMNS = {
+    'product_images': ['supplier_option', 'product_code', 'product_name', 'barcode', 'image_url'],
+    'inventory': ['product_code', 'supplier', 'product_name', 'option_name',
+                  'supply_price', 'sale_price', 'supplier_option', 'barcode',
+                  'normal_stock', 'available_stock', 'is_soldout', 'product_tag', 'location'],
+}
+# 값이 없을 때 저장하는 기본값 (재고 수량/품절 여부는 0)
+CATALOG_SYNC_DEFAULTS = {
+    'inventory': {'normal_stock': 0, 'available_stock': 0, 'is_soldout': 0},
+}
+# 변경된 행을 UPSERT할 때 함께 갱신하는 시각 컬럼
+CATALOG_SYNC_TOUCH = {'inventory': 'updated_at'}
+CATALOG_DELETE_BATCH = 200  # Supabase id=in.(...) 한 번에 지우는 행 수 (URL 길이 제한)
+# 바뀐 행 비율이 이보다 크면 행 단위 반영 대신 스테이징 테이블로 전체 교체
+CATALOG_FULL_RELOAD_RATIO = float(os.environ.get('CATALOG_FULL_RELOAD_RATIO', '0.5'))
+
+_catalog_reload_lock = threading.Lock()  # 같은 프로세스에서 스테이징 테이블을 동시에 쓰지 않도록
+
+def catalog_sync_available(table):
+    """sync_key/content_hash 컬럼 사용 가능 여부 (Supabase는 supabase/catalog_sync.sql 필요)"""
+    return IS_LOCAL or supabase_table_available(table, 'id,sync_key,content_hash', 'catalog_sync.sql')
+
+def catalog_row_hash(values):
+    """동기화 대상 컬럼 값의 해시 (값이 같으면 같은 해시)"""
+    payload = json.dumps(values, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def prepare_catalog_rows(table, records):
+    """새 목록 → {sync_key: 저장할 행} (같은 키가 여러 번 나오면 마지막 행 사용)
+
+    sync_key는 공급처 옵션 코드이고, 코드가 없는 행은 내용 해시를 키로 쓴다
+    (같은 내용이면 하나로 합쳐지고, 내용이 바뀌면 삭제 후 추가로 처리).
+    """
+    columns = CATALOG_SYNC_COLUMNS[table]
+    defaults = CATALOG_SYNC_DEFAULTS.get(table, {})
+    rows = {}
+    for record in records:
+        row = {col: record.get(col, defaults.get(col)) for col in columns}
+        row['content_hash'] = catalog_row_hash([row[col] for col in columns])
+        supplier_option = str(row.get('supplier_option') or '').strip()
+        row['sync_key'] = supplier_option or f"hash:{row['content_hash']}"
+        rows[row['sync_key']] = row
+    return rows
+
+def diff_catalog_rows(existing, incoming):
+    """기존 행 [{id, sync_key, content_hash}]과 새 행 {sync_key: row} 비교
 
-            with httpx.Client(timeout=30.0) as client:
-                # sales_data count
-                resp = client.get(f"{SUPABASE_URL}/rest/v1/sales_data?select=id", headers=headers)
-                sales_count = parse_count(resp)
+    Returns:
+        (upserts, delete_ids, counts) - upserts는 추가/변경 행, delete_ids는 새 목록에 없는 행 id
+        (sync_key가 없는 예전 행과 같은 키의 중복 행 포함)
+    """
+    current = {}
+    delete_ids = []
+    for row in existing:
+        key = row.get('sync_key')
+        if key is None or key in current:
+            delete_ids.append(row['id'])
+        else:
+            current[key] = row
+
+    upserts = []
+    counts = {'total': len(incoming), 'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    for key, row in incoming.items():
+        old = current.pop(key, None)
+        if old is None:
+            counts['inserted'] += 1
+            upserts.append(row)
+        elif old.get('content_hash') != row['content_hash']:
+            counts['updated'] += 1
+            upserts.append(row)
+        else:
+            counts['unchanged'] += 1
+    delete_ids.extend(row['id'] for row in current.values())
+    counts['deleted'] = len(delete_ids)
+    return upserts, delete_ids, counts
 
-                # monthly_sales count
-                resp = client.get(f"{SUPABASE_URL}/rest/v1/monthly_sales?select=id", headers=headers)
-                monthly_count = parse_count(resp)
+def catalog_needs_full_reload(counts, existing_count):
+    """바뀐 행이 CATALOG_FULL_RELOAD_RATIO보다 많으면 행 단위 반영 대신 전체 교체"""
+    changed = counts['inserted'] + counts['updated'] + counts['deleted']
+    return changed > 0 and changed > CATALOG_FULL_RELOAD_RATIO * max(counts['total'], existing_count, 1)
 
-                # upload_files count
-                resp = client.get(f"{SUPABASE_URL}/rest/v1/upload_files?select=id", headers=headers)
-                files_count = parse_count(resp)
+def _reload_catalog_local(table, rows):
+    """스테이징 테이블에 전체를 넣은 뒤 짧은 트랜잭션에서 이름을 바꿔 교체 (로컬 전용)
 
-            return {
-                'sales_data': sales_count,
-                'monthly_sales': monthly_count,
-                'upload_files': files_count
-            }
+    적재는 {table}_staging에 따로 커밋하므로, 교체 트랜잭션은 DROP + RENAME + 인덱스 생성뿐이다.
+    조회하는 쪽은 교체 전에는 기존 테이블 전체, 교체 후에는 새 테이블 전체를 본다.
+    """
+    staging = f'{table}_staging'
+    columns = CATALOG_SYNC_COLUMNS[table] + ['sync_key', 'content_hash']
+    schema = execute_query("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))[0]['sql']
+    index_sql = [r['sql'] for r in execute_query(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+
+    with sqlite_bulk_load(staging) as (cursor, insert_rows):
+        cursor.execute(f'DROP TABLE IF EXISTS {staging}')
+        # 운영 테이블과 같은 스키마 (ALTER로 추가된 컬럼 포함)
+        cursor.execute(re.sub(r'^CREATE TABLE\s+(IF NOT EXISTS\s+)?["\']?\w+["\']?', f'CREATE TABLE {staging}', schema, count=1))
+        insert_rows(staging, columns, (tuple(row[col] for col in columns) for row in rows))
+
+    started = time.perf_counter()
+    with transaction(immediate=True) as cursor:
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {staging} RENAME TO {table}')
+        # 인덱스는 기존 테이블과 함께 지워졌으므로 같은 이름으로 다시 만든다
+        for sql in index_sql:
+            cursor.execute(sql)
+    print(f"[sync] {table}: 스테이징 테이블 교체 {time.perf_counter() - started:.3f}초")
+
+def catalog_staging_available(table):
+    """Supabase 스테이징 테이블/교체 함수 사용 가능 여부 (supabase/catalog_swap.sql 필요)"""
+    return supabase_table_available(f'{table}_staging', 'sync_key', 'catalog_swap.sql') \
+        and 'publish_catalog_staging' not in _missing_rpc_functions
+
+def _reload_catalog_supabase(table, rows):
+    """{table}_staging에 전체를 넣고 publish_catalog_staging RPC로 한 번에 교체 (실패하면 False)
+
+    RPC는 서버의 한 트랜잭션 안에서 운영 테이블을 스테이징 내용으로 바꾸므로, 조회하는 쪽은
+    커밋 전까지 기존 행 전체를 보고 잠금 대기 없이 읽는다.
+    """
+    staging = f'{table}_staging'
+    # 이전에 교체하지 못하고 남은 행 정리 (스테이징 행은 모두 sync_key가 있다)
+    supabase_delete(staging, 'sync_key=not.is.null')
+    if rows:
+        supabase_insert(staging, rows)
+    published = supabase_rpc_optional('publish_catalog_staging', {'p_table': table})
+    if published is None:
+        print(f"[sync] {table}: 스테이징 교체 실패 - 행 단위로 반영")
+        try:
+            supabase_delete(staging, 'sync_key=not.is.null')
         except Exception as e:
-            print(f"Count error: {e}")
-            return {'sales_data': 0, 'monthly_sales': 0, 'upload_files': 0}
+            print(f"스테이징 정리 실패 ({staging}): {e}")
+        return False
+    return True
+
+def sync_catalog_table(table, records, full_reload=False):
+    """이지어드민 목록으로 테이블 동기화 후 변경 건수 반환
+
+    평소에는 추가/변경 행만 UPSERT하고 빠진 행을 삭제한다. full_reload이거나 바뀐 행이
+    많으면 스테이징 테이블에 전체를 넣은 뒤 한 번에 교체한다 (mode: incremental / reload / replace).
+    """
+    started = time.perf_counter()
+    incoming = prepare_catalog_rows(table, records)
+    columns = CATALOG_SYNC_COLUMNS[table] + ['sync_key', 'content_hash']
+    touch = CATALOG_SYNC_TOUCH.get(table)
+    mode = 'incremental'
+
+    with _catalog_reload_lock:
+        if IS_LOCAL:
+            with sqlite_bulk_load(table) as (cursor, insert_rows):
+                # 비교와 반영 사이에 다른 동기화가 끼어들지 않도록 같은 트랜잭션 안에서 읽는다
+                cursor.execute(f'SELECT id, sync_key, content_hash FROM {table}')
+                existing = [{'id': r[0], 'sync_key': r[1], 'content_hash': r[2]} for r in cursor.fetchall()]
+                upserts, delete_ids, counts = diff_catalog_rows(existing, incoming)
+                if full_reload or catalog_needs_full_reload(counts, len(existing)):
+                    mode = 'reload'
+                else:
+                    # 삭제를 먼저 해야 sync_key가 없던 예전 행과 새 행이 겹치지 않는다 (한 트랜잭션이라 중간 상태는 안 보임)
+                    cursor.executemany(f'DELETE FROM {table} WHERE id = ?', [(row_id,) for row_id in delete_ids])
+                    assignments = [f'{col} = excluded.{col}' for col in columns if col != 'sync_key']
+                    if touch:
+                        assignments.append(f'{touch} = CURRENT_TIMESTAMP')
+                    placeholders = ', '.join('?' * len(columns))
+                    cursor.executemany(
+                        f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders}) '
+                        f'ON CONFLICT(sync_key) DO UPDATE SET {", ".join(assignments)}',
+                        [tuple(row[col] for col in columns) for row in upserts])
+            if mode == 'reload':
+                _reload_catalog_local(table, incoming.values())
+        elif catalog_sync_available(table):
+            existing = supabase_select(table, 'id,sync_key,content_hash')
+            upserts, delete_ids, counts = diff_catalog_rows(existing, incoming)
+            if (full_reload or catalog_needs_full_reload(counts, len(existing))) and catalog_staging_available(table):
+                if _reload_catalog_supabase(table, list(incoming.values())):
+                    mode = 'reload'
+            if mode == 'incremental':
+                if upserts:
+                    if touch:
+                        now = datetime.now(KST).isoformat()
+                        upserts = [{**row, touch: now} for row in upserts]
+                    supabase_upsert(table, upserts, 'sync_key')
+                # 새 행을 먼저 반영한 뒤 빠진 행을 지운다 (조회하는 쪽이 빈 목록을 보지 않도록)
+                for i in range(0, len(delete_ids), CATALOG_DELETE_BATCH):
+                    batch = delete_ids[i:i + CATALOG_DELETE_BATCH]
+                    supabase_delete(table, f"id=in.({','.join(str(row_id) for row_id in batch)})")
+        else:
+            # sync_key 컬럼이 없는 Supabase - 기존 데이터 삭제 후 전체 삽입
+            mode = 'replace'
+            try:
+                supabase_delete(table, 'id=gt.0')
+            except:
+                pass
+            rows = [{col: row[col] for col in CATALOG_SYNC_COLUMNS[table]} for row in incoming.values()]
+            if rows:
+                supabase_insert(table, rows)
+            counts = {'total': len(rows), 'inserted': len(rows), 'updated': 0, 'deleted': None, 'unchanged': 0}
+
+    counts['mode'] = mode
+    elapsed = time.perf_counter() - started
+    deleted = f"{counts['deleted']:,}" if counts['deleted'] is not None else '전체'
+    print(f"[sync] {table} ({mode}): {counts['total']:,}행 중 추가 {counts['inserted']:,} / 변경 {counts['updated']:,} / "
+          f"삭제 {deleted} / 유지 {counts['unchanged']:,} ({elapsed:.2f}초)")
+    return counts
 
 # ============ 상품 이미지 함수들 (이지어드민 연동) ============
 
-def save_product_images(mappings):
-    """상품 이미지 매핑 데이터 저장 (기존 데이터 삭제 후 저장)
+def save_product_images(mappings, full_reload=False):
+    """상품 이미지 매핑 데이터 동기화 (supplier_option 기준으로 바뀐 행만 반영)
 
     Args:
         mappings: list of dict with keys: supplier_option, product_code, product_name, barcode, image_url
+        full_reload: True면 스테이징 테이블에 전체를 넣은 뒤 한 번에 교체
 
     Returns:
-        int: 저장된 건수
+        dict: 동기화 결과 건수 (total, inserted, updated, deleted, unchanged, mode)
     """
-    if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 기존 데이터 삭제
-        cursor.execute('DELETE FROM product_images')
-
-        # 새 데이터 삽입
-        for m in mappings:
-            cursor.execute('''
-                INSERT INTO product_images (supplier_option, product_code, product_name, barcode, image_url)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (m.get('supplier_option'), m.get('product_code'), m.get('product_name'),
-                  m.get('barcode'), m.get('image_url')))
-
-        conn.commit()
-        conn.close()
-        return len(mappings)
-    else:
-        # Supabase - 기존 데이터 삭제 후 배치 삽입
-        try:
-            supabase_delete('product_images', 'id=gt.0')
-        except:
-            pass
-
-        if mappings:
-            supabase_insert('product_images', mappings)
-        return len(mappings)
+    return sync_catalog_table('product_images', mappings, full_reload)
 
 def get_product_image(supplier_option):
     """공급처 옵션 코드로 상품 이미지 URL 조회
@@ -1842,21 +3848,10 @@ def get_all_product_images():
         list: 상품코드별 그룹화된 이미지 매핑 목록
     """
     if IS_LOCAL:
-        # 상품코드별로 그룹화하여 첫번째 상품명과 옵션 개수 반환
-        return execute_query('''
-            SELECT
-                product_code,
-                MIN(product_name) as product_name,
-                GROUP_CONCAT(DISTINCT supplier_option) as supplier_option,
-                MIN(image_url) as image_url,
-                COUNT(*) as option_count
-            FROM product_images
-            GROUP BY product_code
-            ORDER BY MIN(product_name)
-        ''')
+        return list(iter_all_product_images())
     else:
         # Supabase에서는 전체 조회 후 Python에서 그룹화
-        all_data = supabase_select('product_images', '*', order='product_name.asc')
+        all_data = supabase_select('product_images', 'product_code,product_name,supplier_option,image_url', order='product_name.asc')
         grouped = {}
         for item in all_data:
             code = item.get('product_code')
@@ -1873,10 +3868,60 @@ def get_all_product_images():
                 # 옵션 정보 추가
                 existing = grouped[code]['supplier_option']
                 new_option = item.get('supplier_option')
-                if new_option and new_option not in existing:
-                    grouped[code]['supplier_option'] = existing + ', ' + new_option
+                if new_option and new_option not in (existing or '').split(', '):
+                    grouped[code]['supplier_option'] = f"{existing}, {new_option}" if existing else new_option
         return list(grouped.values())
 
+def iter_all_product_images():
+    """상품코드별 그룹화된 이미지 매핑을 하나씩 넘겨주는 generator (NDJSON 스트리밍용)
+
+    로컬은 get_all_product_images와 같은 순서(상품명순)로 커서에서 바로 읽는다.
+    Supabase는 전체를 모으지 않도록 상품코드순으로 받아 같은 코드끼리 묶어 내보낸다.
+    """
+    if IS_LOCAL:
+        # 상품코드별로 그룹화하여 첫번째 상품명과 옵션 개수 반환
+        yield from iter_query('''
+            SELECT
+                product_code,
+                MIN(product_name) as product_name,
+                GROUP_CONCAT(DISTINCT supplier_option) as supplier_option,
+                MIN(image_url) as image_url,
+                COUNT(*) as option_count
+            FROM product_images
+            GROUP BY product_code
+            ORDER BY MIN(product_name)
+        ''')
+        return
+
+    group = None
+    for page in iter_supabase_pages('product_images', 'product_code,product_name,supplier_option,image_url',
+                                    order='product_code.asc'):
+        for item in page:
+            code = item.get('product_code')
+            if group is None or group['product_code'] != code:
+                if group is not None:
+                    yield group
+                group = {
+                    'product_code': code,
+                    'product_name': item.get('product_name'),
+                    'supplier_option': item.get('supplier_option'),
+                    'image_url': item.get('image_url'),
+                    'option_count': 1
+                }
+                continue
+
+            group['option_count'] += 1
+            # 대표 상품명/이미지는 상품명이 가장 앞서는 옵션 기준 (get_all_product_images와 동일)
+            name = item.get('product_name')
+            if name is not None and (group['product_name'] is None or name < group['product_name']):
+                group['product_name'] = name
+                group['image_url'] = item.get('image_url')
+            new_option = item.get('supplier_option')
+            if new_option and new_option not in (group['supplier_option'] or '').split(', '):
+                group['supplier_option'] = f"{group['supplier_option']}, {new_option}" if group['supplier_option'] else new_option
+    if group is not None:
+        yield group
+
 def get_product_images_count():
     """상품 이미지 매핑 건수 조회"""
     if IS_LOCAL:
@@ -1884,8 +3929,7 @@ def get_product_images_count():
         return result[0]['cnt'] if result else 0
     else:
         try:
-            result = supabase_select('product_images', 'id')
-            return len(result)
+            return supabase_count('product_images')
         except:
             return 0
 
@@ -1916,7 +3960,7 @@ def get_product_options_with_stock(product_code):
         ''', (product_code,))
     else:
         # Supabase: 먼저 product_images에서 조회 후 inventory와 매칭
-        images = supabase_select('product_images', '*', f'product_code=eq.{product_code}')
+        images = supabase_select('product_images', 'supplier_option,product_name,barcode', f'product_code=eq.{product_code}')
         if not images:
             return []
 
@@ -1964,7 +4008,8 @@ def search_product_images(keyword):
         ''', (f'%{keyword}%',))
     else:
         # Supabase ilike 검색 후 Python에서 그룹화
-        all_data = supabase_select('product_images', '*', f'product_name=ilike.*{keyword}*', limit=500)
+        all_data = supabase_select('product_images', 'product_code,product_name,supplier_option,image_url',
+                                   f'product_name=ilike.*{keyword}*', limit=500)
         grouped = {}
         for item in all_data:
             code = item.get('product_code')
@@ -1984,50 +4029,17 @@ def search_product_images(keyword):
 
 # ============ 재고 함수들 (이지어드민 연동) ============
 
-def save_inventory(data_list):
-    """재고 데이터 저장 (기존 데이터 삭제 후 저장)
+def save_inventory(data_list, full_reload=False):
+    """재고 데이터 동기화 (supplier_option 기준으로 바뀐 행만 반영)
 
     Args:
         data_list: list of dict with inventory data
+        full_reload: True면 스테이징 테이블에 전체를 넣은 뒤 한 번에 교체
 
     Returns:
-        int: 저장된 건수
+        dict: 동기화 결과 건수 (total, inserted, updated, deleted, unchanged, mode)
     """
-    if IS_LOCAL:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        # 기존 데이터 삭제
-        cursor.execute('DELETE FROM inventory')
-
-        # 새 데이터 삽입
-        for item in data_list:
-            cursor.execute('''
-                INSERT INTO inventory (product_code, supplier, product_name, option_name,
-                    supply_price, sale_price, supplier_option, barcode,
-                    normal_stock, available_stock, is_soldout, product_tag, location)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                item.get('product_code'), item.get('supplier'), item.get('product_name'),
-                item.get('option_name'), item.get('supply_price'), item.get('sale_price'),
-                item.get('supplier_option'), item.get('barcode'),
-                item.get('normal_stock', 0), item.get('available_stock', 0),
-                item.get('is_soldout', 0), item.get('product_tag'), item.get('location')
-            ))
-
-        conn.commit()
-        conn.close()
-        return len(data_list)
-    else:
-        # Supabase
-        try:
-            supabase_delete('inventory', 'id=gt.0')
-        except:
-            pass
-
-        if data_list:
-            supabase_insert('inventory', data_list)
-        return len(data_list)
+    return sync_catalog_table('inventory', data_list, full_reload)
 
 def get_inventory_by_supplier_option(supplier_option):
     """공급처 옵션 코드로 재고 조회"""
@@ -2059,7 +4071,7 @@ def get_inventory_summary():
         return result[0] if result else {}
     else:
         try:
-            data = supabase_select('inventory', '*')
+            data = supabase_select('inventory', 'normal_stock,available_stock')
             in_stock = sum(1 for d in data if (d.get('normal_stock') or 0) > 0)
             return {
                 'total_products': len(data),
@@ -2073,13 +4085,18 @@ def get_inventory_summary():
 
 def get_all_inventory(limit=None):
     """전체 재고 조회"""
+    return list(iter_all_inventory(limit))
+
+def iter_all_inventory(limit=None):
+    """전체 재고를 하나씩 넘겨주는 generator (NDJSON 스트리밍용)"""
     if IS_LOCAL:
         query = 'SELECT * FROM inventory ORDER BY normal_stock DESC'
         if limit:
-            query += f' LIMIT {limit}'
-        return execute_query(query)
+            query += f' LIMIT {int(limit)}'
+        yield from iter_query(query)
     else:
-        return supabase_select('inventory', '*', order='normal_stock.desc', limit=limit)
+        for page in iter_supabase_pages('inventory', '*', order='normal_stock.desc', limit=limit):
+            yield from page
 
 def search_inventory(keyword):
     """재고 검색"""
@@ -2096,16 +4113,41 @@ def search_inventory(keyword):
 
 def get_low_stock_items(threshold=10):
     """재고 부족 상품 조회"""
+    return list(iter_low_stock_items(threshold))
+
+def iter_low_stock_items(threshold=10):
+    """재고 부족 상품을 하나씩 넘겨주는 generator (NDJSON 스트리밍용)"""
     if IS_LOCAL:
-        return execute_query(
+        yield from iter_query(
             'SELECT * FROM inventory WHERE normal_stock > 0 AND normal_stock <= ? ORDER BY normal_stock ASC',
             (threshold,)
         )
     else:
-        return supabase_select('inventory', '*', f'normal_stock=gt.0&normal_stock=lte.{threshold}', order='normal_stock.asc')
+        for page in iter_supabase_pages('inventory', '*', f'normal_stock=gt.0&normal_stock=lte.{threshold}', order='normal_stock.asc'):
+            yield from page
+
 
+# 대시보드 집계 함수 (explain_dashboard_queries 점검 대상)
+DASHBOARD_QUERY_FUNCTIONS = [
+    get_summary_stats, get_sales_by_supplier, get_sales_by_category, get_top_products,
+    get_daily_sales, get_weekly_sales, get_monthly_sales, get_store_sales,
+    get_supplier_category_matrix, get_store_category_matrix,
+]
 
-# 초기화 실행
+# 초기화 실행 (python database.py --explain [file_id] 로 대시보드 쿼리 실행 계획 점검)
 if __name__ == '__main__':
+    import sys
     init_database()
     print("데이터베이스 테이블 생성 완료!")
+    if '--explain' in sys.argv[1:]:
+        args = [a for a in sys.argv[1:] if a != '--explain']
+        explain_file_id = int(args[0]) if args else None
+        failed = 0
+        for item in explain_dashboard_queries(file_id=explain_file_id):
+            status = 'OK ' if item['ok'] else 'SCAN'
+            failed += not item['ok']
+            print(f"[{status}] {item['function']}: {item['query'][:100]}")
+            for detail in item['plan']:
+                print(f"        {detail}")
+        print(f"전체 스캔 쿼리: {failed}개")
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,374 @@
+"""업로드 파일 스트리밍 파서
+
+엑셀/CSV 파일을 한 번에 DataFrame으로 읽지 않고 UPLOAD_BATCH_ROWS행씩 잘라서 넘겨준다.
+저장 함수(save_sales_data / save_monthly_data)를 배치마다 호출하면 파일 크기와 관계없이
+메모리 사용량이 일정하다.
+
+확장자가 아니라 파일 앞부분(sniff_format)으로 실제 형식을 한 번만 판별하고, 형식마다
+사용할 수 있는 가장 빠른 파서를 고른다.
+
+- xlsx(zip): python-calamine(설치 시) → openpyxl read_only + iter_rows(values_only=True)
+- xls(OLE2 바이너리): python-calamine(설치 시) → xlrd (스트리밍을 지원하지 않아 시트를 읽은 뒤 배치로 나눔)
+- html: 이지어드민 등에서 확장자만 .xls로 내려받은 HTML 표 - 표준 라이브러리 HTMLParser로 스트리밍
+- text: CSV / 원본 .xls(실제로는 cp949 TSV) - pandas read_csv(chunksize), 구분자는 헤더 줄로 판별
+
+columns를 주면 그 컬럼만 DataFrame으로 만든다 (저장 함수가 쓰는 컬럼만 읽기).
+info(dict)를 주면 판별한 형식(format), 사용한 엔진(engine), 읽은 행 수(rows),
+읽기에 쓴 시간(seconds)을 채워준다.
+"""
+import os
+import re
+import time
+import codecs
+from contextlib import contextmanager
+from datetime import date, datetime
+from html.parser import HTMLParser
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    from python_calamine import CalamineWorkbook  # 선택 설치 (pip install python-calamine)
+except ImportError:
+    CalamineWorkbook = None
+
+UPLOAD_BATCH_ROWS = int(os.environ.get('UPLOAD_BATCH_ROWS', '5000'))
+TEXT_ENCODING = 'cp949'
+SNIFF_BYTES = 4096
+HTML_READ_CHARS = 256 * 1024
+EXCEL_ENGINE = os.environ.get('EXCEL_ENGINE', 'auto').lower()  # openpyxl이면 calamine을 설치했어도 사용 안 함
+
+XLSX_SIGNATURE = b'PK\x03\x04'
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # 구형 .xls
+UTF8_BOM = b'\xef\xbb\xbf'
+HTML_MARKERS = (b'<html', b'<!doctype html', b'<table', b'<meta', b'<head', b'<body', b'<style')
+
+def read_signature(path, size=8):
+    """파일 앞부분 바이트 (확장자와 실제 형식이 다른 파일 구분용)"""
+    with open(path, 'rb') as f:
+        return f.read(size)
+
+def sniff_format(path):
+    """파일 앞부분으로 실제 형식 판별 → 'xlsx' / 'xls' / 'html' / 'text'"""
+    head = read_signature(path, SNIFF_BYTES)
+    if head.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if head.startswith(OLE2_SIGNATURE):
+        return 'xls'
+    lowered = head.lstrip(UTF8_BOM).lstrip().lower()
+    if lowered.startswith(b'<') and any(marker in lowered for marker in HTML_MARKERS):
+        return 'html'
+    return 'text'
+
+def use_calamine():
+    """python-calamine으로 엑셀을 읽을지 (설치되어 있고 EXCEL_ENGINE으로 끄지 않았을 때)"""
+    return CalamineWorkbook is not None and EXCEL_ENGINE in ('auto', 'calamine')
+
+def header_names(values):
+    """헤더 행 → 컬럼명 목록
+
+    pandas read_excel과 같이 빈 칸은 'Unnamed: n', 중복 이름은 '이름.1'처럼 번호를 붙이고,
+    끝쪽의 빈 헤더는 버린다.
+    """
+    values = list(values)
+    while values and (values[-1] is None or values[-1] == ''):
+        values.pop()
+
+    names = []
+    seen = {}
+    for idx, value in enumerate(values):
+        name = f'Unnamed: {idx}' if value is None or value == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _calamine_value(value):
+    """calamine 셀 값을 openpyxl과 같은 형태로 (정수인 실수 → int, 날짜 → datetime)"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+def _iter_row_batches(rows, batch_rows=UPLOAD_BATCH_ROWS, columns=None, convert=None):
+    """행 이터레이터(첫 행이 헤더)를 batch_rows행씩 DataFrame으로
+
+    columns를 주면 그 컬럼만 남긴다 (빈 행 판정은 전체 컬럼 기준).
+    convert는 셀 값 변환 함수 (엔진마다 다른 값 형태 맞추기).
+    """
+    header = next(rows, None)
+    if header is None:
+        return
+    names = header_names(header)
+    width = len(names)
+    keep = [idx for idx, name in enumerate(names) if columns is None or name in columns]
+    if not keep:
+        return
+    keep_names = [names[idx] for idx in keep]
+
+    batch = []
+    for row in rows:
+        row = list(row[:width])
+        if len(row) < width:
+            row.extend([None] * (width - len(row)))
+        if convert is not None:
+            row = [convert(value) for value in row]
+        # 빈 칸은 NaN (read_excel과 같이 빈 행은 건너뛰기)
+        if all(value is None or value == '' for value in row):
+            continue
+        batch.append([np.nan if row[idx] is None or row[idx] == '' else row[idx] for idx in keep])
+        if len(batch) >= batch_rows:
+            yield pd.DataFrame(batch, columns=keep_names)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=keep_names)
+
+def _iter_frame_batches(df, batch_rows=UPLOAD_BATCH_ROWS):
+    """이미 읽은 DataFrame을 batch_rows행씩 나누기"""
+    for start in range(0, len(df), batch_rows):
+        yield df.iloc[start:start + batch_rows]
+
+def _timed_batches(batches, path, info):
+    """배치 generator를 감싸 읽기에 쓴 시간과 행 수를 info에 누적하고, 끝나면 출력"""
+    info.setdefault('rows', 0)
+    info.setdefault('seconds', 0.0)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                df = next(batches)
+            except StopIteration:
+                return
+            finally:
+                info['seconds'] += time.perf_counter() - started
+            info['rows'] += len(df)
+            yield df
+    finally:
+        print(f"[reader] {os.path.basename(path)}: {info.get('format')}/{info.get('engine')} "
+              f"누적 {info['rows']:,}행 읽기 {info['seconds']:.2f}초")
+
+# ============ 형식별 파서 ============
+
+def _text_encoding(path):
+    """텍스트 인코딩 (UTF-8 BOM이 있거나 앞부분이 UTF-8로 읽히는 한글이면 UTF-8, 아니면 cp949)"""
+    head = read_signature(path, 64 * 1024)
+    if head.startswith(UTF8_BOM):
+        return 'utf-8-sig'
+    try:
+        # 64KB 경계에서 잘린 마지막 글자는 무시 (final=False)
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return TEXT_ENCODING
+    return 'utf-8' if any(byte >= 0x80 for byte in head) else TEXT_ENCODING
+
+def iter_text_batches(path, sep=None, encoding=None, batch_rows=UPLOAD_BATCH_ROWS, columns=None):
+    """CSV/TSV를 batch_rows행씩 DataFrame으로
+
+    배치마다 타입 추론이 달라지지 않도록(예: 상품코드가 어떤 배치에서만 숫자로 바뀌는 것)
+    모든 값을 문자열로 읽는다. 숫자/날짜 변환은 저장 함수가 열 단위로 처리한다.
+    sep을 주지 않으면 헤더 줄에 탭이 있으면 TSV, 없으면 CSV로 본다.
+    """
+    encoding = encoding or _text_encoding(path)
+    if sep is None:
+        with open(path, 'r', encoding=encoding, errors='replace') as f:
+            sep = '\t' if '\t' in f.readline() else ','
+    usecols = (lambda name: name in columns) if columns is not None else None
+    with pd.read_csv(path, sep=sep, encoding=encoding, dtype=str, chunksize=batch_rows, usecols=usecols) as reader:
+        yield from reader
+
+class _HtmlTableRows(HTMLParser):
+    """HTML의 첫 번째 표를 행(셀 문자열 목록)으로 모으는 파서 (feed할 때마다 rows에 쌓임)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.finished = False
+        self._depth = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.finished:
+            return
+        if tag == 'table':
+            self._depth += 1
+        elif self._depth == 1 and tag == 'tr':
+            self._row = []
+        elif self._depth == 1 and tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+        elif tag == 'br' and self._cell is not None:
+            self._cell.append(' ')
+
+    def handle_endtag(self, tag):
+        if self.finished:
+            return
+        if tag == 'table':
+            self._depth -= 1
+            if self._depth == 0:
+                self.finished = True
+        elif self._depth == 1 and tag in ('td', 'th') and self._cell is not None:
+            self._row.append(' '.join(''.join(self._cell).split()))
+            self._cell = None
+        elif self._depth == 1 and tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+def _html_encoding(path):
+    """HTML 인코딩 (meta charset 우선, 없으면 텍스트와 같은 방식)"""
+    head = read_signature(path, SNIFF_BYTES)
+    match = re.search(rb'charset\s*=\s*["\']?([\w-]+)', head, re.IGNORECASE)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode('ascii')).name
+        except LookupError:
+            pass
+    return _text_encoding(path)
+
+def _iter_html_rows(path):
+    """HTML 표의 행을 파일을 조금씩 읽으면서 넘겨줌"""
+    parser = _HtmlTableRows()
+    with open(path, 'r', encoding=_html_encoding(path), errors='replace') as f:
+        while not parser.finished:
+            text = f.read(HTML_READ_CHARS)
+            if not text:
+                break
+            parser.feed(text)
+            yield from parser.rows
+            parser.rows = []
+    parser.close()
+    yield from parser.rows
+
+def iter_html_batches(path, batch_rows=UPLOAD_BATCH_ROWS, columns=None):
+    """HTML 표(확장자만 .xls)를 batch_rows행씩 DataFrame으로 (값은 CSV와 같이 문자열)"""
+    yield from _iter_row_batches(_iter_html_rows(path), batch_rows, columns)
+
+@contextmanager
+def _open_xlsx(path):
+    """read_only 워크북 열기
+
+    openpyxl은 파일명 확장자를 검사하므로(.xls로 저장된 xlsx 거부) 파일 객체로 넘긴다.
+    """
+    with open(path, 'rb') as f:
+        workbook = load_workbook(f, read_only=True, data_only=True, keep_links=False)
+        try:
+            yield workbook
+        finally:
+            workbook.close()
+
+def _iter_openpyxl_sheet(sheet, batch_rows=UPLOAD_BATCH_ROWS, columns=None):
+    """read_only 시트의 행을 batch_rows행씩 DataFrame으로 (첫 행이 헤더)"""
+    # 다른 프로그램이 만든 파일은 dimension 정보가 틀린 경우가 있어 끝까지 읽도록 초기화
+    sheet.reset_dimensions()
+    yield from _iter_row_batches(sheet.iter_rows(values_only=True), batch_rows, columns)
+
+def _iter_openpyxl_file(path, sheet_name=None, batch_rows=UPLOAD_BATCH_ROWS, columns=None):
+    """xlsx 파일의 시트 하나 (sheet_name이 없으면 첫 시트)"""
+    with _open_xlsx(path) as workbook:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        yield from _iter_openpyxl_sheet(sheet, batch_rows, columns)
+
+def _iter_calamine_sheet(workbook, sheet_name=None, batch_rows=UPLOAD_BATCH_ROWS, columns=None):
+    """calamine 시트를 batch_rows행씩 DataFrame으로 (xlsx/xls 공통, sheet_name이 없으면 첫 시트)"""
+    sheet = workbook.get_sheet_by_name(sheet_name or workbook.sheet_names[0])
+    # iter_rows가 없는 구버전은 시트 전체를 목록으로 받음
+    rows = sheet.iter_rows() if hasattr(sheet, 'iter_rows') else iter(sheet.to_python(skip_empty_area=False))
+    yield from _iter_row_batches(rows, batch_rows, columns, _calamine_value)
+
+def _iter_xlrd_sheet(source, sheet_name=None, batch_rows=UPLOAD_BATCH_ROWS, columns=None):
+    """xlrd로 시트 하나를 읽어 배치로 나누기 (source는 경로 또는 pd.ExcelFile)"""
+    usecols = (lambda name: name in columns) if columns is not None else None
+    engine = None if isinstance(source, pd.ExcelFile) else 'xlrd'
+    df = pd.read_excel(source, sheet_name=sheet_name or 0, engine=engine, usecols=usecols)
+    yield from _iter_frame_batches(df, batch_rows)
+
+def _sheet_batches(path, file_format, sheet_name, batch_rows, columns, info):
+    """시트 하나의 배치 generator (형식별로 가장 빠른 엔진 선택, info에 형식/엔진 기록)"""
+    info['format'] = file_format
+    if file_format == 'html':
+        info['engine'] = 'html.parser'
+        return iter_html_batches(path, batch_rows, columns)
+    if file_format == 'text':
+        info['engine'] = 'read_csv'
+        return iter_text_batches(path, batch_rows=batch_rows, columns=columns)
+    if use_calamine():
+        info['engine'] = 'calamine'
+        return _iter_calamine_sheet(CalamineWorkbook.from_path(path), sheet_name, batch_rows, columns)
+    if file_format == 'xls':
+        info['engine'] = 'xlrd'
+        return _iter_xlrd_sheet(path, sheet_name, batch_rows, columns)
+    info['engine'] = 'openpyxl'
+    return _iter_openpyxl_file(path, sheet_name, batch_rows, columns)
+
+# ============ 공개 함수 ============
+
+def workbook_sheet_names(path):
+    """워크북의 시트 이름 목록 (시트 내용은 읽지 않음, HTML/텍스트는 시트 하나)"""
+    file_format = sniff_format(path)
+    if file_format in ('html', 'text'):
+        return ['Sheet1']
+    if use_calamine():
+        return list(CalamineWorkbook.from_path(path).sheet_names)
+    if file_format == 'xls':
+        import xlrd
+        workbook = xlrd.open_workbook(path, on_demand=True)
+        try:
+            return workbook.sheet_names()
+        finally:
+            workbook.release_resources()
+
+    with _open_xlsx(path) as workbook:
+        return workbook.sheetnames
+
+def iter_sheet_batches(path, sheet_name=None, batch_rows=UPLOAD_BATCH_ROWS, columns=None, info=None):
+    """시트 하나만 batch_rows행씩 DataFrame으로 (sheet_name이 없으면 첫 시트, 시트별 병렬 처리용)"""
+    info = {} if info is None else info
+    file_format = sniff_format(path)
+    if file_format in ('html', 'text'):
+        sheet_name = None
+    batches = _sheet_batches(path, file_format, sheet_name, batch_rows, columns, info)
+    yield from _timed_batches(batches, path, info)
+
+def iter_workbook_sheets(path, batch_rows=UPLOAD_BATCH_ROWS, columns=None, info=None):
+    """워크북의 시트를 (시트명, DataFrame 배치 generator)로 하나씩 넘겨줌
+
+    배치 generator는 다음 시트로 넘어가기 전에 끝까지 소비해야 한다 (read_only 워크북은 순차 읽기).
+    워크북은 한 번만 연다. HTML/텍스트 파일은 'Sheet1' 시트 하나로 본다.
+    """
+    info = {} if info is None else info
+    file_format = sniff_format(path)
+    info['format'] = file_format
+
+    if file_format in ('html', 'text'):
+        yield 'Sheet1', _timed_batches(_sheet_batches(path, file_format, None, batch_rows, columns, info), path, info)
+    elif use_calamine():
+        info['engine'] = 'calamine'
+        workbook = CalamineWorkbook.from_path(path)
+        for sheet_name in workbook.sheet_names:
+            yield sheet_name, _timed_batches(_iter_calamine_sheet(workbook, sheet_name, batch_rows, columns), path, info)
+    elif file_format == 'xls':
+        info['engine'] = 'xlrd'
+        with pd.ExcelFile(path, engine='xlrd') as xls:
+            for sheet_name in xls.sheet_names:
+                yield sheet_name, _timed_batches(_iter_xlrd_sheet(xls, sheet_name, batch_rows, columns), path, info)
+    else:
+        info['engine'] = 'openpyxl'
+        with _open_xlsx(path) as workbook:
+            for sheet in workbook.worksheets:
+                yield sheet.title, _timed_batches(_iter_openpyxl_sheet(sheet, batch_rows, columns), path, info)
+
+def iter_table_batches(path, batch_rows=UPLOAD_BATCH_ROWS, columns=None, info=None):
+    """단일 표 파일(원본/커스텀)을 batch_rows행씩 DataFrame으로
+
+    형식은 확장자가 아니라 파일 내용으로 판별하고, 워크북이면 첫 시트만 읽는다.
+    (이지어드민 원본은 확장자만 .xls인 TSV 또는 HTML)
+    """
+    yield from iter_sheet_batches(path, None, batch_rows, columns, info)
@@ -0,0 +1,123 @@
+"""월별 워크북 시트별 병렬 적재
+
+월별 파일의 시트(의류/신발/잡화 ...)는 서로 독립이므로 시트마다 작업 프로세스를 두고
+각 프로세스가 시트를 읽어 바로 저장한다. 전체 시간은 가장 큰 시트의 처리 시간에 가까워진다.
+
+- 작업 프로세스는 spawn으로 띄우므로 이 모듈과 database / excel_reader만 불러온다
+  (app.py를 불러오지 않도록 작업 함수는 여기에 둔다)
+- 작업 프로세스 수는 MONTHLY_SHEET_WORKERS와 INGEST_MEMORY_MB(프로세스당 예상 메모리로 나눈 값)로 제한
+- 작은 파일이나 시트가 하나뿐이면 프로세스를 띄우지 않고 순서대로 처리
+- 프로세스 풀을 만들 수 없는 환경이면 스레드로 처리 (저장은 동시에, 파싱은 GIL로 순차)
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import database
+from excel_reader import (
+    UPLOAD_BATCH_ROWS, OLE2_SIGNATURE, read_signature,
+    iter_workbook_sheets, workbook_sheet_names, iter_sheet_batches
+)
+
+MONTHLY_SHEET_WORKERS = int(os.environ.get('MONTHLY_SHEET_WORKERS', str(min(4, os.cpu_count() or 1))))
+INGEST_MEMORY_MB = int(os.environ.get('INGEST_MEMORY_MB', '1024'))  # 시트 작업 프로세스 전체 메모리 상한 (대략)
+SHEET_WORKER_BASE_MB = 150  # 작업 프로세스 하나의 기본 메모리 (pandas/openpyxl import 포함)
+PARALLEL_SHEET_MIN_BYTES = int(os.environ.get('PARALLEL_SHEET_MIN_BYTES', str(2 * 1024 * 1024)))  # 이보다 작으면 순차 처리
+
+def monthly_data_type(sheet):
+    """시트명으로 월별 데이터 타입 결정"""
+    sheet_lower = sheet.lower()
+    if '의류' in sheet or 'clothing' in sheet_lower:
+        return '의류'
+    elif '신발' in sheet or 'shoes' in sheet_lower:
+        return '신발'
+    elif '잡화' in sheet or 'accessories' in sheet_lower:
+        return '잡화'
+    return sheet
+
+def sheet_worker_count(path, sheet_count):
+    """시트 병렬 처리에 쓸 작업 수 (1이면 순차 처리)
+
+    read_only .xlsx는 프로세스마다 공유 문자열 + 배치 하나, xlrd(.xls)는 시트 전체를 메모리에 올리므로
+    파일 크기로 프로세스당 메모리를 어림해 INGEST_MEMORY_MB를 넘지 않게 한다.
+    """
+    file_size = os.path.getsize(path)
+    if sheet_count < 2 or MONTHLY_SHEET_WORKERS < 2 or file_size < PARALLEL_SHEET_MIN_BYTES:
+        return 1
+    file_mb = file_size / (1024 * 1024)
+    per_worker_mb = SHEET_WORKER_BASE_MB + file_mb * (10 if read_signature(path) == OLE2_SIGNATURE else 5)
+    return max(1, min(MONTHLY_SHEET_WORKERS, sheet_count, int(INGEST_MEMORY_MB // per_worker_mb)))
+
+def save_monthly_sheet(path, sheet_name, file_id, db_path=None, batch_rows=UPLOAD_BATCH_ROWS):
+    """시트 하나를 배치로 읽어 저장하고 (읽은 행 수, 저장 행 수, 읽기 정보) 반환 - 작업 프로세스에서 실행"""
+    if db_path:
+        database.DB_PATH = db_path
+    data_type = monthly_data_type(sheet_name)
+    info = {}
+    rows_parsed = 0
+    rows_written = 0
+    for df in iter_sheet_batches(path, sheet_name, batch_rows, columns=database.MONTHLY_SOURCE_COLUMNS, info=info):
+        rows_parsed += len(df)
+        rows_written += database.save_monthly_data(df, file_id, data_type)
+    return rows_parsed, rows_written, info
+
+def _sheet_executor(workers):
+    """시트 작업 풀 (프로세스 풀을 만들 수 없으면 스레드 풀)"""
+    try:
+        # fork는 요청/작업 스레드와 DB 연결까지 복사하므로 spawn으로 새로 띄운다
+        # (spawn은 실행한 스크립트를 __mp_main__으로 다시 불러오므로 app.py의 시작 처리는 그때 건너뛴다)
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    except (OSError, NotImplementedError, ImportError) as e:
+        print(f"프로세스 풀 사용 불가 - 스레드로 시트 처리: {e}")
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sheet-ingest')
+
+def save_monthly_workbook(path, file_id, progress=None, info=None):
+    """월별 워크북의 모든 시트를 저장하고 저장 행 수 합계 반환
+
+    progress(**fields)로 단계와 읽은/저장한 행 수를 알려준다. 병렬 처리 중에는 시트가 끝날 때마다 갱신한다.
+    info(dict)를 주면 형식/엔진과 시트 읽기 시간 합계를 채운다 (병렬이면 작업 프로세스 시간의 합).
+    한 시트라도 실패하면 나머지 시트가 끝난 뒤 예외를 다시 던진다 (호출한 쪽이 파일 데이터를 정리).
+    """
+    progress = progress or (lambda **fields: None)
+    info = info if info is not None else {}
+    sheet_names = workbook_sheet_names(path)
+    workers = sheet_worker_count(path, len(sheet_names))
+
+    rows_parsed = 0
+    rows_written = 0
+    if workers < 2:
+        for sheet, batches in iter_workbook_sheets(path, columns=database.MONTHLY_SOURCE_COLUMNS, info=info):
+            data_type = monthly_data_type(sheet)
+            for df in batches:
+                rows_parsed += len(df)
+                progress(stage='write', rows_parsed=rows_parsed)
+                rows_written += database.save_monthly_data(df, file_id, data_type)
+                progress(stage='parse', rows_written=rows_written)
+        return rows_written
+
+    print(f"[ingest] 시트 {len(sheet_names)}개를 {workers}개 작업으로 동시 처리")
+    progress(stage='write')
+    error = None
+    with _sheet_executor(workers) as executor:
+        futures = {executor.submit(save_monthly_sheet, path, name, file_id, database.DB_PATH): name
+                   for name in sheet_names}
+        for future in as_completed(futures):
+            try:
+                sheet_parsed, sheet_written, sheet_info = future.result()
+            except Exception as e:
+                # 다른 시트가 저장 중일 때 정리하지 않도록 모두 끝날 때까지 기다린다
+                print(f"[ingest] 시트 처리 오류 ({futures[future]}): {e}")
+                error = error or e
+                continue
+            rows_parsed += sheet_parsed
+            rows_written += sheet_written
+            info['format'] = sheet_info.get('format')
+            info['engine'] = sheet_info.get('engine')
+            info['seconds'] = info.get('seconds', 0.0) + sheet_info.get('seconds', 0.0)
+            progress(rows_parsed=rows_parsed, rows_written=rows_written)
+    if error is not None:
+        raise error
+
+    # 작업 프로세스에서 올린 data_version은 이 프로세스의 결과 캐시를 비우지 못하므로 다시 무효화
+    database.bump_data_version()
+    return rows_written
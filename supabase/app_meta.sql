@@ -0,0 +1,18 @@
+-- 앱 메타 정보 테이블 (대시보드 결과 캐시의 data_version 저장용)
+--
+-- database.py가 업로드/삭제/초기화/복원 때마다 data_version 값을 새 토큰으로 바꾸고,
+-- 모든 인스턴스가 이 값을 캐시 키에 넣어 오래된 집계 결과를 버린다.
+-- 테이블이 없으면 결과 캐시를 사용하지 않는다.
+
+CREATE TABLE IF NOT EXISTS app_meta (
+    id bigserial PRIMARY KEY,
+    key text UNIQUE NOT NULL,
+    value text,
+    updated_at timestamptz DEFAULT now()
+);
+
+INSERT INTO app_meta (key, value) VALUES ('data_version', '0')
+ON CONFLICT (key) DO NOTHING;
+
+GRANT SELECT, INSERT, UPDATE ON app_meta TO anon, authenticated;
+GRANT USAGE, SELECT ON SEQUENCE app_meta_id_seq TO anon, authenticated;
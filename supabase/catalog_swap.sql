@@ -0,0 +1,43 @@
+-- 이지어드민 상품 이미지/재고 전체 교체용 스테이징 테이블 (Supabase SQL Editor에서 실행, 여러 번 실행해도 안전)
+--
+-- catalog_sync.sql을 먼저 실행한다 (sync_key/content_hash 컬럼이 스테이징 테이블에도 복사되도록).
+-- save_product_images / save_inventory가 전체를 다시 넣어야 할 때(full_reload, 바뀐 행이 많을 때)
+-- <table>_staging에 새 목록을 넣고 publish_catalog_staging(<table>)을 호출한다.
+-- 함수는 한 트랜잭션 안에서 운영 테이블 행을 스테이징 내용으로 바꾸므로, 조회하는 쪽은
+-- 커밋 전까지 기존 행 전체를, 커밋 후에는 새 행 전체를 본다. 테이블 이름을 바꾸는 방식과 달리
+-- ACCESS EXCLUSIVE 잠금을 잡지 않아 교체 중에도 조회가 기다리지 않는다.
+-- 이 스크립트가 없으면 행 단위 UPSERT/삭제로 반영한다.
+
+CREATE TABLE IF NOT EXISTS product_images_staging (LIKE product_images INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS inventory_staging (LIKE inventory INCLUDING DEFAULTS);
+-- 스테이징 행의 id는 쓰지 않는다 (운영 테이블이 identity 컬럼이어도 삽입되도록)
+ALTER TABLE product_images_staging ALTER COLUMN id DROP NOT NULL;
+ALTER TABLE inventory_staging ALTER COLUMN id DROP NOT NULL;
+
+-- 스테이징 내용을 운영 테이블로 교체하고 교체한 행 수 반환
+CREATE OR REPLACE FUNCTION publish_catalog_staging(p_table text)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    cols text;
+    published integer;
+BEGIN
+    IF p_table NOT IN ('product_images', 'inventory') THEN
+        RAISE EXCEPTION 'unsupported table: %', p_table;
+    END IF;
+
+    -- id는 운영 테이블의 시퀀스로 새로 매긴다
+    SELECT string_agg(quote_ident(column_name), ', ' ORDER BY ordinal_position) INTO cols
+    FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = p_table AND column_name <> 'id';
+
+    EXECUTE format('DELETE FROM %I', p_table);
+    EXECUTE format('INSERT INTO %I (%s) SELECT %s FROM %I', p_table, cols, cols, p_table || '_staging');
+    GET DIAGNOSTICS published = ROW_COUNT;
+    EXECUTE format('DELETE FROM %I', p_table || '_staging');
+    RETURN published;
+END;
+$$;
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON product_images_staging, inventory_staging TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION publish_catalog_staging(text) TO anon, authenticated;
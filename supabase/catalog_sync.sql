@@ -0,0 +1,16 @@
+-- 이지어드민 상품 이미지/재고 증분 동기화 (Supabase SQL Editor에서 실행, 여러 번 실행해도 안전)
+--
+-- save_product_images / save_inventory가 행마다 sync_key(공급처 옵션 코드)와 content_hash를
+-- 저장하고, 다음 동기화 때 바뀐 행만 on_conflict=sync_key로 UPSERT, 빠진 행만 삭제한다.
+-- 이 스크립트를 실행하기 전에는 예전처럼 테이블을 비운 뒤 전체를 다시 넣는다.
+-- 실행 후 첫 동기화는 sync_key가 없는 기존 행을 모두 새 행으로 교체한다.
+
+ALTER TABLE product_images ADD COLUMN IF NOT EXISTS sync_key text;
+ALTER TABLE product_images ADD COLUMN IF NOT EXISTS content_hash text;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_product_images_sync_key ON product_images (sync_key);
+
+ALTER TABLE inventory ADD COLUMN IF NOT EXISTS sync_key text;
+ALTER TABLE inventory ADD COLUMN IF NOT EXISTS content_hash text;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_sync_key ON inventory (sync_key);
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON product_images, inventory TO anon, authenticated;
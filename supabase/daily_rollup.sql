@@ -0,0 +1,79 @@
+-- 일별 롤업 테이블 및 유지 함수 (dashboard_functions.sql보다 먼저 실행)
+--
+-- monthly_sales를 (file_id, 판매일자, 매장명, 분류명, 업체명, 상품코드) 단위로 미리 합산한다.
+-- 키 컬럼의 NULL은 빈 문자열로 저장한다 (UNIQUE 충돌 판정을 위해).
+-- save_monthly_data가 업로드 시 apply_daily_rollup으로 합산분을 더하고,
+-- 파일/연도 삭제 시에는 같은 키 조건으로 롤업 행을 지운다.
+
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    id bigserial PRIMARY KEY,
+    file_id bigint NOT NULL DEFAULT 0,
+    "판매일자" text NOT NULL DEFAULT '',
+    "매장명" text NOT NULL DEFAULT '',
+    "분류명" text NOT NULL DEFAULT '',
+    "업체명" text NOT NULL DEFAULT '',
+    "상품코드" text NOT NULL DEFAULT '',
+    "실판매금액" double precision NOT NULL DEFAULT 0,
+    "판매량" double precision NOT NULL DEFAULT 0,
+    "건수" bigint NOT NULL DEFAULT 0,
+    CONSTRAINT daily_rollup_key UNIQUE (file_id, "판매일자", "매장명", "분류명", "업체명", "상품코드")
+);
+
+-- 기간 필터 시계열용 커버링 인덱스 (indexes.sql과 동일)
+CREATE INDEX IF NOT EXISTS idx_daily_rollup_date_cover ON daily_rollup ("판매일자", "매장명", file_id)
+    INCLUDE ("실판매금액", "판매량", "건수");
+
+-- 업로드된 행의 합산분 반영 (p_rows: [{file_id, 판매일자, 매장명, 분류명, 업체명, 상품코드, 실판매금액, 판매량, 건수}])
+CREATE OR REPLACE FUNCTION apply_daily_rollup(p_rows jsonb)
+RETURNS integer
+LANGUAGE sql AS $$
+    WITH upserted AS (
+        INSERT INTO daily_rollup (file_id, "판매일자", "매장명", "분류명", "업체명", "상품코드", "실판매금액", "판매량", "건수")
+        SELECT COALESCE((r->>'file_id')::bigint, 0),
+               COALESCE(r->>'판매일자', ''),
+               COALESCE(r->>'매장명', ''),
+               COALESCE(r->>'분류명', ''),
+               COALESCE(r->>'업체명', ''),
+               COALESCE(r->>'상품코드', ''),
+               COALESCE((r->>'실판매금액')::float8, 0),
+               COALESCE((r->>'판매량')::float8, 0),
+               COALESCE((r->>'건수')::bigint, 0)
+        FROM jsonb_array_elements(p_rows) AS r
+        ON CONFLICT ON CONSTRAINT daily_rollup_key DO UPDATE SET
+            "실판매금액" = daily_rollup."실판매금액" + EXCLUDED."실판매금액",
+            "판매량" = daily_rollup."판매량" + EXCLUDED."판매량",
+            "건수" = daily_rollup."건수" + EXCLUDED."건수"
+        RETURNING 1
+    )
+    SELECT COUNT(*)::integer FROM upserted;
+$$;
+
+-- monthly_sales 전체로 롤업 재생성 (최초 설치, 백업 복원 후)
+CREATE OR REPLACE FUNCTION rebuild_daily_rollup()
+RETURNS bigint
+LANGUAGE sql AS $$
+    DELETE FROM daily_rollup;
+    WITH inserted AS (
+        INSERT INTO daily_rollup (file_id, "판매일자", "매장명", "분류명", "업체명", "상품코드", "실판매금액", "판매량", "건수")
+        SELECT COALESCE(file_id, 0),
+               COALESCE("판매일자"::text, ''),
+               COALESCE("매장명", ''),
+               COALESCE("분류명", ''),
+               COALESCE("업체명", ''),
+               COALESCE("상품코드", ''),
+               COALESCE(SUM("실판매금액"), 0)::float8,
+               COALESCE(SUM("판매량"), 0)::float8,
+               COUNT(*)
+        FROM monthly_sales
+        GROUP BY 1, 2, 3, 4, 5, 6
+        RETURNING 1
+    )
+    SELECT COUNT(*) FROM inserted;
+$$;
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON daily_rollup TO anon, authenticated;
+GRANT USAGE, SELECT ON SEQUENCE daily_rollup_id_seq TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION apply_daily_rollup(jsonb), rebuild_daily_rollup() TO anon, authenticated;
+
+-- 기존 데이터로 초기 롤업 생성
+SELECT rebuild_daily_rollup();
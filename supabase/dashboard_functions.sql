@@ -0,0 +1,294 @@
+-- 대시보드 집계 RPC 함수 (Supabase SQL Editor에서 실행)
+--
+-- database.py의 get_* 집계 함수들이 supabase_rpc로 먼저 호출하고,
+-- 함수가 없으면 기존 Python 집계로 폴백한다.
+-- 결과 컬럼명/정렬/LIMIT은 Python 집계 결과와 동일하게 맞춘다.
+-- 일별/주간/월별/매장별 함수는 daily_rollup을 읽으므로 daily_rollup.sql을 먼저 실행한다.
+-- PostgREST는 RETURNS TABLE 결과를 max-rows(기본 1000행)에서 말없이 자르므로, 행 수에 상한이
+-- 없는 집계(일별, 업체/매장-분류-상품 행)는 *_json 함수가 jsonb 배열 하나로 돌려준다.
+
+-- 요약 통계 (get_summary_stats)
+CREATE OR REPLACE FUNCTION dashboard_summary_stats(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS json
+LANGUAGE sql STABLE AS $$
+    SELECT json_build_object(
+        'original', (
+            SELECT json_build_object(
+                'total_records', COUNT(*),
+                'total_sales', COALESCE(SUM("실판매금액"), 0)::float8,
+                'total_qty', COALESCE(SUM("판매량"), 0)::float8,
+                'unique_products', COUNT(DISTINCT NULLIF("상품코드", '')),
+                'unique_suppliers', COUNT(DISTINCT NULLIF("업체명", '')),
+                'unique_categories', COUNT(DISTINCT NULLIF("카테고리", ''))
+            )
+            FROM sales_data
+            WHERE (p_file_id IS NULL OR file_id = p_file_id)
+        ),
+        'monthly', (
+            SELECT json_build_object(
+                'total_records', COUNT(*),
+                'total_sales', COALESCE(SUM("실판매금액"), 0)::float8,
+                'total_qty', COALESCE(SUM("판매량"), 0)::float8,
+                'unique_stores', COUNT(DISTINCT NULLIF("매장명", ''))
+            )
+            FROM monthly_sales
+            WHERE (p_file_id IS NULL OR file_id = p_file_id)
+              AND (p_start_date IS NULL OR "판매일자"::date >= p_start_date)
+              AND (p_end_date IS NULL OR "판매일자"::date <= p_end_date)
+        ),
+        'by_type', (
+            SELECT COALESCE(json_object_agg(data_type, cnt), '{}'::json)
+            FROM (
+                SELECT data_type, COUNT(*) AS cnt
+                FROM monthly_sales
+                WHERE data_type IS NOT NULL AND data_type <> ''
+                  AND (p_file_id IS NULL OR file_id = p_file_id)
+                  AND (p_start_date IS NULL OR "판매일자"::date >= p_start_date)
+                  AND (p_end_date IS NULL OR "판매일자"::date <= p_end_date)
+                GROUP BY data_type
+            ) t
+        )
+    );
+$$;
+
+-- 업체별 매출 (get_sales_by_supplier)
+CREATE OR REPLACE FUNCTION dashboard_sales_by_supplier(p_file_id bigint DEFAULT NULL)
+RETURNS TABLE("업체명" text, "매출액" float8, "판매량" float8, "상품수" bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT s."업체명"::text,
+           COALESCE(SUM(s."실판매금액"), 0)::float8,
+           COALESCE(SUM(s."판매량"), 0)::float8,
+           COUNT(DISTINCT s."상품코드")
+    FROM sales_data s
+    WHERE s."업체명" IS NOT NULL AND s."업체명" <> ''
+      AND (p_file_id IS NULL OR s.file_id = p_file_id)
+    GROUP BY s."업체명"
+    ORDER BY 2 DESC
+    LIMIT 30;
+$$;
+
+-- 카테고리별 매출 (get_sales_by_category)
+CREATE OR REPLACE FUNCTION dashboard_sales_by_category(p_file_id bigint DEFAULT NULL)
+RETURNS TABLE("카테고리" text, "매출액" float8, "판매량" float8, "상품수" bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT s."카테고리"::text,
+           COALESCE(SUM(s."실판매금액"), 0)::float8,
+           COALESCE(SUM(s."판매량"), 0)::float8,
+           COUNT(DISTINCT s."상품코드")
+    FROM sales_data s
+    WHERE s."카테고리" IS NOT NULL AND s."카테고리" <> ''
+      AND (p_file_id IS NULL OR s.file_id = p_file_id)
+    GROUP BY s."카테고리"
+    ORDER BY 2 DESC
+    LIMIT 30;
+$$;
+
+-- 베스트셀러 상품 (get_top_products) - 상품코드별 첫 행의 상품명/분류 정보 사용
+CREATE OR REPLACE FUNCTION dashboard_top_products(p_file_id bigint DEFAULT NULL)
+RETURNS TABLE("상품코드" text, "상품명" text, "분류명" text, "업체명" text, "카테고리" text,
+              "실판매금액" float8, "판매량" float8)
+LANGUAGE sql STABLE AS $$
+    SELECT s."상품코드"::text,
+           (array_agg(s."상품명" ORDER BY s.id))[1]::text,
+           (array_agg(s."분류명" ORDER BY s.id))[1]::text,
+           (array_agg(s."업체명" ORDER BY s.id))[1]::text,
+           (array_agg(s."카테고리" ORDER BY s.id))[1]::text,
+           COALESCE(SUM(s."실판매금액"), 0)::float8,
+           COALESCE(SUM(s."판매량"), 0)::float8
+    FROM sales_data s
+    WHERE s."상품코드" IS NOT NULL AND s."상품코드" <> ''
+      AND (p_file_id IS NULL OR s.file_id = p_file_id)
+    GROUP BY s."상품코드"
+    ORDER BY 6 DESC
+    LIMIT 100;
+$$;
+
+-- 일별 매출 (get_daily_sales) - daily_rollup에서 집계
+CREATE OR REPLACE FUNCTION dashboard_daily_sales(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS TABLE("판매일자" text, "실판매금액" float8, "판매량" float8, "건수" bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT r."판매일자",
+           SUM(r."실판매금액")::float8,
+           SUM(r."판매량")::float8,
+           SUM(r."건수")::bigint
+    FROM daily_rollup r
+    WHERE r."판매일자" <> ''
+      AND (p_file_id IS NULL OR r.file_id = p_file_id)
+      AND (p_start_date IS NULL OR r."판매일자" >= p_start_date::text)
+      AND (p_end_date IS NULL OR r."판매일자" <= p_end_date::text)
+    GROUP BY r."판매일자"
+    ORDER BY 1;
+$$;
+
+-- 주간별 매출 (get_weekly_sales) - 주차 키는 "연도-W(ISO 주차)", daily_rollup에서 집계
+CREATE OR REPLACE FUNCTION dashboard_weekly_sales(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS TABLE("주차" text, "시작일" text, "종료일" text, "실판매금액" float8, "판매량" float8,
+                "건수" bigint, "매장수" bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT to_char(r."판매일자"::date, 'YYYY') || '-W' || to_char(r."판매일자"::date, 'IW'),
+           MIN(r."판매일자"),
+           MAX(r."판매일자"),
+           SUM(r."실판매금액")::float8,
+           SUM(r."판매량")::float8,
+           SUM(r."건수")::bigint,
+           COUNT(DISTINCT NULLIF(r."매장명", ''))
+    FROM daily_rollup r
+    WHERE r."판매일자" <> ''
+      AND (p_file_id IS NULL OR r.file_id = p_file_id)
+      AND (p_start_date IS NULL OR r."판매일자" >= p_start_date::text)
+      AND (p_end_date IS NULL OR r."판매일자" <= p_end_date::text)
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+-- 월별 매출 (get_monthly_sales) - daily_rollup에서 집계
+CREATE OR REPLACE FUNCTION dashboard_monthly_sales(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS TABLE("월" text, "실판매금액" float8, "판매량" float8, "건수" bigint, "매장수" bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT left(r."판매일자", 7),
+           SUM(r."실판매금액")::float8,
+           SUM(r."판매량")::float8,
+           SUM(r."건수")::bigint,
+           COUNT(DISTINCT NULLIF(r."매장명", ''))
+    FROM daily_rollup r
+    WHERE r."판매일자" <> ''
+      AND (p_file_id IS NULL OR r.file_id = p_file_id)
+      AND (p_start_date IS NULL OR r."판매일자" >= p_start_date::text)
+      AND (p_end_date IS NULL OR r."판매일자" <= p_end_date::text)
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+-- 매장별 매출 (get_store_sales) - daily_rollup에서 집계
+CREATE OR REPLACE FUNCTION dashboard_store_sales(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS TABLE("매장명" text, "실판매금액" float8, "판매량" float8, "건수" bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT r."매장명",
+           SUM(r."실판매금액")::float8,
+           SUM(r."판매량")::float8,
+           SUM(r."건수")::bigint
+    FROM daily_rollup r
+    WHERE r."매장명" <> ''
+      AND (p_file_id IS NULL OR r.file_id = p_file_id)
+      AND (p_start_date IS NULL OR r."판매일자" >= p_start_date::text)
+      AND (p_end_date IS NULL OR r."판매일자" <= p_end_date::text)
+    GROUP BY r."매장명"
+    ORDER BY 2 DESC
+    LIMIT 30;
+$$;
+
+-- 업체-카테고리-상품 집계 행 (get_supplier_category_matrix, 계층 구조는 Python에서 생성)
+CREATE OR REPLACE FUNCTION dashboard_supplier_category_rows(p_file_id bigint DEFAULT NULL)
+RETURNS TABLE("업체명" text, "카테고리" text, "상품코드" text, "상품명" text, "매출액" float8, "판매량" float8)
+LANGUAGE sql STABLE AS $$
+    SELECT s."업체명"::text, s."카테고리"::text, s."상품코드"::text, s."상품명"::text,
+           COALESCE(SUM(s."실판매금액"), 0)::float8,
+           COALESCE(SUM(s."판매량"), 0)::float8
+    FROM sales_data s
+    WHERE s."업체명" IS NOT NULL
+      AND (p_file_id IS NULL OR s.file_id = p_file_id)
+    GROUP BY s."업체명", s."카테고리", s."상품코드", s."상품명"
+    ORDER BY 5 DESC;
+$$;
+
+-- 매장-분류-상품 집계 행 (get_store_category_matrix, 계층 구조는 Python에서 생성)
+CREATE OR REPLACE FUNCTION dashboard_store_category_rows(p_file_id bigint DEFAULT NULL)
+RETURNS TABLE("매장명" text, "분류명" text, "상품코드" text, "상품명" text, "매출액" float8, "판매량" float8)
+LANGUAGE sql STABLE AS $$
+    SELECT m."매장명"::text, m."분류명"::text, m."상품코드"::text, m."상품명"::text,
+           COALESCE(SUM(m."실판매금액"), 0)::float8,
+           COALESCE(SUM(m."판매량"), 0)::float8
+    FROM monthly_sales m
+    WHERE m."매장명" IS NOT NULL
+      AND (p_file_id IS NULL OR m.file_id = p_file_id)
+    GROUP BY m."매장명", m."분류명", m."상품코드", m."상품명"
+    ORDER BY 5 DESC;
+$$;
+
+-- 행 수 제한 없는 집계의 jsonb 배열 버전 (PostgREST max-rows에 잘리지 않음, Python에서 호출)
+CREATE OR REPLACE FUNCTION dashboard_daily_sales_json(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS jsonb
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+    FROM dashboard_daily_sales(p_file_id, p_start_date, p_end_date) WITH ORDINALITY t;
+$$;
+
+CREATE OR REPLACE FUNCTION dashboard_supplier_category_json(p_file_id bigint DEFAULT NULL)
+RETURNS jsonb
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+    FROM dashboard_supplier_category_rows(p_file_id) WITH ORDINALITY t;
+$$;
+
+CREATE OR REPLACE FUNCTION dashboard_store_category_json(p_file_id bigint DEFAULT NULL)
+RETURNS jsonb
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+    FROM dashboard_store_category_rows(p_file_id) WITH ORDINALITY t;
+$$;
+
+-- 전체 패널 묶음 (get_dashboard_bundle) - 위 함수들을 한 번의 RPC로 호출, 계층 구조는 Python에서 생성
+-- 날짜 필터는 패널별 API와 같이 요약/일별/주간/월별/매장별에만 적용한다.
+CREATE OR REPLACE FUNCTION dashboard_bundle(
+    p_file_id bigint DEFAULT NULL,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL
+) RETURNS jsonb
+LANGUAGE sql STABLE AS $$
+    SELECT jsonb_build_object(
+        'summary', dashboard_summary_stats(p_file_id, p_start_date, p_end_date)::jsonb,
+        'suppliers', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                      FROM dashboard_sales_by_supplier(p_file_id) WITH ORDINALITY t),
+        'categories', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                       FROM dashboard_sales_by_category(p_file_id) WITH ORDINALITY t),
+        'products', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                     FROM dashboard_top_products(p_file_id) WITH ORDINALITY t),
+        'daily', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                  FROM dashboard_daily_sales(p_file_id, p_start_date, p_end_date) WITH ORDINALITY t),
+        'weekly', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                   FROM dashboard_weekly_sales(p_file_id, p_start_date, p_end_date) WITH ORDINALITY t),
+        'monthly', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                    FROM dashboard_monthly_sales(p_file_id, p_start_date, p_end_date) WITH ORDINALITY t),
+        'stores', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                   FROM dashboard_store_sales(p_file_id, p_start_date, p_end_date) WITH ORDINALITY t),
+        'supplier_category_rows', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                                   FROM dashboard_supplier_category_rows(p_file_id) WITH ORDINALITY t),
+        'store_category_rows', (SELECT COALESCE(jsonb_agg(to_jsonb(t) - 'ordinality' ORDER BY t.ordinality), '[]')
+                                FROM dashboard_store_category_rows(p_file_id) WITH ORDINALITY t)
+    );
+$$;
+
+GRANT EXECUTE ON FUNCTION
+    dashboard_summary_stats(bigint, date, date),
+    dashboard_sales_by_supplier(bigint),
+    dashboard_sales_by_category(bigint),
+    dashboard_top_products(bigint),
+    dashboard_daily_sales(bigint, date, date),
+    dashboard_weekly_sales(bigint, date, date),
+    dashboard_monthly_sales(bigint, date, date),
+    dashboard_store_sales(bigint, date, date),
+    dashboard_supplier_category_rows(bigint),
+    dashboard_store_category_rows(bigint),
+    dashboard_daily_sales_json(bigint, date, date),
+    dashboard_supplier_category_json(bigint),
+    dashboard_store_category_json(bigint),
+    dashboard_bundle(bigint, date, date)
+TO anon, authenticated;
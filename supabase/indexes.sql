@@ -0,0 +1,50 @@
+-- 대시보드 쿼리용 복합/커버링 인덱스 (Supabase SQL Editor에서 실행, 여러 번 실행해도 안전)
+--
+-- database.py의 LOCAL_INDEXES(SQLite)와 같은 접근 패턴을 맞춘다.
+-- file_id를 앞에 두어 파일 필터 집계와 delete_file_data의 file_id 삭제가 인덱스를 타고,
+-- INCLUDE로 집계 컬럼을 넣어 index-only scan이 가능하게 한다.
+-- 확인: EXPLAIN SELECT * FROM dashboard_store_category_rows(1);
+
+-- 파일 단위 조회/삭제 + keyset 페이징 (file_id=eq.N&id=gt.M&order=id)
+CREATE INDEX IF NOT EXISTS idx_sales_file_id ON sales_data (file_id, id);
+CREATE INDEX IF NOT EXISTS idx_monthly_file_id ON monthly_sales (file_id, id);
+
+-- dashboard_sales_by_supplier, dashboard_supplier_category_rows, dashboard_summary_stats(원본)
+CREATE INDEX IF NOT EXISTS idx_sales_file_supplier ON sales_data (file_id, "업체명", "카테고리", "상품코드", "상품명")
+    INCLUDE ("실판매금액", "판매량");
+
+-- dashboard_sales_by_category
+CREATE INDEX IF NOT EXISTS idx_sales_file_category ON sales_data (file_id, "카테고리", "상품코드")
+    INCLUDE ("실판매금액", "판매량");
+
+-- dashboard_top_products (상품코드별 첫 행을 id 순으로 고름)
+CREATE INDEX IF NOT EXISTS idx_sales_file_product ON sales_data (file_id, "상품코드")
+    INCLUDE (id, "상품명", "분류명", "업체명", "카테고리", "실판매금액", "판매량");
+
+-- dashboard_summary_stats(월별: 파일 + 기간 필터), delete_data_by_year
+CREATE INDEX IF NOT EXISTS idx_monthly_file_date ON monthly_sales (file_id, "판매일자")
+    INCLUDE ("매장명", "실판매금액", "판매량");
+CREATE INDEX IF NOT EXISTS idx_monthly_판매일자 ON monthly_sales ("판매일자");
+
+-- dashboard_summary_stats(데이터 타입별 건수)
+CREATE INDEX IF NOT EXISTS idx_monthly_data_type ON monthly_sales (data_type);
+
+-- dashboard_store_category_rows
+CREATE INDEX IF NOT EXISTS idx_monthly_file_store ON monthly_sales (file_id, "매장명", "분류명", "상품코드", "상품명")
+    INCLUDE ("실판매금액", "판매량");
+
+-- 일별/주간/월별/매장별 시계열 (파일 필터는 daily_rollup_key 제약 인덱스 사용)
+CREATE INDEX IF NOT EXISTS idx_daily_rollup_date_cover ON daily_rollup ("판매일자", "매장명", file_id)
+    INCLUDE ("실판매금액", "판매량", "건수");
+
+-- 위 인덱스로 대체된 단일 컬럼 인덱스
+DROP INDEX IF EXISTS idx_sales_업체명;
+DROP INDEX IF EXISTS idx_sales_카테고리;
+DROP INDEX IF EXISTS idx_sales_상품코드;
+DROP INDEX IF EXISTS idx_monthly_매장명;
+DROP INDEX IF EXISTS idx_monthly_업체명;
+DROP INDEX IF EXISTS idx_daily_rollup_판매일자;
+
+ANALYZE sales_data;
+ANALYZE monthly_sales;
+ANALYZE daily_rollup;
@@ -0,0 +1,33 @@
+-- 분할 업로드 청크 기록 테이블 및 row_count 증가 함수
+--
+-- api_upload_chunk가 (file_id, chunk_index)마다 한 행을 먼저 넣어 청크를 선점하고,
+-- 저장이 끝나면 row_count를 채운다. 같은 청크가 재전송되면 UNIQUE 충돌로 한 번만 저장된다.
+-- upload_key는 브라우저가 업로드마다 만드는 키로, 첫 청크 재전송 시 같은 파일을 찾는 데 쓴다.
+-- 테이블이 없으면 예전처럼 중복 확인 없이 저장한다.
+
+ALTER TABLE upload_files ADD COLUMN IF NOT EXISTS upload_key text;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_upload_files_upload_key ON upload_files (upload_key);
+
+CREATE TABLE IF NOT EXISTS upload_chunks (
+    id bigserial PRIMARY KEY,
+    file_id bigint NOT NULL,
+    chunk_index integer NOT NULL,
+    row_count integer,
+    checksum text NOT NULL,
+    created_at timestamptz DEFAULT now(),
+    CONSTRAINT upload_chunks_key UNIQUE (file_id, chunk_index)
+);
+
+-- 동시에 끝난 청크들의 건수를 누락 없이 더하기 (새 row_count 반환)
+CREATE OR REPLACE FUNCTION increment_upload_row_count(p_file_id bigint, p_delta integer)
+RETURNS integer
+LANGUAGE sql AS $$
+    UPDATE upload_files
+    SET row_count = COALESCE(row_count, 0) + p_delta
+    WHERE id = p_file_id
+    RETURNING row_count;
+$$;
+
+GRANT SELECT, INSERT, UPDATE, DELETE ON upload_chunks TO anon, authenticated;
+GRANT USAGE, SELECT ON SEQUENCE upload_chunks_id_seq TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION increment_upload_row_count(bigint, integer) TO anon, authenticated;
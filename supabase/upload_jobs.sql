@@ -0,0 +1,34 @@
+-- 서버 업로드 처리 작업 테이블
+--
+-- api_upload가 파일을 받으면 작업을 등록하고 바로 job id를 돌려준다.
+-- 작업 스레드가 단계(stage)와 읽은/저장한 행 수, 파서 엔진과 읽기 시간을 기록하고,
+-- /api/jobs/<id>가 이를 보여준다.
+-- 테이블이 없으면 작업 진행 상황은 처리 중인 서버 메모리에만 남는다.
+
+CREATE TABLE IF NOT EXISTS upload_jobs (
+    id text PRIMARY KEY,
+    original_name text,
+    saved_name text,
+    file_type text,
+    status text DEFAULT 'queued',
+    stage text DEFAULT 'queued',
+    rows_parsed bigint DEFAULT 0,
+    rows_written bigint DEFAULT 0,
+    file_id bigint,
+    error text,
+    engine text,
+    read_seconds double precision,
+    owner_pid integer,
+    owner_started text,
+    created_at text,
+    started_at text,
+    finished_at text
+);
+
+-- 엔진/읽기 시간, 처리 프로세스 컬럼 도입 이전에 만든 테이블 보완
+ALTER TABLE upload_jobs ADD COLUMN IF NOT EXISTS engine text;
+ALTER TABLE upload_jobs ADD COLUMN IF NOT EXISTS read_seconds double precision;
+ALTER TABLE upload_jobs ADD COLUMN IF NOT EXISTS owner_pid integer;
+ALTER TABLE upload_jobs ADD COLUMN IF NOT EXISTS owner_started text;
+
+GRANT SELECT, INSERT, UPDATE ON upload_jobs TO anon, authenticated;